@@ -1,60 +1,208 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, make_response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from pymongo import MongoClient
-from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId, Decimal128, json_util, encode as encode_bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from datetime import datetime, timezone
+import base64
+import functools
 import json
+import os
+import re
+import threading
+import time
+
+import compression
+import metrics
+from cache import LRUCache
+from fechas import parse_date
+from indexes import INDEXES, IndexSetupError, ensure_indexes, missing_unique_indexes
+from mongo import MongoConnection, config_from_env
+from ventas_rollup import ROLLUP_COLLECTION, update_rollup
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional (sin él no se ofrece application/msgpack)
+    msgpack = None
 
 # ========================================
 # 🔧 CONFIGURACIÓN DE LA APLICACIÓN
 # ========================================
 
-app = Flask(__name__)
-CORS(app)  # Habilitar CORS para todas las rutas
+class BSONJSONProvider(DefaultJSONProvider):
+    """Serializa ObjectId, datetime y Decimal128 directamente al generar el JSON"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, Decimal128):
+            return str(o.to_decimal())
+        return DefaultJSONProvider.default(o)
+
+    def response(self, *args, **kwargs):
+        with metrics.serializing():
+            return super().response(*args, **kwargs)
+
+class OrjsonBSONProvider(BSONJSONProvider):
+    """Variante respaldada por orjson (misma estructura, UTF-8 sin escapes \\uXXXX)"""
+
+    def _options(self, indent=False):
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        with metrics.serializing():
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = (self.compact is None and self._app.debug) or self.compact is False
+            body = orjson.dumps(obj, default=self.default, option=self._options(indent)) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+# Las rutas se registran en el blueprint; create_app() arma la aplicación
+api = Blueprint('api', __name__)
+
+# Ajustes de la API y sus valores por defecto; cada uno se puede definir en el
+# entorno como COMERCIOTECH_<CLAVE> (igual que los de MongoDB en mongo.py) o
+# en el config de create_app(). Se leen de current_app.config en cada uso
+SETTINGS = {
+    # Salida de orjson (no escapa caracteres no ASCII)
+    'ORJSON': False,
+    # Cuenta por petición de comandos de MongoDB y tiempos (Server-Timing y registro de lentas)
+    'REQUEST_TRACE': False,
+    # Una petición se registra como lenta si supera este tiempo o esta cantidad de comandos
+    'SLOW_REQUEST_MS': 500.0,
+    'SLOW_REQUEST_COMMANDS': 25,
+    # Caché de lectura por ID y cada cuántos segundos se consultan las versiones
+    # escritas por otros procesos
+    'CACHE_SIZE': 10000,
+    'CACHE_TTL': 60.0,
+    'CACHE_VERSION_INTERVAL': 1.0,
+    # COMERCIOTECH_COMPRESSION=0 la desactiva (p. ej. si ya comprime un proxy delante);
+    # por debajo de COMPRESSION_MIN_SIZE bytes no compensa su costo
+    'COMPRESSION': True,
+    'COMPRESSION_MIN_SIZE': 1024,
+    # Niveles por codificación: gzip 1-9, zstd 1-22, br 0-11
+    'GZIP_LEVEL': 6,
+    'ZSTD_LEVEL': 3,
+    'BROTLI_LEVEL': 4,
+    # Segundos que se reutiliza la respuesta de /debug
+    'DEBUG_CACHE_SECONDS': 10.0,
+    # Segundos que /ready reutiliza la verificación de índices únicos (cada
+    # sondeo solo hace un ping)
+    'READY_INDEX_CHECK_SECONDS': 60.0,
+}
+
+def settings_from_env(environ=None):
+    """Ajustes de la API con los valores por defecto y lo definido en el entorno"""
+    environ = os.environ if environ is None else environ
+    settings = dict(SETTINGS)
+    for key, default in SETTINGS.items():
+        raw = environ.get('COMERCIOTECH_' + key)
+        if raw is None or raw == '':
+            continue
+        if isinstance(default, bool):
+            settings[key] = raw.lower() in ('1', 'true', 'yes')
+        else:
+            settings[key] = type(default)(raw)
+    return settings
 
 # ========================================
 # 🗄️ CONFIGURACIÓN DE MONGODB
 # ========================================
 
-try:
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['comerciotech']
-    
-    # Colecciones
-    clientes_collection = db['clientes']
-    productos_collection = db['productos']
-    pedidos_collection = db['pedidos']
-    
+# El cliente se crea en la primera consulta (ver mongo.py): importar este
+# módulo o crear la app no abre conexiones
+
+def get_mongo():
+    """Conexión a MongoDB de la aplicación actual"""
+    return current_app.extensions['comerciotech_mongo']
+
+class CollectionProxy:
+    """Colección de la aplicación actual, resuelta en cada uso"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_mongo().collection(self.name), attr)
+
+# Colecciones
+clientes_collection = CollectionProxy('clientes')
+productos_collection = CollectionProxy('productos')
+pedidos_collection = CollectionProxy('pedidos')
+# Contadores de cambios por colección (invalidan la caché entre procesos)
+versiones_collection = CollectionProxy('versiones')
+# Resúmenes de ventas por día, producto y categoría
+ventas_rollup_collection = CollectionProxy(ROLLUP_COLLECTION)
+
+def check_indexes(db):
+    """Crea los índices que falten; solo al pre-calentar (MONGO_PREWARM o python app.py).
+
+    Crear un índice sobre una colección grande tarda: no se hace en la
+    primera petición. Sin pre-calentamiento los crean import_data.py o
+    python indexes.py en el despliegue, y /ready avisa si falta uno único.
+    """
+    # Los índices únicos respaldan la detección de duplicados en las rutas de escritura
+    try:
+        ensure_indexes(db)
+        print("🗂️ Índices verificados")
+    except IndexSetupError as e:
+        for collection_name, error in e.errors.items():
+            print(f"⚠️ No se pudieron crear los índices de {collection_name}: {error}")
+    except Exception as e:
+        print(f"⚠️ No se pudieron crear los índices: {e}")
+
+def unique_index_problems(db):
+    """Índices únicos requeridos que faltan; sin ellos /ready responde 503"""
+    return missing_unique_indexes({
+        collection_name: db[collection_name].index_information() for collection_name in INDEXES
+    })
+
+def cached_index_problems():
+    """unique_index_problems, consultado como mucho una vez cada READY_INDEX_CHECK_SECONDS"""
+    index_check = current_app.extensions['comerciotech_ready']
+    now = time.monotonic()
+    if index_check['expires'] <= now:
+        with index_check['lock']:
+            # Solo un hilo consulta; el resto espera y reutiliza el resultado
+            if index_check['expires'] <= now:
+                index_check['data'] = unique_index_problems(get_mongo().db)
+                index_check['expires'] = time.monotonic() + current_app.config['READY_INDEX_CHECK_SECONDS']
+    return index_check['data']
+
+def warm_up(app):
+    """Conecta antes de la primera petición y muestra los conteos estimados.
+
+    Con MONGO_MIN_POOL_SIZE > 0 el driver completa el pool en segundo plano.
+    """
+    mongo = app.extensions['comerciotech_mongo']
+    mongo.ping()
+    db = mongo.db
     print("✅ Conexión exitosa a MongoDB")
     print(f"📊 Base de datos: {db.name}")
-    print(f"👥 Clientes: {clientes_collection.count_documents({})}")
-    print(f"📦 Productos: {productos_collection.count_documents({})}")
-    print(f"🛒 Pedidos: {pedidos_collection.count_documents({})}")
-    
-except Exception as e:
-    print(f"❌ Error al conectar con MongoDB: {e}")
-    exit(1)
+    check_indexes(db)
+    # Conteos estimados a partir de los metadatos: no recorren las colecciones
+    print(f"👥 Clientes: {db['clientes'].estimated_document_count()}")
+    print(f"📦 Productos: {db['productos'].estimated_document_count()}")
+    print(f"🛒 Pedidos: {db['pedidos'].estimated_document_count()}")
 
 # ========================================
 # 🔧 FUNCIONES HELPER
 # ========================================
 
-def serialize_doc(doc):
-    """Convierte ObjectId a string para JSON serialization"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        for key, value in doc.items():
-            if isinstance(value, ObjectId):
-                doc[key] = str(value)
-            elif isinstance(value, dict):
-                doc[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                doc[key] = serialize_doc(value)
-    return doc
-
 def is_valid_objectid(oid):
     """Valida si un string es un ObjectId válido"""
     try:
@@ -68,11 +216,871 @@ def handle_error(error, code=500):
     print(f"❌ Error: {str(error)}")
     return jsonify({'error': str(error)}), code
 
+# ========================================
+# 📈 MÉTRICAS
+# ========================================
+
+@api.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    if current_app.config['REQUEST_TRACE']:
+        g.request_trace, g.request_trace_token = metrics.start_trace()
+
+@api.after_app_request
+def record_metrics(response):
+    started = g.pop('request_started', None)
+    # La plantilla de la ruta (no la URL) mantiene acotada la cantidad de series
+    route = request.url_rule.rule if request.url_rule else 'sin_ruta'
+    if started is not None:
+        metrics.record_request(request.method, route, response.status_code, time.perf_counter() - started)
+    trace = g.pop('request_trace', None)
+    if trace is not None:
+        metrics.end_trace(g.pop('request_trace_token'))
+        response.headers['Server-Timing'] = trace.server_timing()
+        log_slow_request(trace, route, response.status_code)
+    return response
+
+def log_slow_request(trace, route, status):
+    """Escribe una línea JSON con el detalle de una petición lenta o con demasiados comandos"""
+    elapsed_ms = trace.elapsed() * 1000
+    config = current_app.config
+    if elapsed_ms < config['SLOW_REQUEST_MS'] and trace.command_count <= config['SLOW_REQUEST_COMMANDS']:
+        return
+    entry = {
+        'evento': 'peticion_lenta',
+        'method': request.method,
+        'route': route,
+        'path': request.path,
+        'params': {**(request.view_args or {}), **request.args.to_dict(flat=False)},
+        'status': status,
+        'duration_ms': round(elapsed_ms, 3),
+        'db_ms': round(trace.db_seconds * 1000, 3),
+        'ser_ms': round(trace.ser_seconds * 1000, 3),
+        'command_count': trace.command_count,
+        'commands': trace.commands
+    }
+    print(f"🐢 {json.dumps(entry, ensure_ascii=False, default=str)}")
+
+# ========================================
+# 🧠 CACHÉ DE LECTURA POR ID
+# ========================================
+
+class ReadCache:
+    """Caché de lectura por ID de una aplicación y las versiones de colección que refleja"""
+
+    def __init__(self, size, ttl, version_interval):
+        self.items = LRUCache(size, ttl)
+        self.version_interval = version_interval
+        self.known_versions = {}
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+
+    def observe(self, name, version):
+        """Vacía la colección si su versión cambió desde la última vista (otro proceso escribió)"""
+        with self.lock:
+            if self.known_versions.get(name, 0) != version:
+                self.items.clear(name)
+                self.known_versions[name] = version
+
+def read_cache():
+    """Caché de lectura de la aplicación actual"""
+    return current_app.extensions['comerciotech_cache']
+
+def sync_versions():
+    """Vacía la caché de las colecciones que otro proceso modificó.
+
+    Lee los documentos de versión como máximo una vez cada
+    CACHE_VERSION_INTERVAL segundos, con una sola consulta.
+    """
+    cache = read_cache()
+    now = time.monotonic()
+    if now - cache.checked_at < cache.version_interval:
+        return
+    with cache.lock:
+        if now - cache.checked_at < cache.version_interval:
+            return
+        cache.checked_at = now
+    for doc in versiones_collection.find():
+        cache.observe(doc['_id'], doc['version'])
+
+def bump_version(name, *ids):
+    """Registra un cambio en la colección e invalida localmente los IDs indicados"""
+    cache = read_cache()
+    for oid in ids:
+        cache.items.invalidate((name, oid))
+    doc = versiones_collection.find_one_and_update(
+        {'_id': name},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    note_own_version(name, doc['version'])
+
+def note_own_version(name, version):
+    """Registra la versión que dejó un cambio propio (devuelta por el $inc)"""
+    cache = read_cache()
+    with cache.lock:
+        # Si nadie más escribió entremedio, esta caché ya está al día
+        if version == cache.known_versions.get(name, 0) + 1:
+            cache.known_versions[name] = version
+
+def find_cached(collection, oid):
+    """Obtiene un documento por _id pasando por la caché (no modificar el resultado)"""
+    sync_versions()
+    items = read_cache().items
+    key = (collection.name, oid)
+    doc = items.get(key)
+    if doc is None:
+        doc = collection.find_one({'_id': oid})
+        if doc is not None:
+            items.set(key, doc)
+    return doc
+
+# ========================================
+# 🏷️ ETAGS Y PETICIONES CONDICIONALES
+# ========================================
+
+def collection_etag(*names):
+    """ETag fuerte a partir de los contadores de cambios de las colecciones.
+
+    Se lee con una sola consulta por _id antes de ejecutar la consulta
+    principal, así un ETag nunca describe datos más nuevos que la respuesta.
+    Si una versión cambió desde la última sincronización de la caché de
+    lectura, se vacía esa colección antes de armar la respuesta: de lo
+    contrario el ETag nuevo saldría con un documento viejo de la caché y
+    las revalidaciones siguientes lo confirmarían con 304.
+    """
+    versions = {
+        doc['_id']: doc['version']
+        for doc in versiones_collection.find({'_id': {'$in': list(names)}})
+    }
+    cache = read_cache()
+    for name in names:
+        cache.observe(name, versions.get(name, 0))
+    tag = '-'.join(f'{name}.{versions.get(name, 0)}' for name in names)
+    # Representaciones distintas de la misma URL necesitan ETags distintos
+    return '-'.join([tag] + representation_formats())
+
+def representation_formats():
+    """Formatos pedidos (streaming y binario) que distinguen la representación en el ETag"""
+    return [fmt for fmt in (stream_format(), binary_format()) if fmt]
+
+def matching_etag(etag):
+    """ETag de If-None-Match que coincide con etag (con o sin la codificación negociada), o None"""
+    candidates = [etag]
+    encoding = accepted_encoding()
+    if encoding is not None:
+        candidates.append(f'{etag}-{encoding}')
+    return next((tag for tag in candidates if request.if_none_match.contains(tag)), None)
+
+def conditional(*names, expand=None):
+    """Decorador para GET: responde 304 si If-None-Match coincide con la versión actual.
+
+    expand asocia valores de ?expand= con las colecciones adicionales de las
+    que depende la respuesta cuando se piden (p. ej. {'cliente': 'clientes'}).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            requested = request.args.get('expand', '').split(',')
+            extra = [expand[item] for item in (expand or {}) if item in requested]
+            etag = collection_etag(*names, *extra)
+            matched = matching_etag(etag)
+            if matched is not None:
+                response = Response(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # compress_response le agrega la codificación si comprime el cuerpo
+                response.set_etag(etag)
+            # El navegador debe revalidar siempre, pero puede reutilizar su copia
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept')
+            if current_app.config['COMPRESSION']:
+                response.vary.add('Accept-Encoding')
+            return response
+        return wrapper
+    return decorator
+
+# ========================================
+# ✅ VALIDACIONES DE DOCUMENTOS NUEVOS
+# ========================================
+
+def prepare_cliente(data):
+    """Valida un cliente nuevo y completa sus valores por defecto; devuelve el error o None"""
+    if not data:
+        return 'No se proporcionaron datos'
+    
+    required_fields = ['nombre', 'apellidos', 'identificador']
+    for field in required_fields:
+        if not data.get(field):
+            return f'El campo {field} es requerido'
+    
+    # Agregar fecha de registro si no existe
+    if 'fechaRegistro' not in data:
+        data['fechaRegistro'] = datetime.now().strftime('%Y-%m-%d')
+    return None
+
+def prepare_producto(data):
+    """Valida un producto nuevo; devuelve el error o None"""
+    if not data:
+        return 'No se proporcionaron datos'
+    
+    required_fields = ['nombre', 'precio', 'stock', 'categoria']
+    for field in required_fields:
+        if field not in data:
+            return f'El campo {field} es requerido'
+    
+    # Validar tipos de datos
+    if not isinstance(data['precio'], (int, float)) or data['precio'] <= 0:
+        return 'El precio debe ser un número positivo'
+    
+    if not isinstance(data['stock'], int) or data['stock'] < 0:
+        return 'El stock debe ser un número entero no negativo'
+    return None
+
+def check_producto_update(data):
+    """Valida los campos de un producto que se actualiza; devuelve el error o None"""
+    if not data:
+        return 'No se proporcionaron datos'
+
+    # Validar tipos de datos si se proporcionan
+    if 'precio' in data:
+        if not isinstance(data['precio'], (int, float)) or data['precio'] <= 0:
+            return 'El precio debe ser un número positivo'
+
+    if 'stock' in data:
+        if not isinstance(data['stock'], int) or data['stock'] < 0:
+            return 'El stock debe ser un número entero no negativo'
+    return None
+
+def normalize_fecha_pedido(data):
+    """Convierte fecha_pedido de texto a fecha; devuelve el error o None.
+
+    MongoDB compara primero por tipo BSON: un texto entre fechas quedaría
+    fuera del $lt/$gt del cursor de GET /pedidos y la paginación lo saltaría.
+    """
+    value = data.get('fecha_pedido')
+    if isinstance(value, str):
+        try:
+            data['fecha_pedido'] = parse_date(value)
+        except ValueError:
+            return 'fecha_pedido debe ser una fecha ISO 8601'
+    elif not isinstance(value, datetime):
+        return 'fecha_pedido debe ser una fecha ISO 8601'
+    return None
+
+def prepare_pedido(data, client_totals=True):
+    """Valida un pedido nuevo y completa total y fecha; devuelve el error o None.
+
+    No verifica que el cliente exista: eso lo hace quien llama, con una
+    consulta por pedido o una sola consulta $in para un lote. Con
+    client_totals=False (modo servidor) los totales del cliente se ignoran,
+    porque place_pedido los recalcula con los precios del catálogo.
+    """
+    if not data:
+        return 'No se proporcionaron datos'
+    
+    required_fields = ['clienteId', 'productos', 'codigo_pedido']
+    for field in required_fields:
+        if not data.get(field):
+            return f'El campo {field} es requerido'
+    
+    if not is_valid_objectid(data['clienteId']):
+        return 'ID de cliente inválido'
+    # Se guarda como ObjectId, igual que en los datos importados
+    data['clienteId'] = ObjectId(data['clienteId'])
+    
+    # Validar productos
+    if not isinstance(data['productos'], list) or len(data['productos']) == 0:
+        return 'Debe incluir al menos un producto'
+    
+    # Calcular total si no se proporciona
+    if client_totals and 'total_compra' not in data:
+        totales = [
+            producto.get('total_comprado', 0) for producto in data['productos'] if isinstance(producto, dict)
+        ]
+        if any(not isinstance(total, (int, float)) or isinstance(total, bool) for total in totales):
+            return 'total_comprado debe ser un número'
+        data['total_compra'] = sum(totales)
+    
+    # Agregar fecha actual si no se proporciona
+    if 'fecha_pedido' not in data:
+        data['fecha_pedido'] = datetime.now(timezone.utc)
+    return normalize_fecha_pedido(data)
+
+def check_pedido_update(data):
+    """Valida los campos de un pedido que se actualiza; devuelve el error o None.
+
+    Convierte clienteId a ObjectId y fecha_pedido a fecha, pero no verifica
+    que el cliente exista: eso lo hace quien llama.
+    """
+    if not data:
+        return 'No se proporcionaron datos'
+
+    # Solo campos de primer nivel: el pedido nuevo se arma sobre el
+    # anterior y una ruta con punto o un operador no se aplicaría igual
+    for field in data:
+        if field == '_id' or '.' in field or field.startswith('$'):
+            return f'Campo no permitido: {field}'
+
+    if 'clienteId' in data:
+        if not is_valid_objectid(data['clienteId']):
+            return 'ID de cliente inválido'
+        data['clienteId'] = ObjectId(data['clienteId'])
+
+    if 'fecha_pedido' in data:
+        return normalize_fecha_pedido(data)
+    return None
+
+# ========================================
+# 📥 INSERCIÓN MASIVA
+# ========================================
+
+MAX_BULK_ITEMS = 10000
+
+def validate_batch(items, prepare):
+    """Valida un lote en memoria; devuelve (error, resultados, índices válidos).
+
+    error es el mensaje si el lote entero es inválido; si no, cada elemento
+    rechazado ya tiene su resultado 400 y el resto queda en los índices válidos.
+    """
+    if not isinstance(items, list) or len(items) == 0:
+        return 'Se esperaba una lista con al menos un elemento', None, None
+    if len(items) > MAX_BULK_ITEMS:
+        return f'El lote no puede superar {MAX_BULK_ITEMS} elementos', None, None
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        error = prepare(item) if isinstance(item, dict) else 'Cada elemento debe ser un objeto'
+        if error:
+            results[index] = {'index': index, 'status': 400, 'error': error}
+        else:
+            valid.append(index)
+    return None, results, valid
+
+def insert_failures(error, duplicate_message):
+    """Errores de un insert_many(ordered=False), por posición entre los documentos enviados"""
+    failed = {}
+    for write_error in error.details['writeErrors']:
+        duplicate = write_error['code'] == 11000
+        failed[write_error['index']] = {
+            'status': 400 if duplicate else 500,
+            'error': duplicate_message if duplicate else write_error['errmsg']
+        }
+    return failed
+
+def finish_batch(items, valid, results, failed):
+    """Completa el resultado de cada elemento enviado; devuelve los documentos insertados"""
+    for position, index in enumerate(valid):
+        if position in failed:
+            results[index] = {'index': index, **failed[position]}
+        else:
+            results[index] = {'index': index, 'status': 201, '_id': items[index]['_id']}
+    return [items[index] for index in valid if results[index]['status'] == 201]
+
+def batch_response(results):
+    """201 si se insertó todo el lote, 207 con el detalle si no"""
+    inserted = sum(1 for result in results if result['status'] == 201)
+    return jsonify({
+        'inserted': inserted,
+        'failed': len(results) - inserted,
+        'results': results
+    }), 201 if inserted == len(results) else 207
+
+def bulk_insert(collection, items, prepare, duplicate_message, existing_clientes=None, after_insert=None):
+    """Valida un lote en memoria y lo inserta con un solo insert_many(ordered=False).
+
+    Devuelve una respuesta con el resultado de cada elemento, en el mismo
+    orden del lote: 201 con su _id o el código y mensaje de error.
+    after_insert recibe la lista de documentos insertados, antes de marcar
+    el cambio de versión de la colección.
+    """
+    error, results, valid = validate_batch(items, prepare)
+    if error:
+        return handle_error(error, 400)
+
+    if existing_clientes is not None:
+        valid = existing_clientes(items, valid, results)
+
+    docs = [items[index] for index in valid]
+    failed = {}
+    if docs:
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = insert_failures(e, duplicate_message)
+
+    inserted = finish_batch(items, valid, results, failed)
+    if inserted:
+        if after_insert is not None:
+            after_insert(inserted)
+        bump_version(collection.name)
+    return batch_response(results)
+
+def batch_cliente_ids(items, valid):
+    """clienteId distintos de los pedidos válidos de un lote"""
+    return list({items[index]['clienteId'] for index in valid})
+
+def keep_existing_clientes(items, valid, results, existing):
+    """Marca con 404 los pedidos cuyo cliente no está en existing; devuelve los que siguen válidos"""
+    still_valid = []
+    for index in valid:
+        if items[index]['clienteId'] in existing:
+            still_valid.append(index)
+        else:
+            results[index] = {'index': index, 'status': 404, 'error': 'Cliente no encontrado'}
+    return still_valid
+
+def check_clientes_exist(items, valid, results):
+    """Verifica con una sola consulta $in que existan los clientes de un lote de pedidos"""
+    existing = {
+        cliente['_id']
+        for cliente in clientes_collection.find({'_id': {'$in': batch_cliente_ids(items, valid)}}, {'_id': 1})
+    }
+    return keep_existing_clientes(items, valid, results, existing)
+
+# ========================================
+# 🔎 PROYECCIÓN DE CAMPOS (?fields=)
+# ========================================
+
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def parse_fields():
+    """Convierte ?fields=a,b (inclusión) o ?fields=-a,-b (exclusión) en una proyección de Mongo.
+
+    Devuelve None si no se pidió proyección; lanza ValueError si no es válida.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    projection = {}
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        exclude = item.startswith('-')
+        field = item[1:] if exclude else item
+        if not FIELD_NAME.match(field):
+            raise ValueError(f'Campo inválido: {field}')
+        projection[field] = 0 if exclude else 1
+    modes = {value for field, value in projection.items() if field != '_id'}
+    if len(modes) > 1:
+        raise ValueError('No se pueden combinar campos incluidos y excluidos')
+    if modes == {0} and projection.get('_id') == 1:
+        # _id ya se incluye por defecto en una proyección de exclusión
+        del projection['_id']
+    return projection or None
+
+def project_doc(doc, projection):
+    """Aplica a un documento ya leído (p. ej. desde la caché) la misma proyección que Mongo"""
+    if not projection or doc is None:
+        return doc
+    if 1 in projection.values():
+        keep = {field for field, value in projection.items() if value == 1}
+        if projection.get('_id', 1):
+            keep.add('_id')
+        return {field: value for field, value in doc.items() if field in keep}
+    return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+def sort_projection(projection, sort_spec):
+    """Agrega a la proyección los campos del orden, que el cursor necesita.
+
+    Devuelve (proyección para Mongo, campos que hay que quitar de la respuesta).
+    """
+    if not projection:
+        return projection, []
+    projection = dict(projection)
+    inclusion = 1 in projection.values()
+    strip = []
+    for field, _ in sort_spec:
+        if projection.get(field) == 0:
+            del projection[field]
+            strip.append(field)
+        elif inclusion and field not in projection:
+            projection[field] = 1
+            strip.append(field)
+    return projection or None, strip
+
+# ========================================
+# 📄 PAGINACIÓN POR CURSOR (KEYSET)
+# ========================================
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Orden estable de cada listado; el último campo siempre es _id para desempatar
+CLIENTES_SORT = [('_id', ASCENDING)]
+PRODUCTOS_SORT = [('_id', ASCENDING)]
+PEDIDOS_SORT = [('fecha_pedido', DESCENDING), ('_id', DESCENDING)]
+
+def encode_cursor(doc, sort_spec):
+    """Genera un cursor opaco con los valores de orden del último documento"""
+    values = {field: doc.get(field) for field, _ in sort_spec}
+    raw = json_util.dumps(values, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(token, sort_spec):
+    """Decodifica un cursor opaco; lanza ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+        values = json_util.loads(raw)
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, dict) or any(field not in values for field, _ in sort_spec):
+        raise ValueError('Cursor inválido')
+    return values
+
+# Orden de los tipos BSON al ordenar (null y ausente van antes que todos).
+# $gt/$lt solo comparan dentro del mismo tipo, así que el cursor agrega los
+# tipos que van después del valor con $type. Solo los que pueden escribir la
+# API y el importador (JSON, ObjectId, fechas y binarios de un volcado BSON).
+BSON_TYPE_ORDER = ['number', 'string', 'object', 'binData', 'objectId', 'bool', 'date']
+
+def bson_type(value):
+    """Alias de $type del valor, o None si no está en BSON_TYPE_ORDER (null, arreglos)"""
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float, Decimal128)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, bytes):
+        return 'binData'
+    if isinstance(value, ObjectId):
+        return 'objectId'
+    if isinstance(value, datetime):
+        return 'date'
+    return None
+
+def after_value(field, direction, value):
+    """Condición de los documentos cuyo field va después de value, o None si ninguno.
+
+    Los campos opcionales o con otro tipo (celdas vacías o columnas de texto
+    del importador) se ordenan por tipo: sin esto, $gt/$lt los saltarían.
+    """
+    ascending = direction == ASCENDING
+    if value is None:
+        # null y ausente van primero: en orden descendente no queda nada después
+        return {field: {'$ne': None}} if ascending else None
+    conditions = [{field: {'$gt' if ascending else '$lt': value}}]
+    alias = bson_type(value)
+    if alias is not None:
+        index = BSON_TYPE_ORDER.index(alias)
+        later = BSON_TYPE_ORDER[index + 1:] if ascending else BSON_TYPE_ORDER[:index]
+        conditions += [{field: {'$type': other}} for other in later]
+    if not ascending and field != '_id':
+        conditions.append({field: None})
+    return conditions[0] if len(conditions) == 1 else {'$or': conditions}
+
+def keyset_filter(sort_spec, values):
+    """Construye el filtro que devuelve los documentos posteriores al cursor"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort_spec):
+        after = after_value(field, direction, values[field])
+        if after is None:
+            continue
+        clause = {prev: values[prev] for prev, _ in sort_spec[:i]}
+        clause.update(after)
+        clauses.append(clause)
+    if not clauses:
+        # El cursor apunta al último documento posible
+        return {'_id': {'$exists': False}}
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+def wants_pagination():
+    """Indica si la petición pide una página (?limit= o ?cursor=)"""
+    return 'limit' in request.args or 'cursor' in request.args
+
+def parse_page_size():
+    """Lee ?limit= y lo acota a MAX_PAGE_SIZE; lanza ValueError si no es válido"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('El parámetro limit debe ser un número entero')
+    if limit <= 0:
+        raise ValueError('El parámetro limit debe ser mayor que 0')
+    return min(limit, MAX_PAGE_SIZE)
+
+def page_query(sort_spec, query=None, projection=None):
+    """Prepara la consulta de una página según ?limit= y ?cursor=.
+
+    Devuelve (filtro, proyección, campos a quitar, límite); lanza ValueError
+    si los parámetros no son válidos.
+    """
+    limit = parse_page_size()
+    projection, strip = sort_projection(projection, sort_spec)
+    query = dict(query or {})
+    token = request.args.get('cursor')
+    if token:
+        after = keyset_filter(sort_spec, decode_cursor(token, sort_spec))
+        query = {'$and': [query, after]} if query else after
+    return query, projection, strip, limit
+
+def find_page(collection, sort_spec, query=None, projection=None):
+    """Obtiene una página con una sola consulta acotada por índice.
+
+    Devuelve (documentos, next_cursor); next_cursor es None en la última página.
+    """
+    query, projection, strip, limit = page_query(sort_spec, query, projection)
+    # Se pide un documento extra para saber si hay página siguiente
+    docs = list(collection.find(query, projection).sort(sort_spec).limit(limit + 1))
+    return finish_page(docs, limit, sort_spec, strip)
+
+def finish_page(docs, limit, sort_spec, strip):
+    """Descarta el documento extra, genera next_cursor y quita los campos agregados para el orden"""
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_spec)
+    if strip:
+        # Se arman dicts nuevos: los RawBSONDocument no se pueden modificar
+        docs = [{field: value for field, value in doc.items() if field not in strip} for doc in docs]
+    return docs, next_cursor
+
+# ========================================
+# 🌊 STREAMING DE LISTADOS (NDJSON / JSON)
+# ========================================
+
+STREAM_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def stream_format():
+    """Devuelve 'ndjson', 'json' o None según ?stream= y el header Accept"""
+    stream = request.args.get('stream', '').lower()
+    if stream in ('1', 'true', 'ndjson'):
+        return 'ndjson'
+    if stream == 'json':
+        return 'json'
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return 'ndjson'
+    return None
+
+def iter_batches(cursor, transform=None):
+    """Agrupa los documentos del cursor en lotes, sin cargarlos todos en memoria.
+
+    transform, si se indica, recibe cada lote de hasta STREAM_BATCH_SIZE
+    documentos antes de entregarlo (p. ej. para resolver referencias con
+    una consulta por lote). Al terminar cierra el cursor.
+    """
+    try:
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= STREAM_BATCH_SIZE:
+                if transform is not None:
+                    transform(batch)
+                yield batch
+                batch = []
+        if batch:
+            if transform is not None:
+                transform(batch)
+            yield batch
+    finally:
+        cursor.close()
+
+def iter_serialized(cursor, transform=None):
+    """Serializa a JSON los documentos del cursor por lotes (ver iter_batches)"""
+    dumps = current_app.json.dumps
+    for batch in iter_batches(cursor, transform):
+        for item in batch:
+            yield dumps(item, separators=(',', ':'))
+
+def stream_response(collection, query=None, fmt='ndjson', projection=None, sort_spec=None, transform=None):
+    """Envía la colección completa en bloques a medida que llega del cursor.
+
+    'ndjson' emite un documento por línea; 'json' emite un array JSON
+    equivalente al listado normal, pero sin construirlo en memoria.
+    'msgpack' y 'bson' emiten los documentos codificados uno tras otro.
+    """
+    cursor = collection.find(query or {}, projection, batch_size=STREAM_BATCH_SIZE)
+    if sort_spec:
+        cursor.sort(sort_spec)
+    if fmt in BINARY_MIMETYPES:
+        packed = (b''.join(pack(doc, fmt) for doc in batch) for batch in iter_batches(cursor, transform))
+        return Response(stream_with_context(packed), mimetype=BINARY_MIMETYPES[fmt])
+
+    def generate():
+        buffer = []
+        first = True
+        if fmt == 'json':
+            yield '['
+        for line in iter_serialized(cursor, transform):
+            if fmt == 'json':
+                buffer.append(line if first else ',' + line)
+                first = False
+            else:
+                buffer.append(line + '\n')
+            if len(buffer) >= STREAM_BATCH_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
+        if fmt == 'json':
+            yield ']'
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    # El contexto se mantiene mientras se envía (transform consulta otras colecciones)
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+def list_response(collection, sort_spec, query=None, ordered=False, transform=None):
+    """Responde un listado: streaming, página con next_cursor o la lista completa (legacy).
+
+    Las páginas siempre siguen sort_spec; el listado completo y el streaming
+    solo cuando ordered es True (p. ej. si el cliente pidió ?sort=).
+    transform recibe cada lista de documentos (página, lote o listado) antes
+    de serializarla. En MessagePack o BSON el listado completo se envía
+    siempre en streaming.
+    """
+    try:
+        projection = parse_fields()
+    except ValueError as e:
+        return handle_error(e, 400)
+    fmt = stream_format()
+    binary = binary_format()
+    if binary == 'bson' and transform is None:
+        collection = raw_collection(collection)
+    if fmt or (binary and not wants_pagination()):
+        return stream_response(collection, query, binary or fmt, projection, sort_spec if ordered else None, transform)
+    if not wants_pagination():
+        cursor = collection.find(query or {}, projection)
+        if ordered:
+            cursor.sort(sort_spec)
+        docs = list(cursor)
+        if transform is not None:
+            transform(docs)
+        return jsonify(docs)
+    try:
+        docs, next_cursor = find_page(collection, sort_spec, query, projection)
+    except ValueError as e:
+        return handle_error(e, 400)
+    if transform is not None:
+        transform(docs)
+    return document_response({'data': docs, 'next_cursor': next_cursor})
+
+# ========================================
+# 📦 FORMATOS BINARIOS (MessagePack / BSON)
+# ========================================
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+BSON_MIMETYPE = 'application/bson'
+BINARY_MIMETYPES = {'msgpack': MSGPACK_MIMETYPE, 'bson': BSON_MIMETYPE}
+# Documentos tal como llegan del servidor: sin construir dicts ni decodificar valores
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+def binary_format():
+    """Devuelve 'msgpack', 'bson' o None (JSON) según el header Accept"""
+    offered = ['application/json', BSON_MIMETYPE]
+    if msgpack is not None:
+        offered.append(MSGPACK_MIMETYPE)
+    best = request.accept_mimetypes.best_match(offered)
+    return 'bson' if best == BSON_MIMETYPE else 'msgpack' if best == MSGPACK_MIMETYPE else None
+
+def raw_collection(collection):
+    """La misma colección, leyendo RawBSONDocument (sus bytes se envían tal cual en BSON)"""
+    return collection.with_options(codec_options=RAW_BSON_OPTIONS)
+
+def msgpack_default(o):
+    """Mismos tipos que el JSON, salvo las fechas: timestamp nativo de MessagePack"""
+    if isinstance(o, datetime):
+        return msgpack.Timestamp.from_datetime(o if o.tzinfo else o.replace(tzinfo=timezone.utc))
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    raise TypeError(f'No se puede serializar {type(o).__name__} en MessagePack')
+
+def pack(obj, fmt):
+    """Codifica un documento; en BSON los RawBSONDocument se copian sin decodificar"""
+    if fmt == 'bson':
+        return obj.raw if isinstance(obj, RawBSONDocument) else encode_bson(obj)
+    return msgpack.packb(obj, default=msgpack_default)
+
+def document_response(doc):
+    """Responde un documento (o una página {data, next_cursor}) en el formato pedido"""
+    fmt = binary_format()
+    if fmt is None:
+        return jsonify(doc)
+    with metrics.serializing():
+        body = pack(doc, fmt)
+    return Response(body, mimetype=BINARY_MIMETYPES[fmt])
+
+def documents_response(docs):
+    """Responde una lista: array JSON o, en formato binario, los documentos uno tras otro"""
+    fmt = binary_format()
+    if fmt is None:
+        return jsonify(docs)
+    with metrics.serializing():
+        body = b''.join(pack(doc, fmt) for doc in docs)
+    return Response(body, mimetype=BINARY_MIMETYPES[fmt])
+
+def find_by_id(collection, oid, projection=None):
+    """Documento por _id: en BSON se lee crudo; si no, pasa por la caché de lectura"""
+    if binary_format() == 'bson':
+        return raw_collection(collection).find_one({'_id': oid}, projection)
+    return project_doc(find_cached(collection, oid), projection)
+
+# ========================================
+# 🗜️ COMPRESIÓN DE RESPUESTAS (Accept-Encoding)
+# ========================================
+
+# Ajuste con el nivel de cada codificación
+COMPRESSION_LEVEL_SETTINGS = {'gzip': 'GZIP_LEVEL', 'zstd': 'ZSTD_LEVEL', 'br': 'BROTLI_LEVEL'}
+COMPRESSIBLE_MIMETYPES = {'application/json', NDJSON_MIMETYPE, MSGPACK_MIMETYPE, BSON_MIMETYPE, 'text/html', 'text/plain'}
+
+def accepted_encoding():
+    """Codificación negociada con Accept-Encoding, o None si no se comprime"""
+    if not current_app.config['COMPRESSION']:
+        return None
+    return compression.negotiate(request.accept_encodings)
+
+def compression_level(encoding):
+    return current_app.config[COMPRESSION_LEVEL_SETTINGS[encoding]]
+
+# Se registra después de record_metrics, así que corre antes: la latencia incluye comprimir
+@api.after_app_request
+def compress_response(response):
+    """Comprime las respuestas JSON y de texto si el cliente lo acepta.
+
+    Los cuerpos completos se comprimen solo desde COMPRESSION_MIN_SIZE bytes;
+    los streaming siempre, bloque por bloque, sin acumular la respuesta.
+    """
+    config = current_app.config
+    if (not config['COMPRESSION'] or response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    level = compression_level(encoding)
+    if response.is_streamed:
+        response.response = compression.CompressedChunks(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        response.set_data(compression.compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    # Cada codificación es otra representación: necesita su propio ETag fuerte
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
 # ========================================
 # 🏠 RUTA PRINCIPAL
 # ========================================
 
-@app.route('/')
+@api.route('/')
 def home():
     """Página principal con documentación de la API"""
     return '''
@@ -154,16 +1162,24 @@ def home():
             <h3>👥 Clientes</h3>
             <div class="endpoint">
                 <span class="method get">GET</span> 
-                <strong>/clientes</strong> - Obtener todos los clientes
+                <strong>/clientes</strong> - Obtener todos los clientes (<code>?limit=&amp;cursor=</code> para paginar, <code>?stream=1</code> para NDJSON)
             </div>
             <div class="endpoint">
                 <span class="method post">POST</span> 
                 <strong>/clientes</strong> - Crear nuevo cliente
             </div>
+            <div class="endpoint">
+                <span class="method post">POST</span> 
+                <strong>/clientes/bulk</strong> - Crear clientes en lote (lista JSON)
+            </div>
             <div class="endpoint">
                 <span class="method get">GET</span> 
                 <strong>/clientes/&lt;id&gt;</strong> - Obtener cliente por ID
             </div>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/clientes/&lt;id&gt;/pedidos</strong> - Historial de pedidos del cliente (<code>?limit=&amp;cursor=&amp;expand=productos</code>)
+            </div>
             <div class="endpoint">
                 <span class="method put">PUT</span> 
                 <strong>/clientes/&lt;id&gt;</strong> - Actualizar cliente
@@ -176,12 +1192,20 @@ def home():
             <h3>📦 Productos</h3>
             <div class="endpoint">
                 <span class="method get">GET</span> 
-                <strong>/productos</strong> - Obtener todos los productos
+                <strong>/productos</strong> - Obtener todos los productos (<code>?limit=&amp;cursor=</code> para paginar, <code>?stream=1</code> para NDJSON; filtros <code>?categoria=&amp;precio_min=&amp;precio_max=&amp;stock_min=</code> y <code>?sort=precio:-1</code>)
             </div>
             <div class="endpoint">
                 <span class="method post">POST</span> 
                 <strong>/productos</strong> - Crear nuevo producto
             </div>
+            <div class="endpoint">
+                <span class="method post">POST</span> 
+                <strong>/productos/bulk</strong> - Crear productos en lote (lista JSON)
+            </div>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/productos/search?q=</strong> - Buscar productos por texto (con o sin tildes)
+            </div>
             <div class="endpoint">
                 <span class="method get">GET</span> 
                 <strong>/productos/&lt;id&gt;</strong> - Obtener producto por ID
@@ -198,11 +1222,15 @@ def home():
             <h3>🛒 Pedidos</h3>
             <div class="endpoint">
                 <span class="method get">GET</span> 
-                <strong>/pedidos</strong> - Obtener todos los pedidos
+                <strong>/pedidos</strong> - Obtener todos los pedidos (<code>?limit=&amp;cursor=</code> para paginar, <code>?stream=1</code> para NDJSON, <code>?expand=cliente,productos</code> para incluir referencias)
             </div>
             <div class="endpoint">
                 <span class="method post">POST</span> 
-                <strong>/pedidos</strong> - Crear nuevo pedido
+                <strong>/pedidos</strong> - Crear nuevo pedido (<code>?modo=servidor</code> calcula precios y descuenta stock)
+            </div>
+            <div class="endpoint">
+                <span class="method post">POST</span> 
+                <strong>/pedidos/bulk</strong> - Crear pedidos en lote (lista JSON)
             </div>
             <div class="endpoint">
                 <span class="method get">GET</span> 
@@ -217,11 +1245,34 @@ def home():
                 <strong>/pedidos/&lt;id&gt;</strong> - Eliminar pedido
             </div>
             
+            <h3>📊 Reportes</h3>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/reportes/ventas</strong> - Ventas por día, producto o categoría (<code>?desde=&amp;hasta=&amp;agrupar=dia|producto|categoria</code>)
+            </div>
+            
             <h3>🔧 Utilidades</h3>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/health</strong> - Liveness (no consulta la base de datos)
+            </div>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/ready</strong> - Readiness (ping a MongoDB e índices únicos)
+            </div>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/metrics</strong> - Métricas de peticiones y MongoDB (formato Prometheus)
+            </div>
             <div class="endpoint">
                 <span class="method get">GET</span> 
                 <strong>/debug</strong> - Información de debug y estadísticas
             </div>
+            <p>💡 Todas las rutas GET aceptan <code>?fields=nombre,precio</code> o <code>?fields=-productos</code> para elegir los campos devueltos.</p>
+            <div class="endpoint">
+                <span class="method get">GET</span> 
+                <strong>/debug/cache</strong> - Aciertos y fallos de la caché de lectura
+            </div>
             
             <div class="footer">
                 <p>💻 Desarrollado para ComercioTech</p>
@@ -232,72 +1283,161 @@ def home():
     </html>
     '''
 
+# ========================================
+# 🔗 EXPANSIÓN DE REFERENCIAS (?expand=)
+# ========================================
+
+# Campos de producto que se incrustan con ?expand=productos
+PRODUCTO_SUMMARY_FIELDS = {'nombre': 1, 'precio': 1, 'stock': 1, 'categoria': 1}
+# Campos de cliente que se incrustan con ?expand=cliente
+CLIENTE_SUMMARY_FIELDS = {'nombre': 1, 'apellidos': 1, 'identificador': 1}
+
+def parse_expand(allowed):
+    """Lee ?expand=a,b y valida que cada valor esté permitido; lanza ValueError si no"""
+    raw = request.args.get('expand', '')
+    expand = {item.strip() for item in raw.split(',') if item.strip()}
+    invalid = expand - set(allowed)
+    if invalid:
+        raise ValueError(f'No se puede expandir: {", ".join(sorted(invalid))}')
+    return expand
+
+def as_objectid(value):
+    """Devuelve el ObjectId de un valor (ObjectId o string válido) o None"""
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return None
+
+def expand_productos(pedidos):
+    """Incrusta los datos actuales de cada producto en las líneas de los pedidos.
+
+    Resuelve todos los productos de la página con una sola consulta $in;
+    las líneas cuyo producto ya no existe quedan con producto: None.
+    """
+    lineas = [
+        linea for pedido in pedidos if isinstance(pedido.get('productos'), list)
+        for linea in pedido['productos'] if isinstance(linea, dict)
+    ]
+    producto_ids = {as_objectid(linea.get('productoId')) for linea in lineas}
+    producto_ids.discard(None)
+    productos = {}
+    if producto_ids:
+        productos = {
+            producto['_id']: producto
+            for producto in productos_collection.find({'_id': {'$in': list(producto_ids)}}, PRODUCTO_SUMMARY_FIELDS)
+        }
+    for linea in lineas:
+        linea['producto'] = productos.get(as_objectid(linea.get('productoId')))
+    return pedidos
+
+def expand_clientes(pedidos):
+    """Incrusta {nombre, apellidos, identificador} del cliente en cada pedido.
+
+    Resuelve los clienteId distintos de la página con una sola consulta $in
+    proyectada; un pedido cuyo cliente ya no existe queda con cliente: None.
+    """
+    cliente_ids = {as_objectid(pedido.get('clienteId')) for pedido in pedidos}
+    cliente_ids.discard(None)
+    clientes = {}
+    if cliente_ids:
+        clientes = {
+            cliente['_id']: cliente
+            for cliente in clientes_collection.find({'_id': {'$in': list(cliente_ids)}}, CLIENTE_SUMMARY_FIELDS)
+        }
+    for pedido in pedidos:
+        if 'clienteId' in pedido:
+            pedido['cliente'] = clientes.get(as_objectid(pedido['clienteId']))
+    return pedidos
+
+def pedido_expander(expand):
+    """Devuelve la transformación de listados que aplica las expansiones pedidas"""
+    if not expand:
+        return None
+
+    def transform(pedidos):
+        if 'cliente' in expand:
+            expand_clientes(pedidos)
+        if 'productos' in expand:
+            expand_productos(pedidos)
+        return pedidos
+    return transform
+
 # ========================================
 # 👥 RUTAS DE CLIENTES
 # ========================================
 
-@app.route('/clientes', methods=['GET'])
+@api.route('/clientes', methods=['GET'])
+@conditional('clientes')
 def get_clientes():
-    """Obtener todos los clientes"""
+    """Obtener clientes (lista completa, paginada con ?limit=&cursor= o en streaming con ?stream=)"""
     try:
-        clientes = list(clientes_collection.find())
-        return jsonify(serialize_doc(clientes))
+        return list_response(clientes_collection, CLIENTES_SORT)
     except Exception as e:
         return handle_error(e)
 
-@app.route('/clientes', methods=['POST'])
+@api.route('/clientes', methods=['POST'])
 def create_cliente():
     """Crear nuevo cliente"""
     try:
         data = request.get_json()
         
-        # Validaciones básicas
-        if not data:
-            return handle_error('No se proporcionaron datos', 400)
-        
-        required_fields = ['nombre', 'apellidos', 'identificador']
-        for field in required_fields:
-            if not data.get(field):
-                return handle_error(f'El campo {field} es requerido', 400)
+        # Validaciones básicas y valores por defecto
+        error = prepare_cliente(data)
+        if error:
+            return handle_error(error, 400)
         
-        # Verificar que no existe un cliente con el mismo identificador
-        existing = clientes_collection.find_one({'identificador': data['identificador']})
-        if existing:
+        # Insertar cliente (el índice único rechaza identificadores repetidos)
+        try:
+            clientes_collection.insert_one(data)
+        except DuplicateKeyError:
             return handle_error('Ya existe un cliente con ese identificador', 400)
         
-        # Agregar fecha de registro si no existe
-        if 'fechaRegistro' not in data:
-            data['fechaRegistro'] = datetime.now().strftime('%Y-%m-%d')
+        bump_version('clientes')
         
-        # Insertar cliente
-        result = clientes_collection.insert_one(data)
-        
-        # Obtener cliente creado
-        cliente = clientes_collection.find_one({'_id': result.inserted_id})
-        
-        return jsonify(serialize_doc(cliente)), 201
+        # insert_one agrega el _id generado al documento insertado
+        return jsonify(data), 201
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/clientes/<cliente_id>', methods=['GET'])
+@api.route('/clientes/bulk', methods=['POST'])
+def create_clientes_bulk():
+    """Crear clientes en lote con un solo insert_many"""
+    try:
+        return bulk_insert(
+            clientes_collection,
+            request.get_json(),
+            prepare_cliente,
+            'Ya existe un cliente con ese identificador'
+        )
+    except Exception as e:
+        return handle_error(e)
+
+@api.route('/clientes/<cliente_id>', methods=['GET'])
+@conditional('clientes')
 def get_cliente(cliente_id):
     """Obtener cliente por ID"""
     try:
         if not is_valid_objectid(cliente_id):
             return handle_error('ID de cliente inválido', 400)
         
-        cliente = clientes_collection.find_one({'_id': ObjectId(cliente_id)})
+        try:
+            projection = parse_fields()
+        except ValueError as e:
+            return handle_error(e, 400)
+        
+        cliente = find_by_id(clientes_collection, ObjectId(cliente_id), projection)
         
         if not cliente:
             return handle_error('Cliente no encontrado', 404)
         
-        return jsonify(serialize_doc(cliente))
+        return document_response(cliente)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/clientes/<cliente_id>', methods=['PUT'])
+@api.route('/clientes/<cliente_id>', methods=['PUT'])
 def update_cliente(cliente_id):
     """Actualizar cliente"""
     try:
@@ -309,41 +1449,35 @@ def update_cliente(cliente_id):
         if not data:
             return handle_error('No se proporcionaron datos', 400)
         
-        # Verificar que el cliente existe
-        cliente = clientes_collection.find_one({'_id': ObjectId(cliente_id)})
-        if not cliente:
-            return handle_error('Cliente no encontrado', 404)
-        
-        # Si se está actualizando el identificador, verificar que no exista otro con el mismo
-        if 'identificador' in data and data['identificador'] != cliente.get('identificador'):
-            existing = clientes_collection.find_one({'identificador': data['identificador']})
-            if existing:
-                return handle_error('Ya existe un cliente con ese identificador', 400)
+        # Actualizar cliente (el índice único rechaza identificadores repetidos)
+        try:
+            cliente_actualizado = clientes_collection.find_one_and_update(
+                {'_id': ObjectId(cliente_id)},
+                {'$set': data},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return handle_error('Ya existe un cliente con ese identificador', 400)
         
-        # Actualizar cliente
-        result = clientes_collection.update_one(
-            {'_id': ObjectId(cliente_id)},
-            {'$set': data}
-        )
+        if not cliente_actualizado:
+            return handle_error('Cliente no encontrado', 404)
         
-        # Obtener cliente actualizado
-        cliente_actualizado = clientes_collection.find_one({'_id': ObjectId(cliente_id)})
+        bump_version('clientes', cliente_actualizado['_id'])
         
-        return jsonify(serialize_doc(cliente_actualizado))
+        return jsonify(cliente_actualizado)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/clientes/<cliente_id>', methods=['DELETE'])
+@api.route('/clientes/<cliente_id>', methods=['DELETE'])
 def delete_cliente(cliente_id):
     """Eliminar cliente"""
     try:
         if not is_valid_objectid(cliente_id):
             return handle_error('ID de cliente inválido', 400)
         
-        # Verificar que no tenga pedidos asociados
-        pedidos = pedidos_collection.find({'clienteId': ObjectId(cliente_id)})
-        if pedidos_collection.count_documents({'clienteId': ObjectId(cliente_id)}) > 0:
+        # Verificar que no tenga pedidos asociados (basta con encontrar uno en el índice)
+        if pedidos_collection.find_one({'clienteId': ObjectId(cliente_id)}, {'_id': 1}):
             return handle_error('No se puede eliminar el cliente porque tiene pedidos asociados', 400)
         
         result = clientes_collection.delete_one({'_id': ObjectId(cliente_id)})
@@ -351,75 +1485,231 @@ def delete_cliente(cliente_id):
         if result.deleted_count == 0:
             return handle_error('Cliente no encontrado', 404)
         
+        bump_version('clientes', ObjectId(cliente_id))
+        
         return jsonify({'message': 'Cliente eliminado exitosamente'})
         
     except Exception as e:
         return handle_error(e)
 
+@api.route('/clientes/<cliente_id>/pedidos', methods=['GET'])
+@conditional('pedidos', expand={'productos': 'productos'})
+def get_cliente_pedidos(cliente_id):
+    """Historial de pedidos de un cliente, del más reciente al más antiguo (?limit=&cursor=&expand=productos)"""
+    try:
+        if not is_valid_objectid(cliente_id):
+            return handle_error('ID de cliente inválido', 400)
+        
+        if not find_cached(clientes_collection, ObjectId(cliente_id)):
+            return handle_error('Cliente no encontrado', 404)
+        
+        # El índice {clienteId, fecha_pedido, _id} resuelve filtro, orden y cursor
+        try:
+            expand = parse_expand({'productos'})
+            projection = parse_fields()
+            collection = pedidos_collection
+            if binary_format() == 'bson' and 'productos' not in expand:
+                collection = raw_collection(collection)
+            pedidos, next_cursor = find_page(
+                collection, PEDIDOS_SORT, {'clienteId': ObjectId(cliente_id)}, projection
+            )
+        except ValueError as e:
+            return handle_error(e, 400)
+        
+        if 'productos' in expand:
+            expand_productos(pedidos)
+        
+        return document_response({'data': pedidos, 'next_cursor': next_cursor})
+        
+    except Exception as e:
+        return handle_error(e)
+
+# ========================================
+# 🔍 FILTROS Y ORDEN DE PRODUCTOS
+# ========================================
+
+# Campos por los que se puede ordenar (?sort=precio:-1,nombre); cada uno
+# necesita su índice (campo, _id) en indexes.py
+PRODUCTOS_SORT_FIELDS = {'nombre', 'precio', 'stock', 'categoria'}
+
+def parse_number(name, cast=float):
+    """Lee un parámetro numérico opcional; lanza ValueError si no es válido"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f'El parámetro {name} debe ser numérico')
+
+def parse_sort(allowed, default):
+    """Convierte ?sort=campo:dirección,... en un sort_spec que termina en _id"""
+    raw = request.args.get('sort')
+    if not raw:
+        return default
+    sort_spec = []
+    for item in raw.split(','):
+        field, _, direction = item.strip().partition(':')
+        if field not in allowed:
+            raise ValueError(f'No se puede ordenar por {field}')
+        if direction not in ('', '1', '-1'):
+            raise ValueError('La dirección de orden debe ser 1 o -1')
+        if field not in dict(sort_spec):
+            sort_spec.append((field, DESCENDING if direction == '-1' else ASCENDING))
+    # _id desempata para que el cursor sea estable
+    sort_spec.append(('_id', sort_spec[-1][1]))
+    return sort_spec
+
+def parse_productos_filter():
+    """Construye el filtro de Mongo a partir de categoria, precio_min, precio_max y stock_min"""
+    query = {}
+    categoria = request.args.get('categoria')
+    if categoria:
+        categorias = [c.strip() for c in categoria.split(',') if c.strip()]
+        query['categoria'] = categorias[0] if len(categorias) == 1 else {'$in': categorias}
+
+    precio_min = parse_number('precio_min')
+    precio_max = parse_number('precio_max')
+    if precio_min is not None or precio_max is not None:
+        query['precio'] = {}
+        if precio_min is not None:
+            query['precio']['$gte'] = precio_min
+        if precio_max is not None:
+            query['precio']['$lte'] = precio_max
+
+    stock_min = parse_number('stock_min', int)
+    if stock_min is not None:
+        query['stock'] = {'$gte': stock_min}
+    return query
+
+# ========================================
+# 🔎 BÚSQUEDA DE PRODUCTOS
+# ========================================
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_LENGTH = 200
+
+def search_productos(q, limit, projection=None, query=None, collection=productos_collection):
+    """Busca productos con el índice de texto y los devuelve ordenados por relevancia.
+
+    El índice usa el idioma español (raíces de palabras) y la versión 3 de
+    índices de texto de MongoDB, que ignora tildes y mayúsculas.
+    """
+    text_query = {'$text': {'$search': q}}
+    if query:
+        text_query.update(query)
+    projection = dict(projection or {})
+    projection['score'] = {'$meta': 'textScore'}
+    return list(
+        collection.find(text_query, projection)
+        .sort([('score', {'$meta': 'textScore'})])
+        .limit(limit)
+    )
+
 # ========================================
 # 📦 RUTAS DE PRODUCTOS
 # ========================================
 
-@app.route('/productos', methods=['GET'])
+@api.route('/productos', methods=['GET'])
+@conditional('productos')
 def get_productos():
-    """Obtener todos los productos"""
+    """Obtener productos, con filtros (?categoria=, ?precio_min=, ?precio_max=, ?stock_min=) y ?sort="""
     try:
-        productos = list(productos_collection.find())
-        return jsonify(serialize_doc(productos))
+        try:
+            query = parse_productos_filter()
+            sort_spec = parse_sort(PRODUCTOS_SORT_FIELDS, PRODUCTOS_SORT)
+        except ValueError as e:
+            return handle_error(e, 400)
+        return list_response(productos_collection, sort_spec, query, ordered='sort' in request.args)
     except Exception as e:
         return handle_error(e)
 
-@app.route('/productos', methods=['POST'])
+@api.route('/productos/search', methods=['GET'])
+@conditional('productos')
+def search_productos_route():
+    """Buscar productos por texto (?q=), con o sin tildes, ordenados por relevancia"""
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return handle_error('El parámetro q es requerido', 400)
+        if len(q) > MAX_SEARCH_LENGTH:
+            return handle_error(f'La búsqueda no puede superar {MAX_SEARCH_LENGTH} caracteres', 400)
+        
+        try:
+            limit = parse_number('limit', int)
+            projection = parse_fields()
+            query = parse_productos_filter()
+        except ValueError as e:
+            return handle_error(e, 400)
+        if limit is None:
+            limit = DEFAULT_SEARCH_LIMIT
+        if limit <= 0:
+            return handle_error('El parámetro limit debe ser mayor que 0', 400)
+        
+        collection = raw_collection(productos_collection) if binary_format() == 'bson' else productos_collection
+        return documents_response(search_productos(q, min(limit, MAX_SEARCH_LIMIT), projection, query, collection))
+        
+    except Exception as e:
+        return handle_error(e)
+
+@api.route('/productos', methods=['POST'])
 def create_producto():
     """Crear nuevo producto"""
     try:
         data = request.get_json()
         
         # Validaciones básicas
-        if not data:
-            return handle_error('No se proporcionaron datos', 400)
-        
-        required_fields = ['nombre', 'precio', 'stock', 'categoria']
-        for field in required_fields:
-            if field not in data:
-                return handle_error(f'El campo {field} es requerido', 400)
-        
-        # Validar tipos de datos
-        if not isinstance(data['precio'], (int, float)) or data['precio'] <= 0:
-            return handle_error('El precio debe ser un número positivo', 400)
-        
-        if not isinstance(data['stock'], int) or data['stock'] < 0:
-            return handle_error('El stock debe ser un número entero no negativo', 400)
+        error = prepare_producto(data)
+        if error:
+            return handle_error(error, 400)
         
-        # Insertar producto
-        result = productos_collection.insert_one(data)
+        # Insertar producto (insert_one agrega el _id generado a data)
+        productos_collection.insert_one(data)
+        bump_version('productos')
         
-        # Obtener producto creado
-        producto = productos_collection.find_one({'_id': result.inserted_id})
-        
-        return jsonify(serialize_doc(producto)), 201
+        return jsonify(data), 201
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/productos/<producto_id>', methods=['GET'])
+@api.route('/productos/bulk', methods=['POST'])
+def create_productos_bulk():
+    """Crear productos en lote con un solo insert_many"""
+    try:
+        return bulk_insert(
+            productos_collection,
+            request.get_json(),
+            prepare_producto,
+            'Producto duplicado'
+        )
+    except Exception as e:
+        return handle_error(e)
+
+@api.route('/productos/<producto_id>', methods=['GET'])
+@conditional('productos')
 def get_producto(producto_id):
     """Obtener producto por ID"""
     try:
         if not is_valid_objectid(producto_id):
             return handle_error('ID de producto inválido', 400)
         
-        producto = productos_collection.find_one({'_id': ObjectId(producto_id)})
+        try:
+            projection = parse_fields()
+        except ValueError as e:
+            return handle_error(e, 400)
+        
+        producto = find_by_id(productos_collection, ObjectId(producto_id), projection)
         
         if not producto:
             return handle_error('Producto no encontrado', 404)
         
-        return jsonify(serialize_doc(producto))
+        return document_response(producto)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/productos/<producto_id>', methods=['PUT'])
+@api.route('/productos/<producto_id>', methods=['PUT'])
 def update_producto(producto_id):
     """Actualizar producto"""
     try:
@@ -428,36 +1718,29 @@ def update_producto(producto_id):
         
         data = request.get_json()
         
-        if not data:
-            return handle_error('No se proporcionaron datos', 400)
-        
         # Validar tipos de datos si se proporcionan
-        if 'precio' in data:
-            if not isinstance(data['precio'], (int, float)) or data['precio'] <= 0:
-                return handle_error('El precio debe ser un número positivo', 400)
-        
-        if 'stock' in data:
-            if not isinstance(data['stock'], int) or data['stock'] < 0:
-                return handle_error('El stock debe ser un número entero no negativo', 400)
+        error = check_producto_update(data)
+        if error:
+            return handle_error(error, 400)
         
-        # Actualizar producto
-        result = productos_collection.update_one(
+        # Actualizar producto y obtener el resultado en la misma operación
+        producto = productos_collection.find_one_and_update(
             {'_id': ObjectId(producto_id)},
-            {'$set': data}
+            {'$set': data},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if not producto:
             return handle_error('Producto no encontrado', 404)
         
-        # Obtener producto actualizado
-        producto = productos_collection.find_one({'_id': ObjectId(producto_id)})
+        bump_version('productos', producto['_id'])
         
-        return jsonify(serialize_doc(producto))
+        return jsonify(producto)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/productos/<producto_id>', methods=['DELETE'])
+@api.route('/productos/<producto_id>', methods=['DELETE'])
 def delete_producto(producto_id):
     """Eliminar producto"""
     try:
@@ -469,97 +1752,320 @@ def delete_producto(producto_id):
         if result.deleted_count == 0:
             return handle_error('Producto no encontrado', 404)
         
+        bump_version('productos', ObjectId(producto_id))
+        
         return jsonify({'message': 'Producto eliminado exitosamente'})
         
     except Exception as e:
         return handle_error(e)
 
+# ========================================
+# 📊 RESUMEN DE VENTAS
+# ========================================
+
+def record_ventas(cambios):
+    """Actualiza ventas_rollup con (pedido, signo); un fallo no afecta al pedido.
+
+    Se llama antes de bump_version('pedidos'): el ETag de /reportes/ventas
+    depende de esa versión, y un reporte leído entre la versión nueva y el
+    resumen viejo quedaría confirmado con 304. Si el resumen queda
+    desalineado se corrige con python ventas_rollup.py
+    """
+    try:
+        update_rollup(get_mongo().db, cambios)
+    except Exception as e:
+        print(f"⚠️ No se pudo actualizar el resumen de ventas: {e}")
+
+# ========================================
+# 🧾 COLOCACIÓN ATÓMICA DE PEDIDOS
+# ========================================
+
+# Prefijo de la marca que deja reserve_stock fuera de una transacción
+RESERVA_PREFIX = '_reserva_'
+
+# Campos del catálogo con los que se arma un pedido en modo servidor
+PEDIDO_PRODUCTO_FIELDS = {'nombre': 1, 'precio': 1, 'stock': 1}
+
+class PedidoError(Exception):
+    """Error de negocio al colocar un pedido, con su código HTTP"""
+
+    def __init__(self, message, code=400):
+        super().__init__(message)
+        self.code = code
+
+def supports_transactions():
+    """Las transacciones requieren un replica set, un clúster shardeado o un balanceador"""
+    topology = get_mongo().client.topology_description.topology_type_name
+    return topology in ('ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced')
+
+def group_line_items(productos):
+    """Valida las líneas del pedido y agrupa cantidades por productoId"""
+    cantidades = {}
+    for item in productos:
+        producto_id = item.get('productoId') if isinstance(item, dict) else None
+        if not producto_id or not is_valid_objectid(producto_id):
+            raise PedidoError('ID de producto inválido')
+        cantidad = item.get('cantidad', 1)
+        if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0:
+            raise PedidoError('La cantidad debe ser un número entero positivo')
+        oid = ObjectId(producto_id)
+        cantidades[oid] = cantidades.get(oid, 0) + cantidad
+    return cantidades
+
+def release_operations(cantidades):
+    """UpdateOne que devuelven al stock las cantidades indicadas"""
+    return [UpdateOne({'_id': oid}, {'$inc': {'stock': cantidad}}) for oid, cantidad in cantidades.items()]
+
+def reserve_operations(cantidades, marca=None):
+    """UpdateOne que descuentan cada línea solo si queda stock suficiente (ver reserve_stock)"""
+    operations = []
+    for oid, cantidad in cantidades.items():
+        update = {'$inc': {'stock': -cantidad}}
+        if marca:
+            update['$set'] = {marca: cantidad}
+        operations.append(UpdateOne({'_id': oid, 'stock': {'$gte': cantidad}}, update))
+    return operations
+
+def unreserve_operations(cantidades, marca):
+    """UpdateOne que devuelven exactamente las líneas que reserve_operations marcó"""
+    return [
+        UpdateOne({'_id': oid, marca: {'$exists': True}}, {'$inc': {'stock': cantidad}, '$unset': {marca: ''}})
+        for oid, cantidad in cantidades.items()
+    ]
+
+def new_reserva():
+    """Campo de marca único para las líneas de un pedido (fuera de una transacción)"""
+    return f'{RESERVA_PREFIX}{ObjectId()}'
+
+def release_stock(cantidades, session=None):
+    """Devuelve al stock las cantidades indicadas en un solo bulk_write"""
+    if cantidades:
+        productos_collection.bulk_write(release_operations(cantidades), ordered=False, session=session)
+
+def stock_problem(cantidades, stocks):
+    """PedidoError para un descuento que no coincidió, con el stock actual de cada producto"""
+    # El producto se pudo eliminar entre la lectura y la escritura
+    if len(stocks) < len(cantidades):
+        return PedidoError('Producto no encontrado', 404)
+    faltante = next((oid for oid, cantidad in cantidades.items() if stocks[oid] < cantidad), None)
+    if faltante is None:
+        return PedidoError('Stock insuficiente', 409)
+    return PedidoError(f'Stock insuficiente para el producto {faltante}', 409)
+
+def stock_error(cantidades, session=None):
+    """PedidoError para un descuento que no coincidió: 404 si falta un producto, si no 409"""
+    stocks = {
+        producto['_id']: producto.get('stock', 0)
+        for producto in productos_collection.find({'_id': {'$in': list(cantidades)}}, {'stock': 1}, session=session)
+    }
+    return stock_problem(cantidades, stocks)
+
+def reserve_stock(cantidades, session=None):
+    """Descuenta el stock de todas las líneas en un solo bulk_write.
+
+    Cada update solo coincide si el producto existe y le queda stock
+    suficiente: si matched_count no cubre todas las líneas se rechaza el
+    pedido. Dentro de una transacción el abort deshace los descuentos. Fuera
+    de ella el resultado del bulk no dice qué líneas coincidieron, así que
+    cada descuento deja una marca con un token del pedido: un segundo
+    update borra las marcas si todo coincidió, o un bulk_write devuelve
+    exactamente las líneas marcadas si no.
+    """
+    marca = None if session is not None else new_reserva()
+    operations = reserve_operations(cantidades, marca)
+    result = productos_collection.bulk_write(operations, ordered=False, session=session)
+
+    if result.matched_count == len(operations):
+        if marca:
+            productos_collection.update_many({'_id': {'$in': list(cantidades)}}, {'$unset': {marca: ''}})
+        return
+
+    if marca:
+        productos_collection.bulk_write(unreserve_operations(cantidades, marca), ordered=False)
+    raise stock_error(cantidades, session)
+
+def write_pedido(pedido, cantidades, session=None):
+    """Descuenta stock e inserta el pedido; revierte el stock si el insert falla"""
+    reserve_stock(cantidades, session)
+    try:
+        pedidos_collection.insert_one(pedido, session=session)
+    except DuplicateKeyError:
+        if session is None:
+            release_stock(cantidades)
+        raise PedidoError('Ya existe un pedido con ese código', 400)
+
+def build_pedido(data, cantidades, productos):
+    """Arma el pedido con los precios del catálogo a partir de los productos leídos.
+
+    productos asocia cada ObjectId con su documento (PEDIDO_PRODUCTO_FIELDS).
+    Rechaza temprano los productos que faltan o sin stock con los datos ya
+    leídos; el descuento de stock vuelve a verificarlo.
+    """
+    faltantes = [str(oid) for oid in cantidades if oid not in productos]
+    if faltantes:
+        raise PedidoError(f'Productos no encontrados: {", ".join(faltantes)}', 404)
+
+    for oid, cantidad in cantidades.items():
+        if productos[oid].get('stock', 0) < cantidad:
+            raise PedidoError(f'Stock insuficiente para {productos[oid].get("nombre", oid)}', 409)
+
+    lineas = []
+    for oid, cantidad in cantidades.items():
+        precio = productos[oid]['precio']
+        lineas.append({
+            'productoId': oid,
+            'nombre': productos[oid].get('nombre'),
+            'cantidad': cantidad,
+            'precio_unitario': precio,
+            'total_comprado': precio * cantidad
+        })
+
+    pedido = dict(data)
+    pedido['productos'] = lineas
+    pedido['total_compra'] = sum(linea['total_comprado'] for linea in lineas)
+    if 'fecha_pedido' not in pedido:
+        pedido['fecha_pedido'] = datetime.now(timezone.utc)
+    error = normalize_fecha_pedido(pedido)
+    if error:
+        raise PedidoError(error)
+    return pedido
+
+def place_pedido(data):
+    """Coloca un pedido con precios del catálogo y descuento de stock.
+
+    Usa un número constante de consultas sin importar la cantidad de líneas:
+    un $in para resolver los productos, un bulk_write para el stock y el
+    insert del pedido, dentro de una transacción si el servidor lo permite
+    (sin transacción, un update más para limpiar las marcas de reserve_stock).
+    """
+    cantidades = group_line_items(data['productos'])
+    productos = {
+        producto['_id']: producto
+        for producto in productos_collection.find({'_id': {'$in': list(cantidades)}}, PEDIDO_PRODUCTO_FIELDS)
+    }
+    pedido = build_pedido(data, cantidades, productos)
+
+    try:
+        if supports_transactions():
+            with get_mongo().client.start_session() as session:
+                session.with_transaction(lambda s: write_pedido(pedido, cantidades, s))
+        else:
+            write_pedido(pedido, cantidades)
+    finally:
+        # El stock cambió (o se revirtió): las copias en caché ya no sirven
+        bump_version('productos', *cantidades)
+    record_ventas([(pedido, 1)])
+    bump_version('pedidos')
+    return pedido
+
 # ========================================
 # 🛒 RUTAS DE PEDIDOS
 # ========================================
 
-@app.route('/pedidos', methods=['GET'])
+@api.route('/pedidos', methods=['GET'])
+@conditional('pedidos', expand={'cliente': 'clientes', 'productos': 'productos'})
 def get_pedidos():
-    """Obtener todos los pedidos"""
+    """Obtener pedidos (lista completa, paginada con ?limit=&cursor= o en streaming con ?stream=; ?expand=cliente,productos)"""
     try:
-        pedidos = list(pedidos_collection.find())
-        return jsonify(serialize_doc(pedidos))
+        try:
+            expand = parse_expand({'cliente', 'productos'})
+        except ValueError as e:
+            return handle_error(e, 400)
+        return list_response(pedidos_collection, PEDIDOS_SORT, transform=pedido_expander(expand))
     except Exception as e:
         return handle_error(e)
 
-@app.route('/pedidos', methods=['POST'])
+@api.route('/pedidos', methods=['POST'])
 def create_pedido():
-    """Crear nuevo pedido"""
+    """Crear nuevo pedido (?modo=servidor para precios y stock del servidor)"""
     try:
         data = request.get_json()
         
-        # Validaciones básicas
-        if not data:
-            return handle_error('No se proporcionaron datos', 400)
-        
-        required_fields = ['clienteId', 'productos', 'codigo_pedido']
-        for field in required_fields:
-            if not data.get(field):
-                return handle_error(f'El campo {field} es requerido', 400)
+        # Validaciones básicas, total y fecha por defecto
+        modo_servidor = request.args.get('modo') == 'servidor'
+        error = prepare_pedido(data, client_totals=not modo_servidor)
+        if error:
+            return handle_error(error, 400)
         
         # Validar que el cliente existe
-        if not is_valid_objectid(data['clienteId']):
-            return handle_error('ID de cliente inválido', 400)
-        
-        cliente = clientes_collection.find_one({'_id': ObjectId(data['clienteId'])})
+        cliente = find_cached(clientes_collection, data['clienteId'])
         if not cliente:
             return handle_error('Cliente no encontrado', 404)
         
-        # Validar productos
-        if not isinstance(data['productos'], list) or len(data['productos']) == 0:
-            return handle_error('Debe incluir al menos un producto', 400)
-        
-        # Calcular total si no se proporciona
-        total_calculado = 0
-        for producto in data['productos']:
-            total_calculado += producto.get('total_comprado', 0)
-        
-        if 'total_compra' not in data:
-            data['total_compra'] = total_calculado
-        
-        # Agregar fecha actual si no se proporciona
-        if 'fecha_pedido' not in data:
-            data['fecha_pedido'] = datetime.now(timezone.utc)
-        
-        # Verificar que no existe un pedido con el mismo código
-        existing = pedidos_collection.find_one({'codigo_pedido': data['codigo_pedido']})
-        if existing:
+        # ?modo=servidor: precios del catálogo y descuento de stock atómico
+        if modo_servidor:
+            try:
+                pedido = place_pedido(data)
+            except PedidoError as e:
+                return handle_error(e, e.code)
+            return jsonify(pedido), 201
+        
+        # Insertar pedido (el índice único rechaza códigos repetidos)
+        try:
+            pedidos_collection.insert_one(data)
+        except DuplicateKeyError:
             return handle_error('Ya existe un pedido con ese código', 400)
         
-        # Insertar pedido
-        result = pedidos_collection.insert_one(data)
+        record_ventas([(data, 1)])
+        bump_version('pedidos')
         
-        # Obtener pedido creado
-        pedido = pedidos_collection.find_one({'_id': result.inserted_id})
-        
-        return jsonify(serialize_doc(pedido)), 201
+        # insert_one agrega el _id generado al documento insertado
+        return jsonify(data), 201
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/pedidos/<pedido_id>', methods=['GET'])
+@api.route('/pedidos/bulk', methods=['POST'])
+def create_pedidos_bulk():
+    """Crear pedidos en lote con un solo insert_many"""
+    try:
+        return bulk_insert(
+            pedidos_collection,
+            request.get_json(),
+            prepare_pedido,
+            'Ya existe un pedido con ese código',
+            existing_clientes=check_clientes_exist,
+            after_insert=lambda pedidos: record_ventas([(pedido, 1) for pedido in pedidos])
+        )
+    except Exception as e:
+        return handle_error(e)
+
+@api.route('/pedidos/<pedido_id>', methods=['GET'])
+@conditional('pedidos', expand={'cliente': 'clientes', 'productos': 'productos'})
 def get_pedido(pedido_id):
     """Obtener pedido por ID"""
     try:
         if not is_valid_objectid(pedido_id):
             return handle_error('ID de pedido inválido', 400)
         
-        pedido = pedidos_collection.find_one({'_id': ObjectId(pedido_id)})
+        try:
+            projection = parse_fields()
+            expand = parse_expand({'cliente', 'productos'})
+        except ValueError as e:
+            return handle_error(e, 400)
+        
+        collection = pedidos_collection
+        if binary_format() == 'bson' and not expand:
+            collection = raw_collection(collection)
+        pedido = collection.find_one({'_id': ObjectId(pedido_id)}, projection)
         
         if not pedido:
             return handle_error('Pedido no encontrado', 404)
         
-        return jsonify(serialize_doc(pedido))
+        # Un solo cliente: se resuelve desde la caché de lectura
+        if 'cliente' in expand and 'clienteId' in pedido:
+            cliente_id = as_objectid(pedido['clienteId'])
+            cliente = find_cached(clientes_collection, cliente_id) if cliente_id else None
+            pedido['cliente'] = project_doc(cliente, CLIENTE_SUMMARY_FIELDS)
+        if 'productos' in expand:
+            expand_productos([pedido])
+        
+        return document_response(pedido)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/pedidos/<pedido_id>', methods=['PUT'])
+@api.route('/pedidos/<pedido_id>', methods=['PUT'])
 def update_pedido(pedido_id):
     """Actualizar pedido"""
     try:
@@ -568,101 +2074,252 @@ def update_pedido(pedido_id):
         
         data = request.get_json()
         
-        if not data:
-            return handle_error('No se proporcionaron datos', 400)
+        # Solo campos de primer nivel; clienteId y fecha_pedido se convierten
+        error = check_pedido_update(data)
+        if error:
+            return handle_error(error, 400)
         
-        # Validar clienteId si se proporciona
+        # Validar que el cliente existe si se proporciona
         if 'clienteId' in data:
-            if not is_valid_objectid(data['clienteId']):
-                return handle_error('ID de cliente inválido', 400)
-            
-            cliente = clientes_collection.find_one({'_id': ObjectId(data['clienteId'])})
+            cliente = find_cached(clientes_collection, data['clienteId'])
             if not cliente:
                 return handle_error('Cliente no encontrado', 404)
         
-        # Actualizar pedido
-        result = pedidos_collection.update_one(
-            {'_id': ObjectId(pedido_id)},
-            {'$set': data}
-        )
+        # Actualizar pedido en una sola operación; la versión anterior sirve
+        # para el resumen de ventas y la nueva se obtiene aplicando el $set
+        try:
+            anterior = pedidos_collection.find_one_and_update(
+                {'_id': ObjectId(pedido_id)},
+                {'$set': data},
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            return handle_error('Ya existe un pedido con ese código', 400)
         
-        if result.matched_count == 0:
+        if not anterior:
             return handle_error('Pedido no encontrado', 404)
         
-        # Obtener pedido actualizado
-        pedido = pedidos_collection.find_one({'_id': ObjectId(pedido_id)})
+        pedido = {**anterior, **data}
+        record_ventas([(anterior, -1), (pedido, 1)])
+        bump_version('pedidos')
         
-        return jsonify(serialize_doc(pedido))
+        return jsonify(pedido)
         
     except Exception as e:
         return handle_error(e)
 
-@app.route('/pedidos/<pedido_id>', methods=['DELETE'])
+@api.route('/pedidos/<pedido_id>', methods=['DELETE'])
 def delete_pedido(pedido_id):
     """Eliminar pedido"""
     try:
         if not is_valid_objectid(pedido_id):
             return handle_error('ID de pedido inválido', 400)
         
-        result = pedidos_collection.delete_one({'_id': ObjectId(pedido_id)})
+        pedido = pedidos_collection.find_one_and_delete({'_id': ObjectId(pedido_id)})
         
-        if result.deleted_count == 0:
+        if not pedido:
             return handle_error('Pedido no encontrado', 404)
         
+        record_ventas([(pedido, -1)])
+        bump_version('pedidos')
+        
         return jsonify({'message': 'Pedido eliminado exitosamente'})
         
     except Exception as e:
         return handle_error(e)
 
+# ========================================
+# 📊 RUTAS DE REPORTES
+# ========================================
+
+@api.route('/reportes/ventas', methods=['GET'])
+@conditional('pedidos', ROLLUP_COLLECTION)
+def reporte_ventas():
+    """Ventas por día, producto o categoría (?desde=&hasta=&agrupar=) desde el resumen.
+
+    Con agrupar=dia devuelve una fila por día; con producto o categoría, una
+    fila por clave con los totales de todo el rango.
+    """
+    try:
+        agrupar = request.args.get('agrupar', 'dia')
+        if agrupar not in ('dia', 'producto', 'categoria'):
+            return handle_error('El parámetro agrupar debe ser dia, producto o categoria', 400)
+        
+        query = {'tipo': agrupar, 'pedidos': {'$gt': 0}}
+        rango = {}
+        for param, operator in (('desde', '$gte'), ('hasta', '$lte')):
+            value = request.args.get(param)
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return handle_error(f'El parámetro {param} debe tener el formato YYYY-MM-DD', 400)
+                rango[operator] = value
+        if rango:
+            query['fecha'] = rango
+        
+        # Una lectura de índice por bucket: {tipo, fecha, clave}
+        if agrupar == 'dia':
+            rows = ventas_rollup_collection.find(query, {'_id': 0, 'tipo': 0}).sort([('fecha', ASCENDING), ('clave', ASCENDING)])
+        else:
+            rows = ventas_rollup_collection.aggregate([
+                {'$match': query},
+                {'$sort': {'fecha': ASCENDING}},
+                {'$group': {
+                    '_id': '$clave',
+                    'total': {'$sum': '$total'},
+                    'unidades': {'$sum': '$unidades'},
+                    'pedidos': {'$sum': '$pedidos'},
+                    # El nombre más reciente del producto (las categorías no tienen)
+                    'nombre': {'$last': '$nombre'}
+                }},
+                {'$sort': {'total': DESCENDING, '_id': ASCENDING}},
+                {'$project': {'_id': 0, 'clave': '$_id', 'total': 1, 'unidades': 1, 'pedidos': 1,
+                              'nombre': {'$ifNull': ['$nombre', '$$REMOVE']}}}
+            ])
+        return jsonify({
+            'agrupar': agrupar,
+            'desde': request.args.get('desde'),
+            'hasta': request.args.get('hasta'),
+            'data': list(rows)
+        })
+        
+    except Exception as e:
+        return handle_error(e)
+
 # ========================================
 # 🔧 RUTAS DE UTILIDADES
 # ========================================
 
-@app.route('/debug', methods=['GET'])
-def debug_info():
-    """Información de debug de la base de datos"""
-    try:
-        # Contar documentos en cada colección
-        clientes_count = clientes_collection.count_documents({})
-        productos_count = productos_collection.count_documents({})
-        pedidos_count = pedidos_collection.count_documents({})
-        
-        # Obtener algunos documentos de ejemplo
-        clientes_sample = list(clientes_collection.find().limit(3))
-        productos_sample = list(productos_collection.find().limit(3))
-        pedidos_sample = list(pedidos_collection.find().limit(3))
-        
-        debug_data = {
-            'status': 'API funcionando correctamente',
-            'timestamp': datetime.now().isoformat(),
-            'database': 'comerciotech',
-            'collections': {
-                'clientes': {
-                    'count': clientes_count,
-                    'sample': serialize_doc(clientes_sample)
-                },
-                'productos': {
-                    'count': productos_count,
-                    'sample': serialize_doc(productos_sample)
-                },
-                'pedidos': {
-                    'count': pedidos_count,
-                    'sample': serialize_doc(pedidos_sample)
-                }
+@api.route('/health', methods=['GET'])
+def health():
+    """Liveness: el proceso responde; no consulta la base de datos"""
+    return jsonify({'status': 'ok'})
+
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: MongoDB responde a un ping y existen los índices únicos"""
+    try:
+        get_mongo().ping()
+        # Las rutas de escritura detectan duplicados con los índices únicos
+        missing = cached_index_problems()
+        if missing:
+            return jsonify({'status': 'unavailable', 'missing_indexes': missing}), 503
+        return jsonify({'status': 'ready'})
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+
+def build_debug_info():
+    """Arma el payload de /debug con conteos estimados y documentos de ejemplo"""
+    # Conteos estimados a partir de los metadatos de cada colección
+    clientes_count = clientes_collection.estimated_document_count()
+    productos_count = productos_collection.estimated_document_count()
+    pedidos_count = pedidos_collection.estimated_document_count()
+    
+    # Obtener algunos documentos de ejemplo
+    clientes_sample = list(clientes_collection.find().limit(3))
+    productos_sample = list(productos_collection.find().limit(3))
+    pedidos_sample = list(pedidos_collection.find().limit(3))
+    
+    return {
+        'status': 'API funcionando correctamente',
+        'timestamp': datetime.now().isoformat(),
+        'database': get_mongo().db_name,
+        'collections': {
+            'clientes': {
+                'count': clientes_count,
+                'sample': clientes_sample
+            },
+            'productos': {
+                'count': productos_count,
+                'sample': productos_sample
             },
-            'total_documents': clientes_count + productos_count + pedidos_count,
-            'endpoints': {
-                'clientes': ['GET /clientes', 'POST /clientes', 'GET /clientes/<id>', 'PUT /clientes/<id>', 'DELETE /clientes/<id>'],
-                'productos': ['GET /productos', 'POST /productos', 'GET /productos/<id>', 'PUT /productos/<id>', 'DELETE /productos/<id>'],
-                'pedidos': ['GET /pedidos', 'POST /pedidos', 'GET /pedidos/<id>', 'PUT /pedidos/<id>', 'DELETE /pedidos/<id>']
+            'pedidos': {
+                'count': pedidos_count,
+                'sample': pedidos_sample
             }
+        },
+        'total_documents': clientes_count + productos_count + pedidos_count,
+        'endpoints': {
+            'clientes': ['GET /clientes', 'POST /clientes', 'POST /clientes/bulk', 'GET /clientes/<id>', 'GET /clientes/<id>/pedidos', 'PUT /clientes/<id>', 'DELETE /clientes/<id>'],
+            'productos': ['GET /productos', 'POST /productos', 'POST /productos/bulk', 'GET /productos/search', 'GET /productos/<id>', 'PUT /productos/<id>', 'DELETE /productos/<id>'],
+            'pedidos': ['GET /pedidos', 'POST /pedidos', 'POST /pedidos/bulk', 'GET /pedidos/<id>', 'PUT /pedidos/<id>', 'DELETE /pedidos/<id>'],
+            'reportes': ['GET /reportes/ventas'],
+            'utilidades': ['GET /health', 'GET /ready', 'GET /metrics', 'GET /debug', 'GET /debug/cache']
         }
+    }
+
+@api.route('/debug', methods=['GET'])
+def debug_info():
+    """Información de debug de la base de datos (se reutiliza durante DEBUG_CACHE_SECONDS)"""
+    try:
+        debug_cache = current_app.extensions['comerciotech_debug']
+        now = time.monotonic()
+        if debug_cache['expires'] <= now:
+            with debug_cache['lock']:
+                # Solo un hilo reconstruye; el resto espera y reutiliza el resultado
+                if debug_cache['expires'] <= now:
+                    debug_cache['data'] = build_debug_info()
+                    debug_cache['expires'] = time.monotonic() + current_app.config['DEBUG_CACHE_SECONDS']
         
-        return jsonify(debug_data)
+        return jsonify(debug_cache['data'])
         
     except Exception as e:
         return handle_error(e)
 
+@api.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+@api.route('/debug/cache', methods=['GET'])
+def cache_stats():
+    """Aciertos, fallos y tamaño de la caché de lectura"""
+    return jsonify(read_cache().items.stats())
+
+# ========================================
+# 🏭 FÁBRICA DE LA APLICACIÓN
+# ========================================
+
+def create_app(config=None):
+    """Crea la aplicación Flask sin conectarse a MongoDB (salvo con MONGO_PREWARM).
+
+    config se aplica sobre los valores por defecto y el entorno: URI, base de
+    datos y opciones de pool (ver mongo.DEFAULTS) y los ajustes de SETTINGS.
+    Cada aplicación tiene su propia conexión, caché de lectura y caché de /debug.
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(settings_from_env())
+    if config:
+        app.config.update(config)
+
+    # orjson solo se activa explícitamente: su salida no escapa caracteres no ASCII
+    if orjson is not None and app.config['ORJSON']:
+        app.json = OrjsonBSONProvider(app)
+    else:
+        app.json = BSONJSONProvider(app)
+    CORS(app)  # Habilitar CORS para todas las rutas
+    app.register_blueprint(api)
+
+    # Los listeners alimentan /metrics con la latencia de comandos y del pool
+    app.extensions['comerciotech_mongo'] = MongoConnection(
+        app.config, event_listeners=metrics.event_listeners()
+    )
+    app.extensions['comerciotech_cache'] = ReadCache(
+        app.config['CACHE_SIZE'], app.config['CACHE_TTL'], app.config['CACHE_VERSION_INTERVAL']
+    )
+    app.extensions['comerciotech_debug'] = {'data': None, 'expires': 0.0, 'lock': threading.Lock()}
+    app.extensions['comerciotech_ready'] = {'data': None, 'expires': 0.0, 'lock': threading.Lock()}
+    if app.config['MONGO_PREWARM']:
+        warm_up(app)
+    return app
+
+# Importar el módulo nunca conecta: el pre-calentamiento queda para quien
+# llame a create_app() o para cada worker de gunicorn (ver gunicorn.conf.py)
+app = create_app({'MONGO_PREWARM': False})
+
 # ========================================
 # 🚀 EJECUTAR APLICACIÓN
 # ========================================
@@ -676,8 +2333,15 @@ if __name__ == '__main__':
     print("💾 Base de datos: MongoDB - comerciotech")
     print("🌐 CORS: Habilitado para React frontend")
     print("📡 Puerto: 5001")
+    print("🏭 Producción: gunicorn -c gunicorn.conf.py")
     print("=" * 50)
     
+    try:
+        warm_up(app)
+    except Exception as e:
+        print(f"❌ Error al conectar con MongoDB: {e}")
+        exit(1)
+    
     app.run(
         host='0.0.0.0',
         port=5001,
@@ -0,0 +1,864 @@
+"""
+Variante ASGI de la API de comerciotech (Starlette + AsyncMongoClient)
+Mismas URLs y mismo JSON que app.py. Las rutas de clientes, productos y
+pedidos (lecturas, escrituras y lotes) son vistas asíncronas sobre el
+driver asíncrono de PyMongo; el resto (inicio, reportes, /debug, /metrics
+y las preflight de CORS) se delega a la app Flask, que corre en un pool
+de hilos.
+
+Las vistas asíncronas se ejecutan dentro de un contexto de petición de
+Flask: reutilizan los parsers, validaciones, mensajes de error, ETags,
+CORS, métricas y el proveedor JSON de app.py, y solo cambia el acceso a
+MongoDB. La caché de lectura por ID no se usa aquí: su sincronización de
+versiones es síncrona.
+
+Ejecutar desde el directorio backend (dependencias en requirements-asgi.txt):
+uvicorn asgi:app --host 0.0.0.0 --port 5001 --backlog 4096
+
+AsyncMongoClient (PyMongo 4.9 o posterior) espera a MongoDB en el event
+loop, sin ocupar un hilo por operación: las consultas simultáneas solo
+quedan limitadas por el pool de conexiones
+(COMERCIOTECH_MONGO_MAX_POOL_SIZE), y una conexión HTTP inactiva, lenta o
+esperando turno es solo una corrutina. Un proceso ejecuta Python en un
+solo núcleo; para usar más, uvicorn --workers N. Para comparar con la
+versión síncrona ver bench.py.
+"""
+
+from a2wsgi import WSGIMiddleware
+from flask import Response, jsonify, request
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from starlette.applications import Starlette
+from starlette.responses import Response as ASGIResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from bson import ObjectId
+import asyncio
+import contextlib
+import functools
+import io
+import os
+import sys
+import time
+
+import app as flask_api
+import compression
+import metrics
+from app import (
+    BINARY_MIMETYPES, CLIENTE_SUMMARY_FIELDS, CLIENTES_SORT, COMPRESSION_LEVEL_SETTINGS, DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LENGTH, MAX_SEARCH_LIMIT, NDJSON_MIMETYPE, PEDIDO_PRODUCTO_FIELDS, PEDIDOS_SORT,
+    PRODUCTO_SUMMARY_FIELDS, PRODUCTOS_SORT, PRODUCTOS_SORT_FIELDS, STREAM_BATCH_SIZE, PedidoError, as_objectid,
+    batch_cliente_ids, batch_response, binary_format, build_pedido, check_pedido_update, check_producto_update,
+    document_response, documents_response, finish_batch, finish_page, group_line_items, handle_error,
+    insert_failures, is_valid_objectid, keep_existing_clientes, matching_etag, new_reserva, pack, page_query,
+    parse_expand, parse_fields, parse_number, parse_productos_filter, parse_sort, prepare_cliente, prepare_pedido,
+    prepare_producto, raw_collection, read_cache, release_operations, representation_formats, reserve_operations,
+    stock_problem, stream_format, unreserve_operations, validate_batch, wants_pagination
+)
+from indexes import INDEXES, missing_unique_indexes
+from mongo import client_options, config_from_env
+from ventas_rollup import ROLLUP_COLLECTION, SIN_CATEGORIA, rollup_operations, rollup_producto_ids
+
+flask_app = flask_api.app
+
+# ========================================
+# 🗄️ CONEXIÓN ASÍNCRONA A MONGODB
+# ========================================
+
+class AsyncMongo:
+    """AsyncMongoClient que se crea en la primera consulta, dentro del event loop"""
+
+    def __init__(self, config):
+        self.uri = config['MONGO_URI']
+        self.db_name = config['MONGO_DB']
+        self.options = client_options(config)
+        self._client = None
+        self._db = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    @property
+    def db(self):
+        if self._client is None:
+            self._connect()
+        return self._db
+
+    def _connect(self):
+        self._client = AsyncMongoClient(self.uri, event_listeners=metrics.event_listeners(), **self.options)
+        self._db = self._client[self.db_name]
+
+    def collection(self, name):
+        return self.db[name]
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._db = None
+
+mongo = AsyncMongo(flask_app.config)
+
+# ========================================
+# 🔀 PUENTE CON FLASK
+# ========================================
+
+def wsgi_environ(scope, body=b''):
+    """Environ WSGI mínimo para abrir un contexto de petición de Flask (con el cuerpo ya leído)"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    # El cuerpo ya está completo en memoria, aunque haya llegado por bloques
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+class AsyncStream:
+    """Cuerpo de respuesta que se envía desde un generador asíncrono"""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+
+def split_stream(result):
+    """Devuelve (respuesta de Flask, generador o None) para lo que devolvió una vista"""
+    if isinstance(result, AsyncStream):
+        # Un iterable vacío marca la respuesta como streaming para compress_response
+        return Response(iter(()), mimetype=result.mimetype), result.body
+    return flask_app.make_response(result), None
+
+async def compress_body(body, encoding):
+    """Comprime bloque por bloque un generador asíncrono, como compression.CompressedChunks"""
+    # Corre fuera del contexto de petición: el nivel se lee del config de la app
+    compressor = compression.stream_compressor(encoding, flask_app.config[COMPRESSION_LEVEL_SETTINGS[encoding]])
+    try:
+        async for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        await body.aclose()
+
+def asgi_response(response, body=None):
+    """Convierte una respuesta de Flask (y el generador del cuerpo, si hay) en una de Starlette"""
+    if body is not None and 'Content-Encoding' in response.headers:
+        # compress_response decidió la codificación; el cuerpo real se comprime aquí
+        body = compress_body(body, response.headers['Content-Encoding'])
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+    if body is not None:
+        headers = [(name, value) for name, value in headers if name != b'content-length']
+        asgi = StreamingResponse(body, status_code=response.status_code)
+    else:
+        asgi = ASGIResponse(response.get_data(), status_code=response.status_code)
+    asgi.raw_headers = headers
+    return asgi
+
+async def collection_etag(*names):
+    """Igual que app.collection_etag, con una consulta asíncrona"""
+    versions = {
+        doc['_id']: doc['version']
+        async for doc in mongo.collection('versiones').find({'_id': {'$in': list(names)}})
+    }
+    tag = '-'.join(f'{name}.{versions.get(name, 0)}' for name in names)
+    return '-'.join([tag] + representation_formats())
+
+async def conditional_view(view, path_params, names, expand):
+    """Ejecuta la vista; con names aplica ETag y 304 igual que app.conditional"""
+    if not names:
+        return split_stream(await view(**path_params))
+    requested = request.args.get('expand', '').split(',')
+    extra = [expand[item] for item in (expand or {}) if item in requested]
+    etag = await collection_etag(*names, *extra)
+    matched = matching_etag(etag)
+    if matched is not None:
+        response, body = Response(status=304), None
+        response.set_etag(matched)
+    else:
+        response, body = split_stream(await view(**path_params))
+        if response.status_code != 200:
+            return response, None
+        response.set_etag(etag)
+    # El navegador debe revalidar siempre, pero puede reutilizar su copia
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    if flask_app.config['COMPRESSION']:
+        response.vary.add('Accept-Encoding')
+    return response, body
+
+def endpoint(*names, expand=None):
+    """Adapta una vista asíncrona a Starlette.
+
+    La vista corre en un contexto de petición de Flask y devuelve lo mismo que
+    una vista de Flask (o un AsyncStream). names y expand funcionan como en
+    @conditional; los hooks de Flask agregan CORS, métricas y Server-Timing.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(asgi_request):
+            payload = await asgi_request.body()
+            with flask_app.request_context(wsgi_environ(asgi_request.scope, payload)):
+                body = None
+                response = flask_app.preprocess_request()
+                if response is not None:
+                    response = flask_app.make_response(response)
+                else:
+                    try:
+                        response, body = await conditional_view(view, asgi_request.path_params, names, expand)
+                    except Exception as e:
+                        response = flask_app.make_response(handle_error(e))
+                response = flask_app.process_response(response)
+            return asgi_response(response, body)
+        return wrapper
+    return decorator
+
+# ========================================
+# 📄 LISTADOS, STREAMING Y EXPANSIÓN
+# ========================================
+
+async def bump_version(name, *ids):
+    """Igual que app.bump_version, con una consulta asíncrona"""
+    cache = read_cache()
+    for oid in ids:
+        cache.items.invalidate((name, oid))
+    doc = await mongo.collection('versiones').find_one_and_update(
+        {'_id': name},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    flask_api.note_own_version(name, doc['version'])
+
+async def find_page(collection, sort_spec, query=None, projection=None):
+    """Igual que app.find_page, con una consulta asíncrona"""
+    query, projection, strip, limit = page_query(sort_spec, query, projection)
+    docs = await collection.find(query, projection).sort(sort_spec).limit(limit + 1).to_list(None)
+    return finish_page(docs, limit, sort_spec, strip)
+
+def stream_response(collection, query=None, fmt='ndjson', projection=None, sort_spec=None, transform=None):
+    """Igual que app.stream_response: envía cada lote a medida que llega del cursor"""
+    cursor = collection.find(query or {}, projection, batch_size=STREAM_BATCH_SIZE)
+    if sort_spec:
+        cursor.sort(sort_spec)
+    dumps = flask_app.json.dumps
+
+    async def serialize(batch, first):
+        if transform is not None:
+            await transform(batch)
+        if fmt in BINARY_MIMETYPES:
+            return b''.join(pack(doc, fmt) for doc in batch)
+        lines = [dumps(item, separators=(',', ':')) for item in batch]
+        if fmt == 'json':
+            return ('' if first else ',') + ','.join(lines)
+        return ''.join(line + '\n' for line in lines)
+
+    async def generate():
+        if fmt == 'json':
+            yield '['
+        try:
+            batch = []
+            first = True
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield await serialize(batch, first)
+                    batch = []
+                    first = False
+            if batch:
+                yield await serialize(batch, first)
+        finally:
+            await cursor.close()
+        if fmt == 'json':
+            yield ']'
+
+    mimetype = BINARY_MIMETYPES.get(fmt) or (NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json')
+    return AsyncStream(generate(), mimetype)
+
+async def list_response(collection, sort_spec, query=None, ordered=False, transform=None):
+    """Igual que app.list_response; transform es una corrutina"""
+    try:
+        projection = parse_fields()
+    except ValueError as e:
+        return handle_error(e, 400)
+    fmt = stream_format()
+    binary = binary_format()
+    if binary == 'bson' and transform is None:
+        collection = raw_collection(collection)
+    if fmt or (binary and not wants_pagination()):
+        return stream_response(collection, query, binary or fmt, projection, sort_spec if ordered else None, transform)
+    if not wants_pagination():
+        cursor = collection.find(query or {}, projection)
+        if ordered:
+            cursor.sort(sort_spec)
+        docs = await cursor.to_list(None)
+        if transform is not None:
+            await transform(docs)
+        return jsonify(docs)
+    try:
+        docs, next_cursor = await find_page(collection, sort_spec, query, projection)
+    except ValueError as e:
+        return handle_error(e, 400)
+    if transform is not None:
+        await transform(docs)
+    return document_response({'data': docs, 'next_cursor': next_cursor})
+
+def readable(name, expand=None):
+    """Colección para leer en el formato pedido: en BSON y sin expansiones, RawBSONDocument"""
+    collection = mongo.collection(name)
+    if binary_format() == 'bson' and not expand:
+        return raw_collection(collection)
+    return collection
+
+async def expand_productos(pedidos):
+    """Igual que app.expand_productos: un solo $in para todos los productos"""
+    lineas = [
+        linea for pedido in pedidos if isinstance(pedido.get('productos'), list)
+        for linea in pedido['productos'] if isinstance(linea, dict)
+    ]
+    producto_ids = {as_objectid(linea.get('productoId')) for linea in lineas}
+    producto_ids.discard(None)
+    productos = {}
+    if producto_ids:
+        cursor = mongo.collection('productos').find({'_id': {'$in': list(producto_ids)}}, PRODUCTO_SUMMARY_FIELDS)
+        productos = {producto['_id']: producto async for producto in cursor}
+    for linea in lineas:
+        linea['producto'] = productos.get(as_objectid(linea.get('productoId')))
+    return pedidos
+
+async def expand_clientes(pedidos):
+    """Igual que app.expand_clientes: un solo $in para todos los clientes"""
+    cliente_ids = {as_objectid(pedido.get('clienteId')) for pedido in pedidos}
+    cliente_ids.discard(None)
+    clientes = {}
+    if cliente_ids:
+        cursor = mongo.collection('clientes').find({'_id': {'$in': list(cliente_ids)}}, CLIENTE_SUMMARY_FIELDS)
+        clientes = {cliente['_id']: cliente async for cliente in cursor}
+    for pedido in pedidos:
+        if 'clienteId' in pedido:
+            pedido['cliente'] = clientes.get(as_objectid(pedido['clienteId']))
+    return pedidos
+
+def pedido_expander(expand):
+    """Igual que app.pedido_expander, con expansiones asíncronas"""
+    if not expand:
+        return None
+
+    async def transform(pedidos):
+        if 'cliente' in expand:
+            await expand_clientes(pedidos)
+        if 'productos' in expand:
+            await expand_productos(pedidos)
+        return pedidos
+    return transform
+
+# ========================================
+# 📥 INSERCIÓN MASIVA
+# ========================================
+
+async def bulk_insert(collection, items, prepare, duplicate_message, existing_clientes=None, after_insert=None):
+    """Igual que app.bulk_insert; existing_clientes y after_insert son corrutinas"""
+    error, results, valid = validate_batch(items, prepare)
+    if error:
+        return handle_error(error, 400)
+
+    if existing_clientes is not None:
+        valid = await existing_clientes(items, valid, results)
+
+    docs = [items[index] for index in valid]
+    failed = {}
+    if docs:
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = insert_failures(e, duplicate_message)
+
+    inserted = finish_batch(items, valid, results, failed)
+    if inserted:
+        if after_insert is not None:
+            await after_insert(inserted)
+        await bump_version(collection.name)
+    return batch_response(results)
+
+async def check_clientes_exist(items, valid, results):
+    """Igual que app.check_clientes_exist, con una consulta asíncrona"""
+    cursor = mongo.collection('clientes').find({'_id': {'$in': batch_cliente_ids(items, valid)}}, {'_id': 1})
+    existing = {cliente['_id'] async for cliente in cursor}
+    return keep_existing_clientes(items, valid, results, existing)
+
+# ========================================
+# 📊 RESUMEN DE VENTAS
+# ========================================
+
+async def update_rollup(cambios):
+    """Igual que ventas_rollup.update_rollup: un $in de categorías y un bulk_write de $inc"""
+    producto_ids = rollup_producto_ids(cambios)
+    categorias = {}
+    if producto_ids:
+        cursor = mongo.collection('productos').find({'_id': {'$in': producto_ids}}, {'categoria': 1})
+        categorias = {producto['_id']: producto.get('categoria', SIN_CATEGORIA) async for producto in cursor}
+
+    operations = rollup_operations(cambios, categorias)
+    if operations:
+        await mongo.collection(ROLLUP_COLLECTION).bulk_write(operations, ordered=False)
+
+async def record_ventas(cambios):
+    """Igual que app.record_ventas: se llama antes de bump_version('pedidos')"""
+    try:
+        await update_rollup(cambios)
+    except Exception as e:
+        print(f"⚠️ No se pudo actualizar el resumen de ventas: {e}")
+
+# ========================================
+# 🧾 COLOCACIÓN ATÓMICA DE PEDIDOS
+# ========================================
+
+def supports_transactions():
+    """Igual que app.supports_transactions, con el cliente asíncrono"""
+    topology = mongo.client.topology_description.topology_type_name
+    return topology in ('ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced')
+
+async def release_stock(cantidades):
+    """Igual que app.release_stock (solo fuera de una transacción)"""
+    if cantidades:
+        await mongo.collection('productos').bulk_write(release_operations(cantidades), ordered=False)
+
+async def stock_error(cantidades, session=None):
+    """Igual que app.stock_error, con una consulta asíncrona"""
+    cursor = mongo.collection('productos').find({'_id': {'$in': list(cantidades)}}, {'stock': 1}, session=session)
+    stocks = {producto['_id']: producto.get('stock', 0) async for producto in cursor}
+    return stock_problem(cantidades, stocks)
+
+async def reserve_stock(cantidades, session=None):
+    """Igual que app.reserve_stock: un bulk_write y, sin transacción, uno más para las marcas"""
+    productos = mongo.collection('productos')
+    marca = None if session is not None else new_reserva()
+    operations = reserve_operations(cantidades, marca)
+    result = await productos.bulk_write(operations, ordered=False, session=session)
+
+    if result.matched_count == len(operations):
+        if marca:
+            await productos.update_many({'_id': {'$in': list(cantidades)}}, {'$unset': {marca: ''}})
+        return
+
+    if marca:
+        await productos.bulk_write(unreserve_operations(cantidades, marca), ordered=False)
+    raise await stock_error(cantidades, session)
+
+async def write_pedido(pedido, cantidades, session=None):
+    """Igual que app.write_pedido"""
+    await reserve_stock(cantidades, session)
+    try:
+        await mongo.collection('pedidos').insert_one(pedido, session=session)
+    except DuplicateKeyError:
+        if session is None:
+            await release_stock(cantidades)
+        raise PedidoError('Ya existe un pedido con ese código', 400)
+
+async def place_pedido(data):
+    """Igual que app.place_pedido: un $in, un bulk_write y el insert, en una transacción si se puede"""
+    cantidades = group_line_items(data['productos'])
+    cursor = mongo.collection('productos').find({'_id': {'$in': list(cantidades)}}, PEDIDO_PRODUCTO_FIELDS)
+    productos = {producto['_id']: producto async for producto in cursor}
+    pedido = build_pedido(data, cantidades, productos)
+
+    try:
+        if supports_transactions():
+            async with mongo.client.start_session() as session:
+                await session.with_transaction(lambda s: write_pedido(pedido, cantidades, s))
+        else:
+            await write_pedido(pedido, cantidades)
+    finally:
+        await bump_version('productos', *cantidades)
+    await record_ventas([(pedido, 1)])
+    await bump_version('pedidos')
+    return pedido
+
+# ========================================
+# 👥 RUTAS DE CLIENTES
+# ========================================
+
+@endpoint('clientes')
+async def get_clientes():
+    return await list_response(mongo.collection('clientes'), CLIENTES_SORT)
+
+@endpoint('clientes')
+async def get_cliente(cliente_id):
+    if not is_valid_objectid(cliente_id):
+        return handle_error('ID de cliente inválido', 400)
+    try:
+        projection = parse_fields()
+    except ValueError as e:
+        return handle_error(e, 400)
+    cliente = await readable('clientes').find_one({'_id': ObjectId(cliente_id)}, projection)
+    if not cliente:
+        return handle_error('Cliente no encontrado', 404)
+    return document_response(cliente)
+
+@endpoint()
+async def create_cliente():
+    data = request.get_json()
+    error = prepare_cliente(data)
+    if error:
+        return handle_error(error, 400)
+    # El índice único rechaza identificadores repetidos
+    try:
+        await mongo.collection('clientes').insert_one(data)
+    except DuplicateKeyError:
+        return handle_error('Ya existe un cliente con ese identificador', 400)
+    await bump_version('clientes')
+    return jsonify(data), 201
+
+@endpoint()
+async def create_clientes_bulk():
+    return await bulk_insert(
+        mongo.collection('clientes'),
+        request.get_json(),
+        prepare_cliente,
+        'Ya existe un cliente con ese identificador'
+    )
+
+@endpoint()
+async def update_cliente(cliente_id):
+    if not is_valid_objectid(cliente_id):
+        return handle_error('ID de cliente inválido', 400)
+    data = request.get_json()
+    if not data:
+        return handle_error('No se proporcionaron datos', 400)
+    try:
+        cliente = await mongo.collection('clientes').find_one_and_update(
+            {'_id': ObjectId(cliente_id)},
+            {'$set': data},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return handle_error('Ya existe un cliente con ese identificador', 400)
+    if not cliente:
+        return handle_error('Cliente no encontrado', 404)
+    await bump_version('clientes', cliente['_id'])
+    return jsonify(cliente)
+
+@endpoint()
+async def delete_cliente(cliente_id):
+    if not is_valid_objectid(cliente_id):
+        return handle_error('ID de cliente inválido', 400)
+    # Verificar que no tenga pedidos asociados (basta con encontrar uno en el índice)
+    if await mongo.collection('pedidos').find_one({'clienteId': ObjectId(cliente_id)}, {'_id': 1}):
+        return handle_error('No se puede eliminar el cliente porque tiene pedidos asociados', 400)
+    result = await mongo.collection('clientes').delete_one({'_id': ObjectId(cliente_id)})
+    if result.deleted_count == 0:
+        return handle_error('Cliente no encontrado', 404)
+    await bump_version('clientes', ObjectId(cliente_id))
+    return jsonify({'message': 'Cliente eliminado exitosamente'})
+
+@endpoint('pedidos', expand={'productos': 'productos'})
+async def get_cliente_pedidos(cliente_id):
+    if not is_valid_objectid(cliente_id):
+        return handle_error('ID de cliente inválido', 400)
+    if not await mongo.collection('clientes').find_one({'_id': ObjectId(cliente_id)}, {'_id': 1}):
+        return handle_error('Cliente no encontrado', 404)
+    try:
+        expand = parse_expand({'productos'})
+        projection = parse_fields()
+        pedidos, next_cursor = await find_page(
+            readable('pedidos', expand), PEDIDOS_SORT, {'clienteId': ObjectId(cliente_id)}, projection
+        )
+    except ValueError as e:
+        return handle_error(e, 400)
+    if 'productos' in expand:
+        await expand_productos(pedidos)
+    return document_response({'data': pedidos, 'next_cursor': next_cursor})
+
+# ========================================
+# 📦 RUTAS DE PRODUCTOS
+# ========================================
+
+@endpoint('productos')
+async def get_productos():
+    try:
+        query = parse_productos_filter()
+        sort_spec = parse_sort(PRODUCTOS_SORT_FIELDS, PRODUCTOS_SORT)
+    except ValueError as e:
+        return handle_error(e, 400)
+    return await list_response(mongo.collection('productos'), sort_spec, query, ordered='sort' in request.args)
+
+@endpoint('productos')
+async def search_productos():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return handle_error('El parámetro q es requerido', 400)
+    if len(q) > MAX_SEARCH_LENGTH:
+        return handle_error(f'La búsqueda no puede superar {MAX_SEARCH_LENGTH} caracteres', 400)
+    try:
+        limit = parse_number('limit', int)
+        projection = parse_fields()
+        query = parse_productos_filter()
+    except ValueError as e:
+        return handle_error(e, 400)
+    if limit is None:
+        limit = DEFAULT_SEARCH_LIMIT
+    if limit <= 0:
+        return handle_error('El parámetro limit debe ser mayor que 0', 400)
+
+    text_query = {'$text': {'$search': q}, **query}
+    projection = dict(projection or {})
+    projection['score'] = {'$meta': 'textScore'}
+    cursor = (
+        readable('productos').find(text_query, projection)
+        .sort([('score', {'$meta': 'textScore'})])
+        .limit(min(limit, MAX_SEARCH_LIMIT))
+    )
+    return documents_response(await cursor.to_list(None))
+
+@endpoint('productos')
+async def get_producto(producto_id):
+    if not is_valid_objectid(producto_id):
+        return handle_error('ID de producto inválido', 400)
+    try:
+        projection = parse_fields()
+    except ValueError as e:
+        return handle_error(e, 400)
+    producto = await readable('productos').find_one({'_id': ObjectId(producto_id)}, projection)
+    if not producto:
+        return handle_error('Producto no encontrado', 404)
+    return document_response(producto)
+
+@endpoint()
+async def create_producto():
+    data = request.get_json()
+    error = prepare_producto(data)
+    if error:
+        return handle_error(error, 400)
+    await mongo.collection('productos').insert_one(data)
+    await bump_version('productos')
+    return jsonify(data), 201
+
+@endpoint()
+async def create_productos_bulk():
+    return await bulk_insert(mongo.collection('productos'), request.get_json(), prepare_producto, 'Producto duplicado')
+
+@endpoint()
+async def update_producto(producto_id):
+    if not is_valid_objectid(producto_id):
+        return handle_error('ID de producto inválido', 400)
+    data = request.get_json()
+    error = check_producto_update(data)
+    if error:
+        return handle_error(error, 400)
+    producto = await mongo.collection('productos').find_one_and_update(
+        {'_id': ObjectId(producto_id)},
+        {'$set': data},
+        return_document=ReturnDocument.AFTER
+    )
+    if not producto:
+        return handle_error('Producto no encontrado', 404)
+    await bump_version('productos', producto['_id'])
+    return jsonify(producto)
+
+@endpoint()
+async def delete_producto(producto_id):
+    if not is_valid_objectid(producto_id):
+        return handle_error('ID de producto inválido', 400)
+    result = await mongo.collection('productos').delete_one({'_id': ObjectId(producto_id)})
+    if result.deleted_count == 0:
+        return handle_error('Producto no encontrado', 404)
+    await bump_version('productos', ObjectId(producto_id))
+    return jsonify({'message': 'Producto eliminado exitosamente'})
+
+# ========================================
+# 🛒 RUTAS DE PEDIDOS
+# ========================================
+
+@endpoint('pedidos', expand={'cliente': 'clientes', 'productos': 'productos'})
+async def get_pedidos():
+    try:
+        expand = parse_expand({'cliente', 'productos'})
+    except ValueError as e:
+        return handle_error(e, 400)
+    return await list_response(mongo.collection('pedidos'), PEDIDOS_SORT, transform=pedido_expander(expand))
+
+@endpoint('pedidos', expand={'cliente': 'clientes', 'productos': 'productos'})
+async def get_pedido(pedido_id):
+    if not is_valid_objectid(pedido_id):
+        return handle_error('ID de pedido inválido', 400)
+    try:
+        projection = parse_fields()
+        expand = parse_expand({'cliente', 'productos'})
+    except ValueError as e:
+        return handle_error(e, 400)
+    pedido = await readable('pedidos', expand).find_one({'_id': ObjectId(pedido_id)}, projection)
+    if not pedido:
+        return handle_error('Pedido no encontrado', 404)
+    if 'cliente' in expand:
+        await expand_clientes([pedido])
+    if 'productos' in expand:
+        await expand_productos([pedido])
+    return document_response(pedido)
+
+@endpoint()
+async def create_pedido():
+    data = request.get_json()
+    modo_servidor = request.args.get('modo') == 'servidor'
+    error = prepare_pedido(data, client_totals=not modo_servidor)
+    if error:
+        return handle_error(error, 400)
+    if not await mongo.collection('clientes').find_one({'_id': data['clienteId']}, {'_id': 1}):
+        return handle_error('Cliente no encontrado', 404)
+
+    # ?modo=servidor: precios del catálogo y descuento de stock atómico
+    if modo_servidor:
+        try:
+            pedido = await place_pedido(data)
+        except PedidoError as e:
+            return handle_error(e, e.code)
+        return jsonify(pedido), 201
+
+    # El índice único rechaza códigos repetidos
+    try:
+        await mongo.collection('pedidos').insert_one(data)
+    except DuplicateKeyError:
+        return handle_error('Ya existe un pedido con ese código', 400)
+    await record_ventas([(data, 1)])
+    await bump_version('pedidos')
+    return jsonify(data), 201
+
+@endpoint()
+async def create_pedidos_bulk():
+    async def after_insert(pedidos):
+        await record_ventas([(pedido, 1) for pedido in pedidos])
+
+    return await bulk_insert(
+        mongo.collection('pedidos'),
+        request.get_json(),
+        prepare_pedido,
+        'Ya existe un pedido con ese código',
+        existing_clientes=check_clientes_exist,
+        after_insert=after_insert
+    )
+
+@endpoint()
+async def update_pedido(pedido_id):
+    if not is_valid_objectid(pedido_id):
+        return handle_error('ID de pedido inválido', 400)
+    data = request.get_json()
+    error = check_pedido_update(data)
+    if error:
+        return handle_error(error, 400)
+    if 'clienteId' in data:
+        if not await mongo.collection('clientes').find_one({'_id': data['clienteId']}, {'_id': 1}):
+            return handle_error('Cliente no encontrado', 404)
+
+    # La versión anterior sirve para el resumen de ventas y la nueva se obtiene aplicando el $set
+    try:
+        anterior = await mongo.collection('pedidos').find_one_and_update(
+            {'_id': ObjectId(pedido_id)},
+            {'$set': data},
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        return handle_error('Ya existe un pedido con ese código', 400)
+    if not anterior:
+        return handle_error('Pedido no encontrado', 404)
+    pedido = {**anterior, **data}
+    await record_ventas([(anterior, -1), (pedido, 1)])
+    await bump_version('pedidos')
+    return jsonify(pedido)
+
+@endpoint()
+async def delete_pedido(pedido_id):
+    if not is_valid_objectid(pedido_id):
+        return handle_error('ID de pedido inválido', 400)
+    pedido = await mongo.collection('pedidos').find_one_and_delete({'_id': ObjectId(pedido_id)})
+    if not pedido:
+        return handle_error('Pedido no encontrado', 404)
+    await record_ventas([(pedido, -1)])
+    await bump_version('pedidos')
+    return jsonify({'message': 'Pedido eliminado exitosamente'})
+
+# ========================================
+# 🔧 RUTAS DE UTILIDADES
+# ========================================
+
+@endpoint()
+async def health():
+    return jsonify({'status': 'ok'})
+
+@endpoint()
+async def ready():
+    try:
+        await mongo.client.admin.command('ping')
+        # Igual que app.cached_index_problems; en el event loop no hace falta el lock
+        index_check = flask_app.extensions['comerciotech_ready']
+        if index_check['expires'] <= time.monotonic():
+            index_check['data'] = missing_unique_indexes({
+                name: await mongo.collection(name).index_information() for name in INDEXES
+            })
+            index_check['expires'] = time.monotonic() + flask_app.config['READY_INDEX_CHECK_SECONDS']
+        missing = index_check['data']
+        if missing:
+            return jsonify({'status': 'unavailable', 'missing_indexes': missing}), 503
+        return jsonify({'status': 'ready'})
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+
+# ========================================
+# 🚀 APLICACIÓN ASGI
+# ========================================
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    if config_from_env()['MONGO_PREWARM']:
+        await mongo.client.admin.command('ping')
+        await asyncio.get_running_loop().run_in_executor(None, flask_api.warm_up, flask_app)
+    yield
+    await mongo.close()
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/ready', ready, methods=['GET']),
+        Route('/clientes', get_clientes, methods=['GET']),
+        Route('/clientes', create_cliente, methods=['POST']),
+        Route('/clientes/bulk', create_clientes_bulk, methods=['POST']),
+        Route('/clientes/{cliente_id}', get_cliente, methods=['GET']),
+        Route('/clientes/{cliente_id}', update_cliente, methods=['PUT']),
+        Route('/clientes/{cliente_id}', delete_cliente, methods=['DELETE']),
+        Route('/clientes/{cliente_id}/pedidos', get_cliente_pedidos, methods=['GET']),
+        Route('/productos', get_productos, methods=['GET']),
+        Route('/productos', create_producto, methods=['POST']),
+        Route('/productos/bulk', create_productos_bulk, methods=['POST']),
+        Route('/productos/search', search_productos, methods=['GET']),
+        Route('/productos/{producto_id}', get_producto, methods=['GET']),
+        Route('/productos/{producto_id}', update_producto, methods=['PUT']),
+        Route('/productos/{producto_id}', delete_producto, methods=['DELETE']),
+        Route('/pedidos', get_pedidos, methods=['GET']),
+        Route('/pedidos', create_pedido, methods=['POST']),
+        Route('/pedidos/bulk', create_pedidos_bulk, methods=['POST']),
+        Route('/pedidos/{pedido_id}', get_pedido, methods=['GET']),
+        Route('/pedidos/{pedido_id}', update_pedido, methods=['PUT']),
+        Route('/pedidos/{pedido_id}', delete_pedido, methods=['DELETE']),
+        # Inicio, reportes, /debug, /metrics y las preflight de CORS los atiende Flask en hilos
+        Mount('/', app=WSGIMiddleware(flask_app, workers=int(os.environ.get('COMERCIOTECH_THREADS', 8)))),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga para comparar formas de servir la API de comerciotech
+Sin dependencias: abre C conexiones keep-alive concurrentes durante D
+segundos, repartiendo las peticiones entre las rutas indicadas, y muestra
+peticiones por segundo y percentiles de latencia.
+
+Con la API corriendo, desde el directorio backend:
+python bench.py --url http://localhost:5001 -c 64 -d 30 /productos?limit=50 /clientes/<id>
+
+Formas de servir la API que se pueden comparar:
+1. python app.py                                (servidor de desarrollo)
+2. gunicorn -c gunicorn.conf.py                 (síncrono, procesos x hilos)
+3. uvicorn asgi:app --port 5001 --backlog 4096  (asíncrono, ver asgi.py)
+
+Metodología:
+- MongoDB real (no mongomock ni una base en memoria: sin espera de E/S
+  los resultados solo miden CPU), en su propia máquina o con la latencia
+  de red que tendrá en producción.
+- Datos de volumen realista generados con generate_data.py; los de
+  ejemplo caben en memoria y ocultan el costo de las consultas.
+- bench.py en otra máquina, para no competir por CPU con el servidor.
+- Una pasada corta descartada para llenar pools y cachés, y luego al menos
+  tres pasadas de -d 30 por configuración; anotar la mediana de req/s, p99
+  y errores.
+- Repetir con varias concurrencias (p. ej. -c 16, 64, 256, 1000) y cambiar
+  una sola cosa por vez (workers, hilos, pool o servidor).
+- Anotar junto a cada resultado núcleos, versiones, tamaño de los datos y
+  la espera del pool en /metrics.
+
+Con --results cada pasada agrega una fila a una tabla Markdown con la
+fecha, el servidor (--label), el hardware del servidor (--hardware; por
+defecto el de esta máquina), los documentos por colección según /debug,
+req/s, p50, p99 y errores. --warmup hace antes la pasada que se descarta:
+
+python bench.py --url http://localhost:5001 --warmup 5 --label "python app.py" \
+    --hardware "4 vCPU, 8 GB, MongoDB 7.0 en otra máquina" --results resultados.md
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+async def read_response(reader):
+    """Lee una respuesta HTTP/1.1 completa; devuelve (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('conexión cerrada por el servidor')
+    version, status = status_line.split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            # Datos del bloque más su CRLF (o el CRLF final si size es 0)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return int(status), False
+
+    keep_alive = headers.get('connection') != 'close' and version != b'HTTP/1.0'
+    return int(status), keep_alive
+
+async def client(host, port, paths, extra_headers, deadline, latencies, errors, offset):
+    """Una conexión keep-alive que envía peticiones hasta el deadline"""
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{extra_headers}\r\n'
+            writer.write(request.encode('latin-1'))
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors[status] += 1
+        except (OSError, ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+            errors[type(e).__name__] += 1
+            keep_alive = False
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+async def run(url, paths, concurrency, duration, headers):
+    target = urlsplit(url)
+    host, port = target.hostname, target.port or 80
+    extra_headers = ''.join(f'{header}\r\n' for header in headers)
+    latencies = []
+    errors = collections.Counter()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(host, port, paths, extra_headers, deadline, latencies, errors, n)
+        for n in range(concurrency)
+    ))
+    return latencies, errors, time.perf_counter() - started
+
+def describe_machine():
+    """Núcleos, memoria y sistema de la máquina que ejecuta bench.py"""
+    try:
+        memoria = f"{os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2 ** 30:.1f} GB"
+    except (AttributeError, ValueError, OSError):  # sysconf no existe en Windows
+        memoria = 'memoria ?'
+    return (f'{os.cpu_count()} núcleos, {memoria}, {platform.system()} {platform.release()} '
+            f'{platform.machine()}, Python {platform.python_version()}')
+
+def data_size(url):
+    """Documentos por colección según /debug (conteos estimados), o None si no responde"""
+    try:
+        with urllib.request.urlopen(url.rstrip('/') + '/debug', timeout=10) as response:
+            collections_info = json.load(response)['collections']
+        return ', '.join(f"{name} {info['count']}" for name, info in collections_info.items())
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+RESULTS_HEADER = (
+    '| fecha | servidor | hardware | datos | conexiones | segundos | req/s | p50 ms | p99 ms | errores |\n'
+    '|---|---|---|---|---|---|---|---|---|---|\n'
+)
+
+def record(path, row):
+    """Agrega una fila a la tabla de resultados (con el encabezado si el archivo es nuevo)"""
+    new = not os.path.exists(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        if new:
+            f.write(RESULTS_HEADER)
+        f.write('| ' + ' | '.join(str(cell).replace('|', '/') for cell in row) + ' |\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de la API de comerciotech')
+    parser.add_argument('paths', nargs='*', default=['/productos?limit=50', '/clientes?limit=50', '/pedidos?limit=20'],
+                        help='rutas a pedir en rotación')
+    parser.add_argument('--url', default='http://localhost:5001', help='URL base de la API')
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help='conexiones simultáneas')
+    parser.add_argument('-d', '--duration', type=float, default=30, help='segundos de prueba')
+    parser.add_argument('-H', '--header', action='append', default=[], help='cabecera extra ("Nombre: valor")')
+    parser.add_argument('--warmup', type=float, default=0, help='segundos de una pasada previa que se descarta')
+    parser.add_argument('--label', default='', help='forma de servir la API, para --results')
+    parser.add_argument('--hardware', default=None, help='hardware del servidor, para --results (por defecto esta máquina)')
+    parser.add_argument('--results', default=None, help='archivo Markdown al que se agrega el resultado')
+    args = parser.parse_args()
+
+    if args.warmup > 0:
+        print(f"🔥 Pasada previa de {args.warmup:g} s (se descarta)")
+        asyncio.run(run(args.url, args.paths, args.concurrency, args.warmup, args.header))
+
+    print(f"🚀 {args.concurrency} conexiones durante {args.duration:g} s contra {args.url}")
+    latencies, errors, elapsed = asyncio.run(
+        run(args.url, args.paths, args.concurrency, args.duration, args.header)
+    )
+    latencies.sort()
+    print(f"📊 Peticiones: {len(latencies)} ({len(latencies) / elapsed:.1f} req/s)")
+    print("⏱️ Latencia (ms): " + ', '.join(
+        f'{name} {percentile(latencies, fraction) * 1000:.1f}'
+        for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('máx', 1.0))
+    ))
+    if errors:
+        print(f"⚠️ Errores: {dict(errors)}")
+
+    if args.results:
+        record(args.results, [
+            time.strftime('%Y-%m-%d'),
+            args.label or args.url,
+            args.hardware or describe_machine(),
+            data_size(args.url) or '?',
+            args.concurrency,
+            f'{args.duration:g}',
+            f'{len(latencies) / elapsed:.1f}',
+            f'{percentile(latencies, 0.5) * 1000:.1f}',
+            f'{percentile(latencies, 0.99) * 1000:.1f}',
+            sum(errors.values()),
+        ])
+        print(f"📝 Resultado agregado a {args.results}")
+
+if __name__ == '__main__':
+    main()
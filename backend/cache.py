@@ -0,0 +1,69 @@
+"""
+Caché en memoria para lecturas por ID de comerciotech
+LRU acotada por tamaño, con expiración (TTL) y contadores de aciertos/fallos
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+class LRUCache:
+    """Caché LRU con TTL; las claves son tuplas (colección, id)"""
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Devuelve el valor guardado o None si no existe o expiró"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Guarda un valor y descarta el menos usado si se supera maxsize"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Elimina una entrada si existe"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, namespace=None):
+        """Vacía la caché completa o solo las entradas de una colección"""
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+                return
+            for key in [key for key in self._data if key[0] == namespace]:
+                del self._data[key]
+
+    def stats(self):
+        """Contadores para dimensionar la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else None
+            }
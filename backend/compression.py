@@ -0,0 +1,109 @@
+"""
+Compresión de respuestas HTTP de comerciotech
+gzip siempre; zstd y brotli (br) si están instalados (zstandard, brotli).
+Comprime cuerpos completos o flujos bloque por bloque: tras cada bloque se
+vacía el compresor, así el cliente recibe los datos sin esperar al final.
+"""
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits=31: formato gzip (cabecera y CRC), no deflate crudo
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+# Codificaciones disponibles en orden de preferencia ante calidades iguales
+# (zstd y brotli comprimen mejor que gzip; zstd además es más rápido)
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {'br': BrotliCompressor, **COMPRESSORS}
+if zstandard is not None:
+    COMPRESSORS = {'zstd': ZstdCompressor, **COMPRESSORS}
+
+def negotiate(accept_encodings):
+    """Mejor codificación disponible según Accept-Encoding, o None para no comprimir.
+
+    accept_encodings es el objeto Accept de werkzeug (request.accept_encodings):
+    respeta las calidades (q=0 excluye) y el comodín *.
+    """
+    best, best_quality = None, 0
+    for encoding in COMPRESSORS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding, level):
+    """Comprime un cuerpo completo"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def stream_compressor(encoding, level):
+    """Compresor con compress(bloque) (vaciado, decodificable al llegar) y finish()"""
+    return COMPRESSORS[encoding](level)
+
+class CompressedChunks:
+    """Iterable que comprime bloques (str o bytes) a medida que se producen.
+
+    close() cierra el iterable original aunque no se haya empezado a leer
+    (p. ej. en un HEAD o si el cliente se desconecta), liberando el cursor
+    de MongoDB que mantiene abierto.
+    """
+
+    def __init__(self, chunks, encoding, level, charset='utf-8'):
+        self._chunks = chunks
+        self._compressor = stream_compressor(encoding, level)
+        self._charset = charset
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(self._charset)
+            if chunk:
+                yield self._compressor.compress(chunk)
+        yield self._compressor.finish()
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,22 @@
+"""
+Fechas de comerciotech
+Conversión de fechas en texto a datetime para guardarlas como fechas BSON;
+la usan la API (fecha_pedido) y el importador (columnas de fecha)
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+def parse_date(value):
+    """Fecha ISO 8601 (2025-07-17, 2025-07-17T10:00:00Z) o HTTP (Thu, 17 Jul 2025 00:00:00 GMT)"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'Fecha inválida: {value}')
+    # MongoDB guarda fechas en UTC; las ingenuas se toman como UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
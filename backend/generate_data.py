@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos de comerciotech
+Crea clientes, productos y pedidos coherentes entre sí (cada pedido es de un
+cliente ya registrado y lleva productos existentes con su nombre y precio) y
+los escribe por la misma vía que import_data.py: lotes ya codificados en
+BSON, insert_many(ordered=False) con varios hilos por colección y las
+colecciones en paralelo. La generación se reparte entre procesos.
+
+Ejecutar desde el directorio backend:
+python generate_data.py                  (10.000 clientes, 1.000 productos y 100.000 pedidos)
+python generate_data.py --clientes 1000000 --productos 100000 --pedidos 10000000 --drop
+
+La misma semilla (--seed) produce exactamente los mismos documentos, con
+cualquier cantidad de procesos. Distribuciones:
+- Popularidad de productos según una ley de Zipf (--zipf): unos pocos
+  productos concentran buena parte de las ventas.
+- Pedidos entre --desde y --hasta, en orden cronológico (codigo_pedido y _id
+  crecen con la fecha): las ventas se triplican a lo largo del periodo, suben
+  en noviembre, diciembre y los fines de semana, y se concentran a mediodía
+  y en la noche.
+- Los clientes se registran a lo largo del periodo y solo compran después de
+  registrarse; los más antiguos compran más.
+
+Con --drop los índices se crean después de cargar (construirlos de una vez es
+más rápido que mantenerlos documento a documento). Al final se recalcula el
+resumen de ventas, igual que en import_data.py.
+"""
+
+from bson import ObjectId
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import argparse
+import bisect
+import functools
+import hashlib
+import itertools
+import os
+import random
+import struct
+import sys
+
+from import_data import (
+    COLLECTIONS, LoadStats, connect, encode_operations, load_batches, pipelined,
+    print_summary, process_pool, refresh_after_load, run_loads
+)
+from indexes import ensure_indexes
+from mongo import config_from_env
+
+# Documentos por lote. Es fijo porque cada lote tiene su propio generador
+# aleatorio: así la semilla determina los datos sin importar --processes
+CHUNK_SIZE = 1000
+
+GenerationSpec = namedtuple('GenerationSpec', 'seed clientes productos pedidos desde hasta zipf')
+
+# ========================================
+# 📚 VOCABULARIO
+# ========================================
+
+NOMBRES = (
+    'Luan', 'Jorge', 'Pablo', 'Luis', 'Angel', 'Felipe', 'Kai', 'Camila', 'Valentina', 'Francisca',
+    'Javiera', 'Catalina', 'Constanza', 'Fernanda', 'Daniela', 'Antonia', 'Sofía', 'Isidora', 'Martina',
+    'Josefa', 'Matías', 'Benjamín', 'Vicente', 'Martín', 'Sebastián', 'Diego', 'Nicolás', 'Tomás',
+    'Joaquín', 'Cristóbal', 'Ignacio', 'Agustín', 'Carolina', 'Paula', 'Claudia', 'Rodrigo', 'Andrés',
+    'Gonzalo', 'Marcela', 'Patricio',
+)
+
+APELLIDOS = (
+    'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda',
+    'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza',
+    'Valenzuela', 'Castillo', 'Tapia', 'Reyes', 'Gutiérrez', 'Castro', 'Pizarro', 'Álvarez', 'Vásquez',
+    'Sánchez', 'Fernández', 'Ramírez', 'Carrasco', 'Gómez', 'Cortés', 'Herrera', 'Núñez', 'Jara',
+    'Vergara', 'Rivera', 'Alarcón', 'Altamirano', 'Villa', 'Brito', 'Rivas', 'Suarez',
+)
+
+CALLES = (
+    'Los Álamos', 'Las Rosas', 'Colo Colo', 'Brasil', 'Maipú', 'Manuel Rodríguez', 'Lautaro',
+    "O'Higgins", 'Caupolicán', 'Arturo Prat', 'Freire', 'Barros Arana', 'San Martín', 'Los Carrera',
+    'Pedro de Valdivia', 'Las Heras', 'Aníbal Pinto', 'Serrano', 'Los Aromos', 'Los Robles',
+    'Avenida Alemania', 'Picarte', 'Errázuriz', 'Yungay', 'Chacabuco',
+)
+
+# Ciudades con peso aproximado a su población
+CIUDADES = {
+    'Santiago': 40, 'Concepción': 7, 'Valparaíso': 5, 'Viña del Mar': 5, 'Antofagasta': 4,
+    'Temuco': 4, 'Puerto Montt': 3, 'La Serena': 3, 'Rancagua': 3, 'Talca': 3, 'Iquique': 2,
+    'Chillán': 2, 'Arica': 2, 'Valdivia': 2, 'Osorno': 2, 'San pedro de la paz': 1,
+    'Chiguayante': 1, 'Punta Arenas': 1, 'Coyhaique': 1,
+}
+
+# Categoría: (tipos de producto, marcas, precio mínimo, precio máximo, peso en el catálogo)
+CATEGORIAS = {
+    'Computadoras': (('Laptop', 'Notebook', 'PC de escritorio', 'All in One'),
+                     ('Apple', 'Asus', 'Lenovo', 'HP', 'Dell', 'Acer'), 350000, 2500000, 12),
+    'Cámaras': (('Cámara Fotográfica', 'Cámara deportiva', 'Lente'),
+                ('Canon', 'Sony', 'Nikon', 'Fujifilm', 'GoPro'), 150000, 2500000, 6),
+    'Consolas': (('Consola', 'Control', 'Juego'),
+                 ('PlayStation', 'Xbox', 'Nintendo'), 30000, 650000, 5),
+    'Smartphones': (('Smartphone', 'Celular'),
+                    ('Apple', 'Samsung', 'Xiaomi', 'Motorola', 'Huawei'), 120000, 1400000, 14),
+    'Tablets': (('Tablet',),
+                ('Apple', 'Samsung', 'Lenovo', 'Xiaomi'), 100000, 1300000, 6),
+    'Wearables': (('Smartwatch', 'Pulsera deportiva'),
+                  ('Apple', 'Samsung', 'Garmin', 'Xiaomi', 'Huawei'), 30000, 600000, 6),
+    'Audio': (('Auriculares', 'Parlante', 'Audífonos', 'Barra de sonido'),
+              ('Bose', 'Sony', 'JBL', 'Sennheiser', 'Samsung'), 15000, 450000, 14),
+    'Monitores': (('Monitor',),
+                  ('LG', 'Samsung', 'Dell', 'Asus', 'AOC'), 90000, 1500000, 7),
+    'Almacenamiento': (('Disco SSD', 'Disco duro externo', 'Pendrive', 'Tarjeta microSD'),
+                       ('Samsung', 'Kingston', 'WD', 'Seagate', 'SanDisk'), 6000, 350000, 10),
+    'Accesorios': (('Teclado mecánico', 'Mouse', 'Cargador', 'Cable USB-C', 'Funda', 'Mochila'),
+                   ('Logitech', 'Razer', 'Anker', 'Belkin', 'HyperX'), 5000, 150000, 20),
+}
+
+SERIES = ('Pro', 'Max', 'Air', 'Ultra', 'Lite', 'Plus', 'X', 'S', 'Neo', 'Prime')
+
+ATRIBUTOS = (
+    'ideal para uso diario', 'con garantía de 12 meses', 'edición 2025', 'color negro',
+    'color plata', 'alta eficiencia energética', 'diseño compacto', 'nivel profesional',
+)
+
+METODOS_PAGO = {
+    'Tarjeta de crédito': 40, 'Tarjeta de débito': 28, 'Transferencia': 14,
+    'Crédito en cuotas': 10, 'Débito': 5, 'Pago en efectivo': 3,
+}
+
+# Pesos de 1..5 productos distintos por pedido y de 1..4 unidades por producto
+PRODUCTOS_POR_PEDIDO = (55, 25, 12, 5, 3)
+UNIDADES = (70, 20, 7, 3)
+
+# Ventas al final del periodo respecto del inicio, factores por mes y de fin de semana
+CRECIMIENTO = 3.0
+FACTOR_MES = {1: 0.8, 2: 0.85, 11: 1.4, 12: 1.8}
+FACTOR_FIN_DE_SEMANA = 1.3
+VENTAS_POR_HORA = (2, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 10, 12, 12, 10, 9, 9, 10, 12, 14, 15, 14, 10, 5)
+
+# Exponente de la antigüedad al elegir cliente (mayor que 1: los antiguos compran más)
+FIDELIDAD = 2.0
+
+COLLECTION_TAGS = {'clientes': 1, 'productos': 2, 'pedidos': 3}
+EPOCH = datetime(1970, 1, 1)
+
+# ========================================
+# 🎲 DISTRIBUCIONES
+# ========================================
+
+def pick(rng, cumulative):
+    """Índice al azar según pesos acumulados"""
+    return bisect.bisect(cumulative, rng.random() * cumulative[-1])
+
+def locate(cumulative, x):
+    """Tramo de una distribución acumulada en que cae x y la fracción recorrida dentro de él"""
+    i = bisect.bisect(cumulative, x)
+    low = cumulative[i - 1] if i else 0.0
+    return i, (x - low) / (cumulative[i] - low)
+
+def make_id(tables, collection, index, when):
+    """ObjectId determinista: segundo de when, colección, semilla e índice (único en la colección)"""
+    seconds = int((when - EPOCH).total_seconds())
+    return ObjectId(
+        struct.pack('>I', seconds) + bytes([COLLECTION_TAGS[collection]]) + tables.seed_bytes + struct.pack('>I', index)
+    )
+
+class Tables:
+    """Pesos acumulados derivados de la especificación, calculados una vez por proceso"""
+
+    def __init__(self, spec):
+        self.seed_bytes = hashlib.sha1(str(spec.seed).encode()).digest()[:3]
+        self.start = datetime.combine(spec.desde, datetime.min.time())
+        self.days = (spec.hasta - spec.desde).days + 1
+        weights = []
+        for day in range(self.days):
+            current = spec.desde + timedelta(days=day)
+            weight = 1 + (CRECIMIENTO - 1) * day / max(self.days - 1, 1)
+            weight *= FACTOR_MES.get(current.month, 1.0)
+            if current.weekday() >= 5:
+                weight *= FACTOR_FIN_DE_SEMANA
+            weights.append(weight)
+        self.day_weights = list(itertools.accumulate(weights))
+        self.hour_weights = list(itertools.accumulate(VENTAS_POR_HORA))
+        self.ciudades = list(CIUDADES)
+        self.ciudad_weights = list(itertools.accumulate(CIUDADES.values()))
+        self.categorias = list(CATEGORIAS)
+        self.categoria_weights = list(itertools.accumulate(entry[4] for entry in CATEGORIAS.values()))
+        self.metodos_pago = list(METODOS_PAGO)
+        self.metodo_pago_weights = list(itertools.accumulate(METODOS_PAGO.values()))
+        self.productos_por_pedido = list(itertools.accumulate(PRODUCTOS_POR_PEDIDO))
+        self.unidades = list(itertools.accumulate(UNIDADES))
+
+        # El producto en el puesto r de popularidad tiene peso 1 / (r + 1)^zipf;
+        # los puestos se reparten al azar para que no coincidan con el orden del catálogo
+        self.popularity = list(range(spec.productos))
+        random.Random(f'{spec.seed}:popularidad').shuffle(self.popularity)
+        self.popularity_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** spec.zipf for rank in range(spec.productos)
+        ))
+        self._catalog = None
+        self._spec = spec
+
+    @property
+    def catalog(self):
+        """(_id, nombre, precio) de cada producto, regenerados con la misma semilla"""
+        if self._catalog is None:
+            self._catalog = [
+                (doc['_id'], doc['nombre'], doc['precio'])
+                for start in range(0, self._spec.productos, CHUNK_SIZE)
+                for doc in documents(self._spec, 'productos', start, min(CHUNK_SIZE, self._spec.productos - start))
+            ]
+        return self._catalog
+
+@functools.lru_cache(maxsize=None)
+def tables(spec):
+    return Tables(spec)
+
+# ========================================
+# 🏭 DOCUMENTOS
+# ========================================
+
+def registration_day(spec, tables, index):
+    """Los clientes se registran en orden, repartidos en el periodo"""
+    return index * tables.days // spec.clientes
+
+def cliente_id(spec, tables, index):
+    registered = tables.start + timedelta(days=registration_day(spec, tables, index))
+    return make_id(tables, 'clientes', index, registered)
+
+def generate_cliente(spec, tables, rng, index):
+    return {
+        '_id': cliente_id(spec, tables, index),
+        'identificador': f'C{index + 1:07d}',
+        'nombre': rng.choice(NOMBRES),
+        'apellidos': f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+        'direccion': {
+            'calle': rng.choice(CALLES),
+            'numero': str(rng.randint(1, 3000)),
+            'ciudad': tables.ciudades[pick(rng, tables.ciudad_weights)],
+        },
+        'fechaRegistro': (spec.desde + timedelta(days=registration_day(spec, tables, index))).isoformat(),
+    }
+
+def generate_producto(spec, tables, rng, index):
+    categoria = tables.categorias[pick(rng, tables.categoria_weights)]
+    tipos, marcas, precio_min, precio_max, _ = CATEGORIAS[categoria]
+    tipo, marca = rng.choice(tipos), rng.choice(marcas)
+    modelo = f'{rng.choice(SERIES)} {rng.randint(1, 99)}'
+    # Precio log-uniforme en el rango de la categoría, redondeado a miles
+    precio = int(round(precio_min * (precio_max / precio_min) ** rng.random(), -3)) or 1000
+    return {
+        '_id': make_id(tables, 'productos', index, tables.start),
+        'nombre': f'{tipo} {marca} {modelo}',
+        'descripcion': f'{tipo} {marca} {modelo}, {rng.choice(ATRIBUTOS)}',
+        'precio': precio,
+        'stock': int(rng.expovariate(1 / 40)),
+        'categoria': categoria,
+    }
+
+def generate_pedido(spec, tables, rng, index):
+    # Posición del pedido en la distribución acumulada de fechas: con el
+    # índice crece la fecha, así los pedidos quedan en orden cronológico
+    position = (index + rng.random()) / spec.pedidos * tables.day_weights[-1]
+    day, fraction = locate(tables.day_weights, position)
+    hour, fraction = locate(tables.hour_weights, fraction * tables.hour_weights[-1])
+    fecha = tables.start + timedelta(days=day, hours=hour, seconds=int(fraction * 3600))
+
+    # Clientes registrados hasta ese día, con preferencia por los más antiguos
+    registered = min(spec.clientes, max(1, -(-(day + 1) * spec.clientes // tables.days)))
+    cliente = int(registered * rng.random() ** FIDELIDAD)
+
+    catalog = tables.catalog
+    wanted = min(pick(rng, tables.productos_por_pedido) + 1, spec.productos)
+    chosen = []
+    while len(chosen) < wanted:
+        producto = tables.popularity[pick(rng, tables.popularity_weights)]
+        if producto not in chosen:
+            chosen.append(producto)
+
+    productos = []
+    for producto in chosen:
+        producto_id, nombre, precio = catalog[producto]
+        cantidad = pick(rng, tables.unidades) + 1
+        productos.append({
+            'productoId': producto_id,
+            'nombre': nombre,
+            'cantidad': cantidad,
+            'precio_unitario': precio,
+            'total_comprado': precio * cantidad,
+        })
+    return {
+        '_id': make_id(tables, 'pedidos', index, fecha),
+        'codigo_pedido': f'P{index + 1:09d}',
+        'clienteId': cliente_id(spec, tables, cliente),
+        'fecha_pedido': fecha,
+        'productos': productos,
+        'total_compra': sum(linea['total_comprado'] for linea in productos),
+        'metodo_pago': tables.metodos_pago[pick(rng, tables.metodo_pago_weights)],
+    }
+
+GENERATORS = {'clientes': generate_cliente, 'productos': generate_producto, 'pedidos': generate_pedido}
+
+def documents(spec, collection, start, count):
+    """Documentos start..start+count-1 de la colección.
+
+    Cada lote usa su propio generador aleatorio, derivado de la semilla y de
+    su posición: el resultado no depende del proceso que lo genere.
+    """
+    rng = random.Random(f'{spec.seed}:{collection}:{start}')
+    generate = GENERATORS[collection]
+    spec_tables = tables(spec)
+    return [generate(spec, spec_tables, rng, index) for index in range(start, start + count)]
+
+def generate_chunk(spec, collection, start, count):
+    """Lote codificado en BSON para insert_many (corre en otro proceso cuando hay varios)"""
+    return encode_operations(documents(spec, collection, start, count), 'insert', None)
+
+def generated_batches(spec, collection, executor, processes):
+    total = getattr(spec, collection)
+    return pipelined(
+        ((generate_chunk, (spec, collection, start, min(CHUNK_SIZE, total - start)))
+         for start in range(0, total, CHUNK_SIZE)),
+        executor, processes
+    )
+
+# ========================================
+# 🚀 LÍNEA DE COMANDOS
+# ========================================
+
+def main(argv=None):
+    env = config_from_env()
+    parser = argparse.ArgumentParser(description='Generador de datos sintéticos de comerciotech')
+    parser.add_argument('--clientes', type=int, default=10000, help='cantidad de clientes (10000)')
+    parser.add_argument('--productos', type=int, default=1000, help='cantidad de productos (1000)')
+    parser.add_argument('--pedidos', type=int, default=100000, help='cantidad de pedidos (100000)')
+    parser.add_argument('--seed', type=int, default=1, help='semilla (1)')
+    parser.add_argument('--desde', type=date.fromisoformat, default=date(2023, 1, 1), help='primer día de pedidos (2023-01-01)')
+    parser.add_argument('--hasta', type=date.fromisoformat, default=date(2025, 12, 31), help='último día de pedidos (2025-12-31)')
+    parser.add_argument('--zipf', type=float, default=1.1, help='sesgo de la popularidad de productos (1.1; 0 es uniforme)')
+    parser.add_argument('--uri', default=env['MONGO_URI'], help='URI de MongoDB (COMERCIOTECH_MONGO_URI)')
+    parser.add_argument('--db', default=env['MONGO_DB'], help='base de datos (COMERCIOTECH_MONGO_DB)')
+    parser.add_argument('--workers', type=int, default=4, help='hilos de escritura por colección (4)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='procesos que generan los documentos (uno por núcleo)')
+    parser.add_argument('--drop', action='store_true', help='borrar antes las colecciones que se generan')
+    parser.add_argument('--progress', type=float, default=5, help='segundos entre reportes de avance (5)')
+    args = parser.parse_args(argv)
+
+    if min(args.clientes, args.productos, args.pedidos) < 0:
+        print("❌ Las cantidades no pueden ser negativas")
+        return 2
+    if args.pedidos and not (args.clientes and args.productos):
+        print("❌ Para generar pedidos hacen falta clientes y productos")
+        return 2
+    if args.desde > args.hasta:
+        print("❌ --desde debe ser anterior a --hasta")
+        return 2
+
+    spec = GenerationSpec(args.seed, args.clientes, args.productos, args.pedidos, args.desde, args.hasta, args.zipf)
+    names = [name for name in COLLECTIONS if getattr(spec, name)]
+    client, db = connect(args.uri, args.db, args.workers * len(names) + 2)
+    if client is None:
+        return 1
+
+    if args.drop:
+        print(f"🧹 Borrando colecciones: {', '.join(names)}")
+        for name in names:
+            db[name].drop()
+
+    executor = process_pool(args.processes)
+    all_stats = [LoadStats(name, f'semilla {args.seed}') for name in names]
+    jobs = [
+        functools.partial(
+            load_batches, db[name], generated_batches(spec, name, executor, args.processes),
+            'insert', args.workers, stats
+        )
+        for name, stats in zip(names, all_stats)
+    ]
+    print(f"🏭 Generando {', '.join(f'{getattr(spec, name):,} {name}' for name in names)} "
+          f"({args.processes} proceso(s))...")
+    elapsed = run_loads(jobs, all_stats, args.progress)
+    if executor is not None:
+        executor.shutdown()
+
+    errors = print_summary(all_stats, elapsed)
+    print("🗂️ Verificando índices...")
+    ensure_indexes(db)
+    refresh_after_load(db, names)
+    client.close()
+
+    if errors:
+        print("\n⚠️ Generación terminada con errores")
+        return 1
+    print("\n🎉 ¡Datos generados exitosamente!")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
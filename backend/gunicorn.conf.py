@@ -0,0 +1,83 @@
+"""
+Configuración de gunicorn para servir comerciotech en producción
+Ejecutar desde el directorio backend:
+gunicorn -c gunicorn.conf.py
+
+N procesos (workers) x M hilos (threads) con el worker gthread. El master
+importa la app sin conectarse a MongoDB y cada worker crea su propio
+MongoClient después del fork (PyMongo no admite usar un cliente heredado).
+
+Variables de entorno (además de las de MongoDB, ver mongo.py):
+COMERCIOTECH_BIND        dirección de escucha (0.0.0.0:5001)
+COMERCIOTECH_WORKERS     procesos (núcleos x 2 + 1)
+COMERCIOTECH_THREADS     hilos por proceso (8)
+COMERCIOTECH_KEEPALIVE   segundos que se conserva una conexión inactiva (65)
+
+Cada worker tiene su propio pool: el total de conexiones a MongoDB es
+workers x COMERCIOTECH_MONGO_MAX_POOL_SIZE (por defecto, igual a los hilos).
+Las métricas de /metrics y las cachés también son por worker.
+
+Por qué estos valores por defecto (punto de partida, no un resultado medido):
+- workers = núcleos x 2 + 1 es la regla inicial de gunicorn. Por el GIL un
+  proceso ejecuta Python en un solo núcleo a la vez; con el doble de
+  procesos, mientras uno espera a MongoDB o a la red otro usa el núcleo.
+- threads = 8 cubre la espera de E/S dentro de cada proceso: casi todas las
+  rutas pasan la mayor parte del tiempo esperando a MongoDB, no en CPU.
+  Más hilos que conexiones en el pool solo hacen cola en el pool.
+Con consultas lentas conviene más hilos; con CPU saturada (JSON grande,
+compresión), menos hilos y no más procesos que núcleos x 2 + 1.
+
+Cómo ajustarlos: medir con bench.py contra un MongoDB real y con datos de
+volumen realista (ver la metodología en su docstring), variando
+COMERCIOTECH_WORKERS y COMERCIOTECH_THREADS de a uno por vez. Si
+comerciotech_mongodb_pool_checkout_wait_seconds (en /metrics) crece, los
+hilos esperan conexiones: subir el pool o bajar los hilos. Con
+bench.py --results cada pasada queda anotada con el hardware y los
+documentos de cada colección, para comparar python app.py, gunicorn y
+uvicorn sobre los mismos datos. Todavía no hay resultados contra un
+MongoDB real: las pruebas hechas hasta ahora usaron una base en memoria y
+no sirven para dimensionar.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'app:app'
+bind = os.environ.get('COMERCIOTECH_BIND', '0.0.0.0:5001')
+
+worker_class = 'gthread'
+workers = int(os.environ.get('COMERCIOTECH_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('COMERCIOTECH_THREADS', 8))
+# Conexiones abiertas por worker (activas o en keep-alive); las inactivas no ocupan un hilo
+worker_connections = 1000
+
+# Mayor que el tiempo de inactividad típico de un balanceador (60 s): así lo
+# cierra primero el balanceador y no reutiliza una conexión que gunicorn ya cerró
+keepalive = int(os.environ.get('COMERCIOTECH_KEEPALIVE', 65))
+timeout = 30
+graceful_timeout = 30
+backlog = 2048
+
+# Importar app.py no abre conexiones (ver create_app), así que se puede
+# cargar una vez en el master y compartir el código entre workers
+preload_app = True
+
+# Un hilo ocupa como mucho una conexión a la vez: no hace falta un pool mayor
+os.environ.setdefault('COMERCIOTECH_MONGO_MAX_POOL_SIZE', str(threads))
+
+errorlog = '-'
+loglevel = 'info'
+
+def post_worker_init(worker):
+    """Cliente de MongoDB propio de cada worker y pre-calentamiento opcional"""
+    from app import warm_up
+    from mongo import config_from_env
+
+    mongo = worker.wsgi.extensions['comerciotech_mongo']
+    # Si el master hubiese creado un cliente, sus sockets no sirven en este proceso
+    mongo.forget()
+    if config_from_env()['MONGO_PREWARM']:
+        try:
+            warm_up(worker.wsgi)
+        except Exception as e:
+            worker.log.warning(f"No se pudo pre-calentar la conexión a MongoDB: {e}")
@@ -1,414 +1,617 @@
 #!/usr/bin/env python3
 """
-Script para importar los datos reales de comerciotech
-Ejecutar desde el directorio backend con: python import_data.py
+Carga masiva de datos de comerciotech desde archivos CSV, NDJSON o BSON
+Lee cada archivo en lotes acotados (nunca entero en memoria) y escribe con
+varios hilos por colección; las colecciones se cargan en paralelo. No borra
+datos existentes salvo que se pida con --drop.
+
+Ejecutar desde el directorio backend:
+python import_data.py                                  (datos de ejemplo de datos/)
+python import_data.py export/clientes.csv export/pedidos.ndjson
+python import_data.py pedidos=dump/comerciotech/pedidos.bson --mode insert --batch-size 5000
+
+La colección sale del nombre del archivo (clientes.csv -> clientes) o se
+indica como coleccion=ruta. El formato sale de la extensión (.csv, .ndjson,
+.jsonl, .json, .bson) o de --format.
+
+Modos de escritura:
+upsert  (por defecto) bulk_write por clave natural: clientes por
+        identificador, pedidos por codigo_pedido, productos por _id. Se puede
+        repetir sobre una base en uso: actualiza lo existente y crea lo nuevo
+        (un documento existente conserva su _id; los clienteId de pedidos que
+        apuntaban al _id del archivo se corrigen al terminar).
+insert  insert_many(ordered=False): lo más rápido para una colección vacía;
+        los duplicados se cuentan y se omiten. Un .bson se inserta tal cual
+        viene del archivo, sin decodificarlo.
+
+Interpretar JSON o CSV cuesta más CPU que escribir: con archivos grandes
+(16 MB o más en total) cada lote se interpreta y codifica en BSON en un
+proceso aparte, uno por núcleo (--processes N para fijarlo, 1 para no usar
+procesos), y los hilos de escritura envían esos bytes sin volver a codificar.
+
+NDJSON acepta JSON extendido ({"$oid": ...}, {"$date": ...}), como los de
+mongoexport. En CSV los encabezados con punto arman subdocumentos
+(direccion.calle) y un sufijo indica el tipo de la columna: precio:int,
+total:float, activo:bool, fecha_pedido:date, clienteId:oid, productos:json
+(sin sufijo es texto; una celda vacía omite el campo). En todos los formatos
+_id, clienteId, productoId y fecha_pedido se convierten a ObjectId o fecha
+si vienen como texto (p. ej. en un export de la propia API).
 """
 
-from pymongo import MongoClient
-from bson import ObjectId
-from datetime import datetime
-import json
+from pymongo import InsertOne, MongoClient, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId, decode, encode, json_util
+from bson.raw_bson import RawBSONDocument
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import collections
+import csv
+import functools
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import threading
+import time
 
-# Conectar a MongoDB
-try:
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['comerciotech']
-    print("✅ Conectado a MongoDB exitosamente")
-except Exception as e:
-    print(f"❌ Error al conectar con MongoDB: {e}")
-    exit(1)
+from fechas import parse_date
+from indexes import ensure_indexes
+from mongo import config_from_env
+from ventas_rollup import rebuild_rollup
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos')
+COLLECTIONS = ('clientes', 'productos', 'pedidos')
+
+# Clave por la que se actualiza cada colección en modo upsert (con índice único o _id)
+NATURAL_KEYS = {'clientes': 'identificador', 'productos': '_id', 'pedidos': 'codigo_pedido'}
 
-# Colecciones
-clientes_collection = db['clientes']
-productos_collection = db['productos']
-pedidos_collection = db['pedidos']
+# Campos que apuntan al _id de otra colección: (colección que apunta, campo)
+REFERENCES = {'clientes': [('pedidos', 'clienteId')]}
 
-print("🧹 Limpiando colecciones existentes...")
-clientes_collection.drop()
-productos_collection.drop()
-pedidos_collection.drop()
+# Campos que se convierten si llegan como texto, en cualquier nivel del documento
+OBJECTID_FIELDS = {'_id', 'clienteId', 'productoId'}
+DATE_FIELDS = {'fecha_pedido'}
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'ndjson', '.bson': 'bson'}
+
+# Con archivos más grandes que esto (en total) se interpreta en varios procesos
+PARALLEL_PARSE_BYTES = 16 * 1024 * 1024
+
+# Correcciones de referencias por bulk_write al terminar la carga
+REMAP_BATCH_SIZE = 1000
 
 # ========================================
-# 👥 DATOS REALES DE CLIENTES
+# 🔄 CONVERSIÓN DE CAMPOS
 # ========================================
 
-print("📥 Importando clientes...")
-
-clientes_data = [
-    {
-        "_id": ObjectId("68782d020f955f3ff6066610"),
-        "identificador": "C001",
-        "nombre": "Luan",
-        "apellidos": "Hernández Alarcón",
-        "direccion": {
-            "calle": "Los Álamos",
-            "numero": "45",
-            "ciudad": "San pedro de la paz"
-        },
-        "fechaRegistro": "2025-07-01"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066611"),
-        "identificador": "C002",
-        "nombre": "Jorge",
-        "apellidos": "Castillo Altamirano",
-        "direccion": {
-            "calle": "Las Rosas",
-            "numero": "1232",
-            "ciudad": "Concepción"
-        },
-        "fechaRegistro": "2025-10-12"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066612"),
-        "identificador": "C003",
-        "nombre": "Pablo",
-        "apellidos": "Villa Alarcón",
-        "direccion": {
-            "calle": "Colo Colo",
-            "numero": "112",
-            "ciudad": "Chiguayante"
-        },
-        "fechaRegistro": "2025-12-16"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066613"),
-        "identificador": "C004",
-        "nombre": "Luis",
-        "apellidos": "Martínez Soto",
-        "direccion": {
-            "calle": "Brasil",
-            "numero": "788",
-            "ciudad": "Osorno"
-        },
-        "fechaRegistro": "2025-12-15"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066614"),
-        "identificador": "C005",
-        "nombre": "Angel",
-        "apellidos": "Brito Rivas",
-        "direccion": {
-            "calle": "Maipú",
-            "numero": "255",
-            "ciudad": "Concepción"
-        },
-        "fechaRegistro": "2025-12-14"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066615"),
-        "identificador": "C006",
-        "nombre": "Felipe",
-        "apellidos": "Suarez Vergara",
-        "direccion": {
-            "calle": "Manuel Rodríguez",
-            "numero": "1022",
-            "ciudad": "Valdivia"
-        },
-        "fechaRegistro": "2025-12-13"
-    },
-    {
-        "_id": ObjectId("68782d020f955f3ff6066616"),
-        "identificador": "C007",
-        "nombre": "Kai",
-        "apellidos": "Hernández Alarcón",
-        "direccion": {
-            "calle": "Lautaro",
-            "numero": "778",
-            "ciudad": "Concepción"
-        },
-        "fechaRegistro": "2025-12-12"
-    }
-]
-
-result = clientes_collection.insert_many(clientes_data)
-print(f"✅ {len(result.inserted_ids)} clientes importados")
+def parse_bool(value):
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'si', 'sí', 'yes'):
+        return True
+    if lowered in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Booleano inválido: {value}')
+
+def convert_doc(doc):
+    """Convierte en el lugar los campos conocidos que llegan como texto (también en subdocumentos)"""
+    for field, value in doc.items():
+        if isinstance(value, str):
+            if field in OBJECTID_FIELDS and ObjectId.is_valid(value):
+                doc[field] = ObjectId(value)
+            elif field in DATE_FIELDS:
+                doc[field] = parse_date(value)
+        elif isinstance(value, dict):
+            convert_doc(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    convert_doc(item)
+    return doc
 
 # ========================================
-# 📦 DATOS REALES DE PRODUCTOS
+# 📄 LECTURA DE ARCHIVOS
 # ========================================
 
-print("📥 Importando productos...")
-
-productos_data = [
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c93"),
-        "nombre": "MacBook Air M2",
-        "descripcion": "Portátil Apple con chip M2, 8GB RAM, 256GB SSD",
-        "precio": 1200000,
-        "stock": 15,
-        "categoria": "Computadoras"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c94"),
-        "nombre": "Cámara Fotográfica Canon EOS R6",
-        "descripcion": "Cámara mirrorless profesional con sensor full-frame",
-        "precio": 1800000,
-        "stock": 8,
-        "categoria": "Cámaras"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c95"),
-        "nombre": "Cámara Fotográfica Sony Alpha A7 III",
-        "descripcion": "Cámara mirrorless full-frame con excelente desempeño en video",
-        "precio": 1750000,
-        "stock": 10,
-        "categoria": "Cámaras"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c96"),
-        "nombre": "Laptop Asus Intel Core i7",
-        "descripcion": "Laptop Asus con procesador Intel i7, 16GB RAM, 512GB SSD",
-        "precio": 900000,
-        "stock": 12,
-        "categoria": "Computadoras"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c97"),
-        "nombre": "PlayStation 5",
-        "descripcion": "Consola de videojuegos de última generación con SSD ultra rápido",
-        "precio": 550000,
-        "stock": 5,
-        "categoria": "Consolas"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c98"),
-        "nombre": "iPhone 14 Pro",
-        "descripcion": "Smartphone Apple con cámara triple y pantalla Super Retina XDR",
-        "precio": 850000,
-        "stock": 20,
-        "categoria": "Smartphones"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c99"),
-        "nombre": "Samsung Galaxy S22 Ultra",
-        "descripcion": "Smartphone Samsung con cámara de 108MP y S-Pen incorporado",
-        "precio": 800000,
-        "stock": 18,
-        "categoria": "Smartphones"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9a"),
-        "nombre": "Tablet iPad Pro 12.9\"",
-        "descripcion": "Tablet Apple con chip M1 y pantalla Liquid Retina XDR",
-        "precio": 950000,
-        "stock": 10,
-        "categoria": "Tablets"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9b"),
-        "nombre": "Apple Watch Series 8",
-        "descripcion": "Smartwatch con monitoreo avanzado de salud y deporte",
-        "precio": 300000,
-        "stock": 25,
-        "categoria": "Wearables"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9c"),
-        "nombre": "Auriculares Bose QuietComfort 45",
-        "descripcion": "Auriculares inalámbricos con cancelación activa de ruido",
-        "precio": 220000,
-        "stock": 30,
-        "categoria": "Audio"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9d"),
-        "nombre": "Monitor LG UltraFine 5K",
-        "descripcion": "Monitor de alta resolución para profesionales del diseño",
-        "precio": 1300000,
-        "stock": 7,
-        "categoria": "Monitores"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9e"),
-        "nombre": "Disco SSD Samsung 1TB",
-        "descripcion": "Disco sólido de alta velocidad para almacenamiento",
-        "precio": 120000,
-        "stock": 40,
-        "categoria": "Almacenamiento"
-    },
-    {
-        "_id": ObjectId("687854a1519fb2b1e9e63c9f"),
-        "nombre": "Teclado mecánico Logitech G Pro",
-        "descripcion": "Teclado mecánico para gamers con retroiluminación RGB",
-        "precio": 90000,
-        "stock": 50,
-        "categoria": "Accesorios"
-    }
-]
-
-result = productos_collection.insert_many(productos_data)
-print(f"✅ {len(result.inserted_ids)} productos importados")
+CSV_TYPES = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': parse_bool,
+    'date': parse_date,
+    'oid': ObjectId,
+    'json': json_util.loads,
+}
+
+def parse_column(header):
+    """'direccion.calle' -> (('direccion', 'calle'), 'str'); 'precio:int' -> (('precio',), 'int')"""
+    name, _, kind = header.strip().partition(':')
+    kind = kind or 'str'
+    if kind not in CSV_TYPES:
+        raise ValueError(f'Tipo de columna desconocido: {header}')
+    return tuple(name.split('.')), kind
+
+def csv_document(columns, row):
+    doc = {}
+    for (keys, kind), raw in zip(columns, row):
+        if raw == '':
+            continue
+        target = doc
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        try:
+            target[keys[-1]] = CSV_TYPES[kind](raw)
+        except Exception as e:
+            raise ValueError(f'{".".join(keys)} ({e})')
+    return doc
+
+def read_chunks(path, fmt, batch_size):
+    """Lee el archivo en trozos de hasta batch_size registros sin interpretar.
+
+    Devuelve tuplas (número del primer registro, registros, columnas): líneas
+    de NDJSON, filas de CSV o documentos BSON como bytes. Leer es barato;
+    interpretar (parse_chunk) es lo que se reparte entre procesos.
+    """
+    if fmt == 'bson':
+        with open(path, 'rb') as f:
+            yield from numbered_chunks(iter_bson(f), batch_size)
+    elif fmt == 'csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            columns = [parse_column(name) for name in header]
+            for first, rows, _ in numbered_chunks(reader, batch_size):
+                yield first, rows, columns
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield from numbered_chunks(f, batch_size)
+
+def numbered_chunks(records, batch_size):
+    chunk = []
+    first = 1
+    for number, record in enumerate(records, 1):
+        if not chunk:
+            first = number
+        chunk.append(record)
+        if len(chunk) >= batch_size:
+            yield first, chunk, None
+            chunk = []
+    if chunk:
+        yield first, chunk, None
+
+def iter_bson(f):
+    """Documentos de un archivo .bson (p. ej. de mongodump) como bytes, sin decodificarlos"""
+    while True:
+        header = f.read(4)
+        if not header:
+            return
+        if len(header) < 4:
+            raise ValueError('Archivo BSON truncado')
+        size = struct.unpack('<i', header)[0]
+        body = f.read(size - 4)
+        if len(body) < size - 4:
+            raise ValueError('Archivo BSON truncado')
+        yield header + body
+
+def parse_record(fmt, record, columns):
+    if fmt == 'bson':
+        return decode(record)
+    if fmt == 'csv':
+        return csv_document(columns, record)
+    return json_util.loads(record)
+
+def parse_chunk(fmt, first, records, columns, mode, key):
+    """Interpreta, convierte y codifica en BSON un trozo del archivo.
+
+    Corre en un proceso aparte cuando hay varios: devuelve bytes, que cruzan
+    entre procesos casi sin costo y que PyMongo envía sin volver a codificar.
+    Lanza ValueError indicando el registro que no se pudo interpretar.
+    """
+    docs = []
+    for number, record in enumerate(records, first):
+        if fmt == 'ndjson' and not record.strip():
+            continue
+        try:
+            docs.append(convert_doc(parse_record(fmt, record, columns)))
+        except Exception as e:
+            raise ValueError(f'registro {number}: {e}')
+    return encode_operations(docs, mode, key)
 
 # ========================================
-# 🛒 DATOS REALES DE PEDIDOS
+# 📥 ESCRITURA EN LOTES
 # ========================================
 
-print("📥 Importando pedidos...")
-
-pedidos_data = [
-    {
-        "_id": ObjectId("68787bd5d7295c52a76dab17"),
-        "codigo_pedido": "P001",
-        "clienteId": ObjectId("68782d020f955f3ff6066610"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c93"),
-                "nombre": "MacBook Air M2",
-                "cantidad": 1,
-                "precio_unitario": 1200000,
-                "total_comprado": 1200000
-            },
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9c"),
-                "nombre": "Auriculares Bose QuietComfort 45",
-                "cantidad": 2,
-                "precio_unitario": 220000,
-                "total_comprado": 440000
-            }
-        ],
-        "total_compra": 1640000,
-        "metodo_pago": "Tarjeta de crédito"
-    },
-    {
-        "_id": ObjectId("68787bd5d7295c52a76dab18"),
-        "codigo_pedido": "P002",
-        "clienteId": ObjectId("68782d020f955f3ff6066611"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9a"),
-                "nombre": "Tablet iPad Pro 12.9\"",
-                "cantidad": 1,
-                "precio_unitario": 950000,
-                "total_comprado": 950000
-            },
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9e"),
-                "nombre": "Disco SSD Samsung 1TB",
-                "cantidad": 2,
-                "precio_unitario": 120000,
-                "total_comprado": 240000
-            }
-        ],
-        "total_compra": 1190000,
-        "metodo_pago": "Transferencia"
-    },
-    {
-        "_id": ObjectId("68787bd5d7295c52a76dab19"),
-        "codigo_pedido": "P003",
-        "clienteId": ObjectId("68782d020f955f3ff6066612"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c97"),
-                "nombre": "PlayStation 5",
-                "cantidad": 1,
-                "precio_unitario": 550000,
-                "total_comprado": 550000
-            },
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9e"),
-                "nombre": "Disco SSD Samsung 1TB",
-                "cantidad": 1,
-                "precio_unitario": 120000,
-                "total_comprado": 120000
-            }
-        ],
-        "total_compra": 670000,
-        "metodo_pago": "Débito"
-    },
-    {
-        "_id": ObjectId("68787bf7d7295c52a76dab1a"),
-        "codigo_pedido": "P004",
-        "clienteId": ObjectId("68782d020f955f3ff6066613"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c99"),
-                "nombre": "Samsung Galaxy S22 Ultra",
-                "cantidad": 1,
-                "precio_unitario": 800000,
-                "total_comprado": 800000
-            }
-        ],
-        "total_compra": 800000,
-        "metodo_pago": "Tarjeta de débito"
-    },
-    {
-        "_id": ObjectId("68787bf7d7295c52a76dab1b"),
-        "codigo_pedido": "P005",
-        "clienteId": ObjectId("68782d020f955f3ff6066614"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9d"),
-                "nombre": "Monitor LG UltraFine 5K",
-                "cantidad": 1,
-                "precio_unitario": 1300000,
-                "total_comprado": 1300000
-            },
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c95"),
-                "nombre": "Cámara Fotográfica Sony Alpha A7 III",
-                "cantidad": 1,
-                "precio_unitario": 1750000,
-                "total_comprado": 1750000
-            }
-        ],
-        "total_compra": 3050000,
-        "metodo_pago": "Crédito en cuotas"
-    },
-    {
-        "_id": ObjectId("68787bf7d7295c52a76dab1c"),
-        "codigo_pedido": "P006",
-        "clienteId": ObjectId("68782d020f955f3ff6066615"),
-        "fecha_pedido": datetime(2025, 7, 17),
-        "productos": [
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c9f"),
-                "nombre": "Teclado mecánico Logitech G Pro",
-                "cantidad": 2,
-                "precio_unitario": 90000,
-                "total_comprado": 180000
-            },
-            {
-                "productoId": ObjectId("687854a1519fb2b1e9e63c98"),
-                "nombre": "iPhone 14 Pro",
-                "cantidad": 1,
-                "precio_unitario": 850000,
-                "total_comprado": 850000
-            }
-        ],
-        "total_compra": 1030000,
-        "metodo_pago": "Pago en efectivo"
-    }
-]
-
-result = pedidos_collection.insert_many(pedidos_data)
-print(f"✅ {len(result.inserted_ids)} pedidos importados")
+class LoadStats:
+    """Contadores de la carga de un archivo (los actualizan varios hilos)"""
+
+    FIELDS = ('read', 'inserted', 'upserted', 'modified', 'unchanged', 'duplicates', 'errors')
+
+    def __init__(self, collection, source):
+        self.collection = collection
+        self.source = source
+        self.started = time.perf_counter()
+        self.finished = None
+        self.messages = []
+        # _id del archivo -> _id guardado, para documentos que ya existían con otro _id
+        self.id_changes = {}
+        self._lock = threading.Lock()
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, message=None, **counts):
+        with self._lock:
+            for field, amount in counts.items():
+                setattr(self, field, getattr(self, field) + amount)
+            # Se guardan solo los primeros errores para el resumen
+            if message and len(self.messages) < 5:
+                self.messages.append(message)
+
+    def add_id_changes(self, changes):
+        with self._lock:
+            self.id_changes.update(changes)
+
+    @property
+    def written(self):
+        return self.inserted + self.upserted + self.modified + self.unchanged
+
+    def rate(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+def encode_operations(docs, mode, key):
+    """Operaciones del lote como (tipo, filtro o documento, cambios) ya codificadas en BSON.
+
+    En modo upsert cada documento se actualiza o crea por su clave natural;
+    sin clave (o sin _id si la clave es _id) se inserta.
+    """
+    operations = []
+    for doc in docs:
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+            has_id = False
+        else:
+            has_id = True
+        if mode == 'insert' or (key == '_id' and not has_id) or (key != '_id' and doc.get(key) is None):
+            operations.append(('insert', encode(doc), None))
+        elif key == '_id':
+            operations.append(('replace', encode({'_id': doc['_id']}), encode(doc)))
+        else:
+            update = {'$set': {field: value for field, value in doc.items() if field != '_id'}}
+            # El _id del archivo solo se usa al crear: los pedidos ya cargados apuntan al existente
+            if has_id:
+                update['$setOnInsert'] = {'_id': doc['_id']}
+            operations.append(('update', encode({key: doc[key]}), encode(update)))
+    return operations
+
+def raw_document(data):
+    """Documento ya codificado: PyMongo copia sus bytes al mensaje sin procesarlo"""
+    return RawBSONDocument(data)
+
+def to_request(operation):
+    kind, first, second = operation
+    if kind == 'insert':
+        return InsertOne(raw_document(first))
+    if kind == 'replace':
+        return ReplaceOne(raw_document(first), raw_document(second), upsert=True)
+    return UpdateOne(raw_document(first), raw_document(second), upsert=True)
+
+def write_error_counts(details):
+    """(duplicados, otros errores, primer mensaje) de los writeErrors de un BulkWriteError"""
+    write_errors = details.get('writeErrors', [])
+    duplicates = sum(1 for error in write_errors if error.get('code') == 11000)
+    others = [error for error in write_errors if error.get('code') != 11000]
+    message = others[0].get('errmsg') if others else None
+    return duplicates, len(others), message
+
+def id_changes(collection, operations):
+    """{_id del archivo: _id guardado} de los upserts que coincidieron con un documento con otro _id.
+
+    Un documento existente conserva su _id ($setOnInsert), así que lo que
+    apunte al _id del archivo hay que corregirlo al terminar la carga.
+    """
+    wanted = {}
+    key = None
+    for kind, first, second in operations:
+        if kind != 'update':
+            continue
+        update = decode(second)
+        if '$setOnInsert' not in update:
+            continue
+        (key, value), = decode(first).items()
+        wanted[value] = update['$setOnInsert']['_id']
+    if not wanted:
+        return {}
+    stored = collection.find({key: {'$in': list(wanted)}}, {key: 1})
+    return {wanted[doc[key]]: doc['_id'] for doc in stored if doc['_id'] != wanted[doc[key]]}
+
+def write_batch(collection, operations, mode, stats):
+    if mode == 'insert':
+        try:
+            result = collection.insert_many([raw_document(doc) for _, doc, _ in operations], ordered=False)
+            stats.add(inserted=len(result.inserted_ids))
+        except BulkWriteError as e:
+            duplicates, errors, message = write_error_counts(e.details)
+            stats.add(message, inserted=e.details.get('nInserted', 0), duplicates=duplicates, errors=errors)
+        return
+
+    try:
+        result = collection.bulk_write([to_request(operation) for operation in operations], ordered=False)
+        counts = result.bulk_api_result
+    except BulkWriteError as e:
+        counts = e.details
+        duplicates, errors, message = write_error_counts(e.details)
+        stats.add(message, duplicates=duplicates, errors=errors)
+    stats.add(
+        inserted=counts.get('nInserted', 0),
+        upserted=counts.get('nUpserted', 0),
+        modified=counts.get('nModified', 0),
+        unchanged=counts.get('nMatched', 0) - counts.get('nModified', 0)
+    )
+    # Una consulta más por lote, solo si otras colecciones apuntan a esta
+    if counts.get('nMatched', 0) and collection.name in REFERENCES:
+        stats.add_id_changes(id_changes(collection, operations))
+
+def pipelined(calls, executor=None, processes=1):
+    """Resultados de cada (función, argumentos) de calls, en orden.
+
+    Con executor las llamadas corren en otros procesos, con como mucho 2 en
+    curso por proceso para acotar la memoria; sin executor, en este hilo.
+    """
+    if executor is None:
+        for function, args in calls:
+            yield function(*args)
+        return
+    pending = collections.deque()
+    for function, args in calls:
+        pending.append(executor.submit(function, *args))
+        if len(pending) >= processes * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def parsed_batches(path, fmt, mode, key, batch_size, executor=None, processes=1):
+    """Lotes de operaciones codificadas, en el orden del archivo.
+
+    Un .bson en modo insert no se interpreta: sus documentos van tal cual.
+    """
+    chunks = read_chunks(path, fmt, batch_size)
+    if fmt == 'bson' and mode == 'insert':
+        for _, records, _ in chunks:
+            yield [('insert', record, None) for record in records]
+        return
+    yield from pipelined(
+        ((parse_chunk, (fmt, first, records, columns, mode, key)) for first, records, columns in chunks),
+        executor, processes
+    )
+
+def load_batches(collection, batches, mode, workers, stats):
+    """Consume los lotes desde este hilo y los escribe con workers hilos.
+
+    La cola acotada frena la lectura (o la generación) si MongoDB va más
+    lento: en memoria hay como mucho 2 x workers lotes pendientes.
+    """
+    pending = queue.Queue(maxsize=workers * 2)
+    failed = threading.Event()
+
+    def writer():
+        while True:
+            operations = pending.get()
+            if operations is None:
+                return
+            if failed.is_set():
+                continue
+            try:
+                write_batch(collection, operations, mode, stats)
+            except Exception as e:
+                # Sin conexión, sin permisos o documentos inválidos: no tiene sentido seguir leyendo
+                stats.add(f'{type(e).__name__}: {e}', errors=len(operations))
+                failed.set()
+
+    threads = [threading.Thread(target=writer, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for operations in batches:
+            if failed.is_set():
+                break
+            stats.add(read=len(operations))
+            pending.put(operations)
+    except (OSError, ValueError) as e:
+        stats.add(f'{stats.source}: {e}', errors=1)
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+        stats.finished = time.perf_counter()
+
+def load_file(db, collection_name, path, fmt, mode, batch_size, workers, executor, processes, stats):
+    key = NATURAL_KEYS.get(collection_name, '_id')
+    batches = parsed_batches(path, fmt, mode, key, batch_size, executor, processes)
+    load_batches(db[collection_name], batches, mode, workers, stats)
+
+def connect(uri, db_name, max_pool_size):
+    """(cliente, base de datos) verificados con un ping, o (None, None) si no se pudo conectar"""
+    try:
+        client = MongoClient(uri, maxPoolSize=max_pool_size)
+        db = client[db_name]
+        db.command('ping')
+    except Exception as e:
+        print(f"❌ Error al conectar con MongoDB: {e}")
+        return None, None
+    print("✅ Conectado a MongoDB exitosamente")
+    return client, db
+
+def process_pool(processes):
+    """Pool para interpretar o generar lotes, o None si processes es 1"""
+    if processes <= 1:
+        return None
+    # spawn: los procesos no heredan los hilos ni el MongoClient de este
+    return ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+
+def run_loads(jobs, all_stats, progress):
+    """Ejecuta cada carga (función sin argumentos) en su hilo mostrando el avance; devuelve los segundos"""
+    threads = [threading.Thread(target=job) for job in jobs]
+    done = threading.Event()
+    reporter = threading.Thread(target=report_progress, args=(all_stats, progress, done), daemon=True)
+    reporter.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    return time.perf_counter() - started
+
+def report_progress(all_stats, interval, done):
+    while not done.wait(interval):
+        for stats in all_stats:
+            if stats.finished is None:
+                print(f"⏳ {stats.collection}: {stats.read:,} leídos, {stats.written:,} escritos "
+                      f"({stats.rate():,.0f} docs/s)", flush=True)
+
+def print_summary(all_stats, elapsed):
+    """Muestra lo escrito por cada carga; devuelve el total de errores"""
+    print("\n" + "="*50)
+    print("📊 RESUMEN DE LA CARGA")
+    print("="*50)
+    errors = 0
+    for stats in all_stats:
+        print(f"{stats.collection} ({stats.source}): {stats.read:,} leídos, "
+              f"{stats.inserted:,} insertados, {stats.upserted:,} creados, {stats.modified:,} actualizados, "
+              f"{stats.unchanged:,} sin cambios, {stats.duplicates:,} duplicados, {stats.errors:,} errores "
+              f"- {stats.rate():,.0f} docs/s")
+        for message in stats.messages:
+            print(f"   ⚠️ {message}")
+        errors += stats.errors
+    total = sum(stats.written for stats in all_stats)
+    print(f"⏱️ {total:,} documentos escritos en {elapsed:.1f} s ({total / elapsed if elapsed else 0:,.0f} docs/s)")
+    return errors
+
+def remap_references(db, all_stats):
+    """Apunta al _id guardado lo que se cargó apuntando al _id del archivo; devuelve las colecciones cambiadas.
+
+    Corre al terminar todas las cargas: los pedidos del mismo archivo se
+    cargan en paralelo con los clientes.
+    """
+    changed = set()
+    for stats in all_stats:
+        if not stats.id_changes:
+            continue
+        changes = list(stats.id_changes.items())
+        for target, field in REFERENCES.get(stats.collection, []):
+            modified = 0
+            for start in range(0, len(changes), REMAP_BATCH_SIZE):
+                result = db[target].bulk_write([
+                    UpdateMany({field: old}, {'$set': {field: new}})
+                    for old, new in changes[start:start + REMAP_BATCH_SIZE]
+                ], ordered=False)
+                modified += result.modified_count
+            print(f"🔗 {stats.collection}: {len(changes):,} ya existían con otro _id; "
+                  f"{modified:,} {target} corregidos en {field}")
+            if modified:
+                changed.add(target)
+    return changed
+
+def refresh_after_load(db, names):
+    """Recalcula el resumen de ventas y avisa a la API de los cambios en las colecciones cargadas"""
+    if {'pedidos', 'productos'} & set(names):
+        print("📊 Recalculando resumen de ventas...")
+        rebuild_rollup(db)
+
+    # Los contadores de cambios invalidan cachés y ETags de la API en ejecución
+    for name in names:
+        db['versiones'].update_one({'_id': name}, {'$inc': {'version': 1}}, upsert=True)
+
+    for name in COLLECTIONS:
+        print(f"📈 {name}: {db[name].estimated_document_count():,} documentos")
 
 # ========================================
-# 📊 VERIFICACIÓN FINAL
+# 🚀 LÍNEA DE COMANDOS
 # ========================================
 
-print("\n" + "="*50)
-print("📊 VERIFICACIÓN FINAL")
-print("="*50)
+def parse_sources(specs, fmt=None):
+    """Convierte 'ruta' o 'coleccion=ruta' en [(colección, ruta, formato)]"""
+    if not specs:
+        return [(name, os.path.join(DATA_DIR, f'{name}.ndjson'), 'ndjson') for name in COLLECTIONS]
+    sources = []
+    for spec in specs:
+        name, separator, path = spec.partition('=')
+        if not separator:
+            path = spec
+            name = os.path.splitext(os.path.basename(path))[0]
+        source_format = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+        if source_format is None:
+            raise ValueError(f'No se reconoce el formato de {path} (usar --format)')
+        sources.append((name, path, source_format))
+    return sources
+
+def main(argv=None):
+    env = config_from_env()
+    parser = argparse.ArgumentParser(description='Carga masiva de datos de comerciotech')
+    parser.add_argument('files', nargs='*', help='archivos a cargar (ruta o coleccion=ruta); sin archivos, los de datos/')
+    parser.add_argument('--uri', default=env['MONGO_URI'], help='URI de MongoDB (COMERCIOTECH_MONGO_URI)')
+    parser.add_argument('--db', default=env['MONGO_DB'], help='base de datos (COMERCIOTECH_MONGO_DB)')
+    parser.add_argument('--mode', choices=('upsert', 'insert'), default='upsert', help='forma de escribir (upsert)')
+    parser.add_argument('--format', choices=('csv', 'ndjson', 'bson'), help='formato de todos los archivos')
+    parser.add_argument('--batch-size', type=int, default=1000, help='documentos por lote (1000)')
+    parser.add_argument('--workers', type=int, default=4, help='hilos de escritura por colección (4)')
+    parser.add_argument('--processes', type=int,
+                        help='procesos para interpretar los archivos (por defecto, uno por núcleo si superan 16 MB)')
+    parser.add_argument('--drop', action='store_true', help='borrar antes las colecciones que se cargan')
+    parser.add_argument('--progress', type=float, default=5, help='segundos entre reportes de avance (5)')
+    args = parser.parse_args(argv)
+
+    try:
+        sources = parse_sources(args.files, args.format)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    client, db = connect(args.uri, args.db, args.workers * len(sources) + 2)
+    if client is None:
+        return 1
+
+    names = sorted({name for name, _, _ in sources})
+    if args.drop:
+        print(f"🧹 Borrando colecciones: {', '.join(names)}")
+        for name in names:
+            db[name].drop()
+
+    # Los índices únicos van antes de cargar: el upsert busca por ellos y detectan duplicados
+    print("🗂️ Verificando índices...")
+    ensure_indexes(db)
+
+    processes = args.processes
+    if processes is None:
+        total_bytes = sum(os.path.getsize(path) for _, path, _ in sources if os.path.exists(path))
+        processes = os.cpu_count() or 1 if total_bytes >= PARALLEL_PARSE_BYTES else 1
+    executor = process_pool(processes)
 
-clientes_count = clientes_collection.count_documents({})
-productos_count = productos_collection.count_documents({})
-pedidos_count = pedidos_collection.count_documents({})
+    all_stats = [LoadStats(name, os.path.basename(path)) for name, path, _ in sources]
+    jobs = [
+        functools.partial(
+            load_file, db, name, path, fmt, args.mode, args.batch_size, args.workers, executor, processes, stats
+        )
+        for (name, path, fmt), stats in zip(sources, all_stats)
+    ]
+    print(f"📥 Cargando {len(sources)} archivo(s) en modo {args.mode} ({processes} proceso(s) de lectura)...")
+    elapsed = run_loads(jobs, all_stats, args.progress)
+    if executor is not None:
+        executor.shutdown()
 
-print(f"👥 Clientes importados: {clientes_count}")
-print(f"📦 Productos importados: {productos_count}")
-print(f"🛒 Pedidos importados: {pedidos_count}")
-print(f"📈 Total documentos: {clientes_count + productos_count + pedidos_count}")
+    errors = print_summary(all_stats, elapsed)
+    names = sorted(set(names) | remap_references(db, all_stats))
+    refresh_after_load(db, names)
+    client.close()
 
-print("\n🎉 ¡Importación completada exitosamente!")
-print("🔄 Reinicia tu API (python app.py) para ver los cambios")
-print("🌐 Visita: http://localhost:5001/debug")
+    if errors:
+        print("\n⚠️ Importación terminada con errores")
+        return 1
+    print("\n🎉 ¡Importación completada exitosamente!")
+    return 0
 
-# Cerrar conexión
-client.close()
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
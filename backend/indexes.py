@@ -0,0 +1,108 @@
+"""
+Índices de MongoDB para comerciotech
+Se crean al importar o generar datos (import_data.py, generate_data.py), al
+pre-calentar la API (COMERCIOTECH_MONGO_PREWARM) o en el despliegue, desde
+el directorio backend:
+python indexes.py
+"""
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient
+from pymongo.errors import PyMongoError
+import sys
+
+from mongo import config_from_env
+
+# Índices por colección; create_indexes no hace nada si ya existen
+INDEXES = {
+    'clientes': [
+        IndexModel([('identificador', ASCENDING)], unique=True, name='identificador_unique'),
+    ],
+    'productos': [
+        # Filtro por categoría (solo o con rango/orden de precio) en GET /productos
+        IndexModel([('categoria', ASCENDING), ('precio', ASCENDING), ('_id', ASCENDING)], name='categoria_precio'),
+        # Rango y orden por precio sin categoría
+        IndexModel([('precio', ASCENDING), ('_id', ASCENDING)], name='precio'),
+        # Un índice (campo, _id) por cada campo de ?sort= (PRODUCTOS_SORT_FIELDS en
+        # app.py): orden y cursor sin ordenar en memoria; stock también sirve a ?stock_min=
+        IndexModel([('nombre', ASCENDING), ('_id', ASCENDING)], name='nombre_id'),
+        IndexModel([('stock', ASCENDING), ('_id', ASCENDING)], name='stock_id'),
+        IndexModel([('categoria', ASCENDING), ('_id', ASCENDING)], name='categoria_id'),
+        # Búsqueda de texto de GET /productos/search (insensible a tildes)
+        IndexModel(
+            [('nombre', TEXT), ('categoria', TEXT), ('descripcion', TEXT)],
+            name='busqueda_texto',
+            default_language='spanish',
+            weights={'nombre': 10, 'categoria': 5, 'descripcion': 1}
+        ),
+    ],
+    'pedidos': [
+        IndexModel([('codigo_pedido', ASCENDING)], unique=True, name='codigo_pedido_unique'),
+        # Historial por cliente (filtro, orden y cursor) y verificación en delete_cliente
+        IndexModel(
+            [('clienteId', ASCENDING), ('fecha_pedido', DESCENDING), ('_id', DESCENDING)],
+            name='clienteId_fecha_pedido'
+        ),
+        # Orden de la paginación por cursor de GET /pedidos
+        IndexModel([('fecha_pedido', DESCENDING), ('_id', DESCENDING)], name='fecha_pedido_id'),
+    ],
+    'ventas_rollup': [
+        # Rango de fechas de GET /reportes/ventas para un tipo de agrupación
+        IndexModel([('tipo', ASCENDING), ('fecha', ASCENDING), ('clave', ASCENDING)], name='tipo_fecha_clave'),
+    ],
+}
+
+class IndexSetupError(Exception):
+    """Fallaron los índices de una o más colecciones; errors va por colección"""
+
+    def __init__(self, errors, created):
+        super().__init__('; '.join(f'{name}: {error}' for name, error in errors.items()))
+        self.errors = errors
+        self.created = created
+
+def unique_indexes():
+    """Nombres de los índices únicos requeridos, por colección"""
+    return {
+        collection_name: {index.document['name'] for index in indexes if index.document.get('unique')}
+        for collection_name, indexes in INDEXES.items()
+        if any(index.document.get('unique') for index in indexes)
+    }
+
+def missing_unique_indexes(index_information):
+    """Índices únicos requeridos que no aparecen en {colección: index_information()}"""
+    return sorted(
+        f'{collection_name}.{name}'
+        for collection_name, names in unique_indexes().items()
+        for name in names
+        if not index_information.get(collection_name, {}).get(name, {}).get('unique')
+    )
+
+def ensure_indexes(db):
+    """Crea los índices de todas las colecciones y devuelve sus nombres.
+
+    Un fallo en una colección no impide intentar las demás; al final se lanza
+    IndexSetupError con el error de cada colección que falló.
+    """
+    created = {}
+    errors = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created[collection_name] = db[collection_name].create_indexes(indexes)
+        except PyMongoError as e:
+            errors[collection_name] = e
+    if errors:
+        raise IndexSetupError(errors, created)
+    return created
+
+if __name__ == '__main__':
+    env = config_from_env()
+    client = MongoClient(env['MONGO_URI'])
+    print(f"🗂️ Creando índices en {env['MONGO_DB']}...")
+    try:
+        for collection_name, names in ensure_indexes(client[env['MONGO_DB']]).items():
+            print(f"✅ {collection_name}: {', '.join(names)}")
+    except IndexSetupError as e:
+        for collection_name, error in e.errors.items():
+            print(f"❌ {collection_name}: {error}")
+        sys.exit(1)
+    finally:
+        client.close()
@@ -0,0 +1,275 @@
+"""
+Métricas de comerciotech en formato de texto de Prometheus
+Contadores e histogramas en memoria por proceso, más listeners de PyMongo
+para la latencia de comandos y la espera al obtener conexiones del pool.
+También lleva la cuenta opcional de comandos y tiempos de cada petición
+(RequestTrace) para Server-Timing y el registro de peticiones lentas.
+"""
+
+from pymongo import monitoring
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# Límites de los histogramas en segundos (las peticiones y comandos típicos caen en 1-250 ms)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+def _escape(value):
+    """Escapa un valor de etiqueta según el formato de texto"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in values]
+
+class Histogram:
+    """Histograma acumulativo con límites fijos, suma y cantidad de observaciones"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [conteo por bucket (+Inf al final), suma]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        # Se copia bajo el lock y se formatea fuera para no frenar a quien observa
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in values:
+            acumulado = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                acumulado += count
+                le = f'le="{_number(bound)}"'
+                samples.append((self.name + '_bucket', _labels(self.labelnames, key, le), acumulado))
+            samples.append((self.name + '_sum', _labels(self.labelnames, key), total))
+            samples.append((self.name + '_count', _labels(self.labelnames, key), acumulado))
+        return samples
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas en /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'comerciotech_http_requests_total', 'Peticiones HTTP atendidas', ('method', 'route', 'status'))
+http_errors = registry.counter(
+    'comerciotech_http_errors_total', 'Peticiones HTTP que terminaron con un error 5xx', ('method', 'route'))
+http_latency = registry.histogram(
+    'comerciotech_http_request_duration_seconds', 'Duración de las peticiones HTTP', ('method', 'route'))
+mongo_latency = registry.histogram(
+    'comerciotech_mongodb_command_duration_seconds',
+    'Duración de los comandos de MongoDB (el conteo son los viajes de ida y vuelta)',
+    ('collection', 'command'))
+mongo_failures = registry.counter(
+    'comerciotech_mongodb_command_failures_total', 'Comandos de MongoDB que fallaron', ('collection', 'command'))
+pool_wait = registry.histogram(
+    'comerciotech_mongodb_pool_checkout_wait_seconds',
+    'Espera para obtener una conexión del pool de MongoDB', buckets=POOL_BUCKETS)
+pool_failures = registry.counter(
+    'comerciotech_mongodb_pool_checkout_failures_total',
+    'Conexiones que no se pudieron obtener del pool', ('reason',))
+
+def record_request(method, route, status, duration):
+    """Registra una petición HTTP ya respondida"""
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(duration, method, route)
+    if status >= 500:
+        http_errors.inc(method, route)
+
+class RequestTrace:
+    """Comandos de MongoDB y tiempo de serialización de una petición"""
+
+    # Comandos que se guardan con detalle; el resto solo suma al total
+    MAX_COMMANDS = 100
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.commands = []
+        self.command_count = 0
+        self.db_seconds = 0.0
+        self.ser_seconds = 0.0
+
+    def add_command(self, collection, command, seconds, ok=True):
+        self.command_count += 1
+        self.db_seconds += seconds
+        if len(self.commands) < self.MAX_COMMANDS:
+            entry = {'collection': collection, 'command': command, 'ms': round(seconds * 1000, 3)}
+            if not ok:
+                entry['failed'] = True
+            self.commands.append(entry)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing (duraciones en milisegundos)"""
+        return (f'db;dur={self.db_seconds * 1000:.2f};desc="{self.command_count} comandos", '
+                f'ser;dur={self.ser_seconds * 1000:.2f}, '
+                f'total;dur={self.elapsed() * 1000:.2f}')
+
+# PyMongo avisa a los listeners en el hilo que ejecuta el comando
+_current_trace = contextvars.ContextVar('comerciotech_trace', default=None)
+
+def start_trace():
+    """Empieza a contar los comandos de la petición actual"""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    """Deja de contar; los comandos posteriores (p. ej. streaming) ya no se atribuyen"""
+    _current_trace.reset(token)
+
+@contextlib.contextmanager
+def serializing():
+    """Suma el tiempo del bloque al tiempo de serialización de la petición actual"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.ser_seconds += time.perf_counter() - started
+
+# Comandos cuyo valor principal no es el nombre de la colección
+_COLLECTION_FIELDS = {'getMore': 'collection'}
+
+def command_collection(event):
+    """Colección a la que apunta un comando, o '-' si no aplica (ping, hello...)"""
+    value = event.command.get(_COLLECTION_FIELDS.get(event.command_name, event.command_name))
+    return value if isinstance(value, str) else '-'
+
+class CommandTimer(monitoring.CommandListener):
+    """Mide cada comando de MongoDB por colección y nombre de comando"""
+
+    def __init__(self):
+        # Los eventos de fin no traen el comando; se guarda la colección al empezar
+        self._pending = {}
+
+    def _key(self, event):
+        return (event.request_id, event.connection_id, event.operation_id)
+
+    def started(self, event):
+        self._pending[self._key(event)] = command_collection(event)
+
+    def succeeded(self, event):
+        self._finish(event, ok=True)
+
+    def failed(self, event):
+        self._finish(event, ok=False)
+
+    def _finish(self, event, ok):
+        collection = self._pending.pop(self._key(event), '-')
+        seconds = event.duration_micros / 1e6
+        mongo_latency.observe(seconds, collection, event.command_name)
+        if not ok:
+            mongo_failures.inc(collection, event.command_name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_command(collection, event.command_name, seconds, ok)
+
+class PoolTimer(monitoring.ConnectionPoolListener):
+    """Mide la espera entre pedir una conexión al pool y obtenerla"""
+
+    def __init__(self):
+        # El pedido y la entrega ocurren en el mismo hilo
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            pool_wait.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        pool_failures.inc(event.reason)
+
+    # El resto de eventos del pool no se miden
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+def event_listeners():
+    """Listeners para pasar a MongoClient(event_listeners=...)"""
+    return [CommandTimer(), PoolTimer()]
@@ -0,0 +1,126 @@
+"""
+Conexión perezosa a MongoDB para comerciotech
+El MongoClient se crea en el primer uso (no al importar) con la URI y las
+opciones de pool leídas de la configuración o del entorno
+"""
+
+from pymongo import MongoClient
+import os
+import threading
+
+# Claves de configuración y sus valores por defecto; cada una se puede
+# definir en el entorno como COMERCIOTECH_<CLAVE> (p. ej. COMERCIOTECH_MONGO_URI)
+DEFAULTS = {
+    'MONGO_URI': 'mongodb://localhost:27017/',
+    'MONGO_DB': 'comerciotech',
+    'MONGO_MAX_POOL_SIZE': 100,
+    'MONGO_MIN_POOL_SIZE': 0,
+    'MONGO_MAX_IDLE_TIME_MS': None,
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': None,
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': None,
+    # Lista separada por comas, p. ej. "zstd,snappy,zlib"
+    'MONGO_COMPRESSORS': None,
+    # Conectar, verificar índices y abrir el pool al crear la app en vez de en la primera petición
+    'MONGO_PREWARM': False,
+}
+
+_TEXT_KEYS = ('MONGO_URI', 'MONGO_DB', 'MONGO_COMPRESSORS')
+
+# Opciones de MongoClient que solo se pasan si están definidas
+_OPTIONAL_OPTIONS = {
+    'maxIdleTimeMS': 'MONGO_MAX_IDLE_TIME_MS',
+    'waitQueueTimeoutMS': 'MONGO_WAIT_QUEUE_TIMEOUT_MS',
+    'serverSelectionTimeoutMS': 'MONGO_SERVER_SELECTION_TIMEOUT_MS',
+    'compressors': 'MONGO_COMPRESSORS',
+}
+
+def config_from_env(environ=None):
+    """Configuración de MongoDB con los valores por defecto y lo definido en el entorno"""
+    environ = os.environ if environ is None else environ
+    config = dict(DEFAULTS)
+    for key in DEFAULTS:
+        raw = environ.get('COMERCIOTECH_' + key)
+        if raw is None or raw == '':
+            continue
+        if key == 'MONGO_PREWARM':
+            config[key] = raw.lower() in ('1', 'true', 'yes')
+        elif key in _TEXT_KEYS:
+            config[key] = raw
+        else:
+            config[key] = int(raw)
+    return config
+
+def client_options(config):
+    """Argumentos de MongoClient a partir de la configuración"""
+    options = {
+        'maxPoolSize': config.get('MONGO_MAX_POOL_SIZE', DEFAULTS['MONGO_MAX_POOL_SIZE']),
+        'minPoolSize': config.get('MONGO_MIN_POOL_SIZE', DEFAULTS['MONGO_MIN_POOL_SIZE']),
+    }
+    for option, key in _OPTIONAL_OPTIONS.items():
+        if config.get(key) is not None:
+            options[option] = config[key]
+    return options
+
+class MongoConnection:
+    """MongoClient que se crea al primer uso, con las colecciones ya resueltas"""
+
+    def __init__(self, config, event_listeners=None):
+        self.uri = config.get('MONGO_URI', DEFAULTS['MONGO_URI'])
+        self.db_name = config.get('MONGO_DB', DEFAULTS['MONGO_DB'])
+        self.options = client_options(config)
+        self.event_listeners = event_listeners or []
+        self._client = None
+        self._db = None
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self):
+        """Si el cliente ya fue creado"""
+        return self._client is not None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    @property
+    def db(self):
+        if self._client is None:
+            self._connect()
+        return self._db
+
+    def _connect(self):
+        with self._lock:
+            if self._client is None:
+                client = MongoClient(self.uri, event_listeners=self.event_listeners, **self.options)
+                self._db = client[self.db_name]
+                self._client = client
+
+    def collection(self, name):
+        """Colección por nombre (se reutiliza el objeto en cada llamada)"""
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = self.db[name]
+        return collection
+
+    def ping(self):
+        """Verifica que el servidor responde"""
+        return self.client.admin.command('ping')
+
+    def forget(self):
+        """Descarta sin cerrarlo un cliente creado en otro proceso (p. ej. antes de un fork)"""
+        self._client = None
+        self._db = None
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Cierra el cliente; el próximo uso crea uno nuevo"""
+        with self._lock:
+            client, self._client = self._client, None
+            self._db = None
+            self._collections = {}
+        if client is not None:
+            client.close()
@@ -0,0 +1,44 @@
+"""
+Fixtures de las pruebas de la API de comerciotech
+MongoDB se reemplaza por mongomock (ver requirements-dev.txt): cada prueba
+parte de un servidor en memoria vacío. Ejecutar desde el directorio backend:
+python -m pytest tests
+"""
+
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as api
+import mongo
+from indexes import ensure_indexes
+
+TEST_DB = 'comerciotech_test'
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """Servidor en memoria compartido por todas las aplicaciones de la prueba"""
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(mongo, 'MongoClient', lambda *args, **kwargs: client)
+    # mongomock no tiene sesiones: los pedidos se colocan sin transacción
+    monkeypatch.setattr(api, 'supports_transactions', lambda: False)
+    return client
+
+@pytest.fixture
+def app(mongo_client):
+    # La API no crea índices en la primera petición: se crean como en un despliegue
+    ensure_indexes(mongo_client[TEST_DB])
+    return api.create_app({'MONGO_DB': TEST_DB})
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def db(mongo_client):
+    """Acceso directo a la base, como otro proceso que escribe sin pasar por la API"""
+    return mongo_client[TEST_DB]
@@ -0,0 +1,33 @@
+def bump_externally(db, name):
+    """Cambio de versión como el que deja otro proceso (u otra instancia de la API)"""
+    db.versiones.update_one({'_id': name}, {'$inc': {'version': 1}}, upsert=True)
+
+def test_revalidation_sees_write_from_another_process(client, db):
+    cliente_id = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    first = client.get(f'/clientes/{cliente_id}')
+    assert first.json['nombre'] == 'Ana'
+
+    db.clientes.update_one({'_id': cliente_id}, {'$set': {'nombre': 'Bea'}})
+    bump_externally(db, 'clientes')
+
+    # La versión nueva invalida la copia en caché antes de armar la respuesta
+    second = client.get(f'/clientes/{cliente_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.json['nombre'] == 'Bea'
+    assert second.headers['ETag'] != first.headers['ETag']
+
+    third = client.get(f'/clientes/{cliente_id}', headers={'If-None-Match': second.headers['ETag']})
+    assert third.status_code == 304
+
+def test_own_writes_keep_cache_warm(client, db):
+    ana = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    eva = db.clientes.insert_one({'nombre': 'Eva', 'apellidos': 'Paz', 'identificador': 'C2'}).inserted_id
+    client.get(f'/clientes/{eva}')
+
+    assert client.put(f'/clientes/{ana}', json={'nombre': 'Bea'}).status_code == 200
+    assert client.get(f'/clientes/{ana}').json['nombre'] == 'Bea'
+
+    # Un cambio propio no vacía las copias del resto de los clientes
+    hits = client.get('/debug/cache').json['hits']
+    assert client.get(f'/clientes/{eva}').json['nombre'] == 'Eva'
+    assert client.get('/debug/cache').json['hits'] == hits + 1
@@ -0,0 +1,36 @@
+from app import create_app, settings_from_env
+
+def test_settings_from_env():
+    settings = settings_from_env({
+        'COMERCIOTECH_COMPRESSION': '0',
+        'COMERCIOTECH_CACHE_SIZE': '5',
+        'COMERCIOTECH_SLOW_REQUEST_MS': '2.5',
+        'COMERCIOTECH_REQUEST_TRACE': '',
+    })
+    assert settings['COMPRESSION'] is False
+    assert settings['CACHE_SIZE'] == 5
+    assert settings['SLOW_REQUEST_MS'] == 2.5
+    assert settings['REQUEST_TRACE'] is False
+
+def test_apps_do_not_share_state(mongo_client):
+    principal = create_app({'MONGO_DB': 'comerciotech_test'})
+    otra = create_app({'MONGO_DB': 'otra_db', 'CACHE_SIZE': 5})
+    cliente_id = mongo_client['comerciotech_test'].clientes.insert_one(
+        {'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}
+    ).inserted_id
+
+    assert principal.test_client().get(f'/clientes/{cliente_id}').status_code == 200
+    # La caché de lectura de la primera app no responde por la segunda
+    assert otra.test_client().get(f'/clientes/{cliente_id}').status_code == 404
+
+    assert principal.test_client().get('/debug').json['database'] == 'comerciotech_test'
+    assert otra.test_client().get('/debug').json['database'] == 'otra_db'
+    assert otra.test_client().get('/debug/cache').json['maxsize'] == 5
+    assert principal.test_client().get('/debug/cache').json['maxsize'] == principal.config['CACHE_SIZE']
+
+def test_compression_setting_is_per_app(mongo_client):
+    sin_compresion = create_app({'MONGO_DB': 'comerciotech_test', 'COMPRESSION': False})
+    con_compresion = create_app({'MONGO_DB': 'comerciotech_test', 'COMPRESSION_MIN_SIZE': 0})
+    headers = {'Accept-Encoding': 'gzip'}
+    assert 'Content-Encoding' not in sin_compresion.test_client().get('/health', headers=headers).headers
+    assert con_compresion.test_client().get('/health', headers=headers).headers['Content-Encoding'] == 'gzip'
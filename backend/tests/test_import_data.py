@@ -0,0 +1,47 @@
+import json
+
+import bson
+import pytest
+from bson import ObjectId
+
+import import_data
+
+@pytest.fixture
+def load(mongo_client, monkeypatch, tmp_path):
+    """import_data.main contra el servidor en memoria; devuelve el código de salida"""
+    monkeypatch.setattr(import_data, 'MongoClient', lambda *args, **kwargs: mongo_client)
+    # mongomock no acepta RawBSONDocument: se le pasan los documentos decodificados
+    monkeypatch.setattr(import_data, 'raw_document', bson.decode)
+    # Ni el $type de la agregación del resumen de ventas
+    monkeypatch.setattr(import_data, 'rebuild_rollup', lambda db: None)
+
+    def run(files, *args):
+        paths = []
+        for name, docs in files.items():
+            path = tmp_path / f'{name}.ndjson'
+            path.write_text(''.join(json.dumps(doc) + '\n' for doc in docs))
+            paths.append(str(path))
+        return import_data.main([*paths, '--db', 'comerciotech_test', '--processes', '1', *args])
+    return run
+
+def test_upsert_remaps_references_to_existing_clientes(load, db):
+    existente = db.clientes.insert_one({'identificador': 'C1', 'nombre': 'Ana'}).inserted_id
+    del_archivo = ObjectId()
+    nuevo = ObjectId()
+
+    assert load({
+        'clientes': [
+            {'_id': {'$oid': str(del_archivo)}, 'identificador': 'C1', 'nombre': 'Ana María'},
+            {'_id': {'$oid': str(nuevo)}, 'identificador': 'C2', 'nombre': 'Eva'},
+        ],
+        'pedidos': [
+            {'codigo_pedido': 'P-1', 'clienteId': str(del_archivo), 'fecha_pedido': '2025-07-17', 'productos': []},
+            {'codigo_pedido': 'P-2', 'clienteId': str(nuevo), 'fecha_pedido': '2025-07-17', 'productos': []},
+        ],
+    }) == 0
+
+    # El cliente existente conserva su _id y sus pedidos apuntan a él
+    assert db.clientes.find_one({'identificador': 'C1'})['_id'] == existente
+    assert db.clientes.find_one({'identificador': 'C2'})['_id'] == nuevo
+    assert db.pedidos.find_one({'codigo_pedido': 'P-1'})['clienteId'] == existente
+    assert db.pedidos.find_one({'codigo_pedido': 'P-2'})['clienteId'] == nuevo
@@ -0,0 +1,55 @@
+import pytest
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+import app as api
+import indexes
+
+def test_indexes_are_not_built_on_first_request(mongo_client, db):
+    client = api.create_app({'MONGO_DB': 'comerciotech_vacia'}).test_client()
+    client.get('/productos')
+    assert 'categoria_precio' not in mongo_client['comerciotech_vacia'].productos.index_information()
+    # Sin los índices únicos la instancia no está lista
+    assert client.get('/ready').status_code == 503
+
+def test_prewarm_builds_indexes(mongo_client):
+    api.create_app({'MONGO_DB': 'comerciotech_vacia', 'MONGO_PREWARM': True})
+    assert 'categoria_precio' in mongo_client['comerciotech_vacia'].productos.index_information()
+
+def test_operator_indexes_are_kept(db):
+    db.productos.create_index([('categoria', ASCENDING)], name='categoria')
+    indexes.ensure_indexes(db)
+    assert 'categoria' in db.productos.index_information()
+
+def test_ensure_indexes_continues_after_a_failure(db, monkeypatch):
+    original = type(db.clientes).create_indexes
+
+    def create_indexes(collection, models, *args, **kwargs):
+        if collection.name == 'clientes':
+            raise OperationFailure('índice con otras opciones')
+        return original(collection, models, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.clientes), 'create_indexes', create_indexes)
+    with pytest.raises(indexes.IndexSetupError) as error:
+        indexes.ensure_indexes(db)
+    assert set(error.value.errors) == {'clientes'}
+    assert 'codigo_pedido_unique' in error.value.created['pedidos']
+    # Las colecciones siguientes igual quedan indexadas
+    assert 'codigo_pedido_unique' in db.pedidos.index_information()
+
+def test_ready_requires_unique_indexes(app, client, db):
+    assert client.get('/ready').status_code == 200
+
+    # La verificación se reutiliza: un sondeo más no vuelve a consultar los índices
+    db.pedidos.drop_index('codigo_pedido_unique')
+    assert client.get('/ready').status_code == 200
+
+    app.extensions['comerciotech_ready']['expires'] = 0.0
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json['missing_indexes'] == ['pedidos.codigo_pedido_unique']
+
+def test_every_sort_field_has_an_index():
+    keys = {tuple(field for field, _ in index.document['key'].items()) for index in indexes.INDEXES['productos']}
+    for field in api.PRODUCTOS_SORT_FIELDS:
+        assert (field, '_id') in keys
@@ -0,0 +1,29 @@
+import pytest
+
+PRODUCTOS = [
+    {'nombre': 'Taza', 'precio': 5, 'stock': 3},
+    {'nombre': 'Plato', 'precio': 8.5, 'stock': 0},
+    # Como los deja el importador: celda vacía y columna sin :int
+    {'nombre': 'Vaso', 'stock': 7},
+    {'nombre': 'Jarra', 'precio': '12', 'stock': '4'},
+    {'precio': None, 'stock': 1},
+    {'nombre': 'Olla', 'precio': 5, 'stock': 2},
+]
+
+def paginate(client, url):
+    ids = []
+    cursor = None
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else '')).json
+        ids += [doc['_id'] for doc in page['data']]
+        cursor = page.get('next_cursor')
+        if not cursor:
+            return ids
+
+@pytest.mark.parametrize('sort', ['precio', 'precio:-1', 'stock', 'stock:-1', 'nombre', 'nombre:-1', 'precio:-1,nombre'])
+@pytest.mark.parametrize('limit', [1, 2, 4])
+def test_cursor_visits_missing_and_mistyped_values(client, db, sort, limit):
+    db.productos.insert_many([dict(producto) for producto in PRODUCTOS])
+    todos = [doc['_id'] for doc in client.get(f'/productos?sort={sort}&stream=json').json]
+    assert len(todos) == len(PRODUCTOS)
+    assert paginate(client, f'/productos?sort={sort}&limit={limit}') == todos
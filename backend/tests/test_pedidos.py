@@ -0,0 +1,117 @@
+import pytest
+from bson import ObjectId
+
+import app as api
+
+@pytest.fixture
+def catalogo(db):
+    """Un cliente y dos productos con stock conocido"""
+    cliente = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    taza = db.productos.insert_one({'nombre': 'Taza', 'precio': 5.0, 'stock': 10}).inserted_id
+    plato = db.productos.insert_one({'nombre': 'Plato', 'precio': 8.0, 'stock': 1}).inserted_id
+    return cliente, taza, plato
+
+def pedido(cliente, *lineas, codigo='P-1'):
+    return {
+        'clienteId': str(cliente),
+        'codigo_pedido': codigo,
+        'productos': [{'productoId': str(oid), 'cantidad': cantidad} for oid, cantidad in lineas]
+    }
+
+def stock(db, oid):
+    return db.productos.find_one({'_id': oid})['stock']
+
+def marcas(db):
+    """Campos de reserva que quedaron en los productos (no debería quedar ninguno)"""
+    return [key for producto in db.productos.find() for key in producto if key.startswith(api.RESERVA_PREFIX)]
+
+def test_server_mode_ignores_client_totals(client, db, catalogo):
+    cliente, taza, _ = catalogo
+    data = pedido(cliente, (taza, 3))
+    data['productos'][0]['total_comprado'] = '999'
+
+    response = client.post('/pedidos?modo=servidor', json=data)
+    assert response.status_code == 201
+    assert response.json['total_compra'] == 15.0
+    assert stock(db, taza) == 7
+    assert marcas(db) == []
+
+def test_client_mode_rejects_non_numeric_totals(client, catalogo):
+    cliente, taza, _ = catalogo
+    data = pedido(cliente, (taza, 3))
+    data['productos'][0]['total_comprado'] = '999'
+    assert client.post('/pedidos', json=data).status_code == 400
+
+def test_server_mode_insufficient_stock(client, db, catalogo):
+    cliente, taza, plato = catalogo
+    response = client.post('/pedidos?modo=servidor', json=pedido(cliente, (taza, 2), (plato, 2)))
+    assert response.status_code == 409
+    assert stock(db, taza) == 10
+    assert stock(db, plato) == 1
+    assert db.pedidos.count_documents({}) == 0
+
+def test_server_mode_missing_product(client, db, catalogo):
+    cliente, taza, _ = catalogo
+    response = client.post('/pedidos?modo=servidor', json=pedido(cliente, (taza, 1), (ObjectId(), 1)))
+    assert response.status_code == 404
+    assert stock(db, taza) == 10
+
+def test_reserve_stock_rolls_back_applied_lines(app, db, catalogo):
+    _, taza, plato = catalogo
+    with app.app_context():
+        # Otro pedido se llevó el stock entre la lectura y la escritura
+        with pytest.raises(api.PedidoError) as error:
+            api.reserve_stock({taza: 4, plato: 2})
+        assert error.value.code == 409
+
+        # El producto se eliminó entre la lectura y la escritura
+        borrado = ObjectId()
+        with pytest.raises(api.PedidoError) as error:
+            api.reserve_stock({taza: 4, borrado: 1})
+        assert error.value.code == 404
+
+    assert stock(db, taza) == 10
+    assert stock(db, plato) == 1
+    # Sin upsert no aparece un producto fantasma con stock negativo
+    assert db.productos.count_documents({'_id': borrado}) == 0
+    assert marcas(db) == []
+
+def test_duplicate_code_releases_stock(client, db, catalogo):
+    cliente, taza, _ = catalogo
+    assert client.post('/pedidos?modo=servidor', json=pedido(cliente, (taza, 2))).status_code == 201
+    response = client.post('/pedidos?modo=servidor', json=pedido(cliente, (taza, 2)))
+    assert response.status_code == 400
+    assert stock(db, taza) == 8
+
+def test_fecha_pedido_is_stored_as_date(client, db, catalogo):
+    cliente, taza, _ = catalogo
+    # Un pedido sin fecha (fecha actual) y otros con fecha en texto
+    assert client.post('/pedidos', json=pedido(cliente, (taza, 1), codigo='P-0')).status_code == 201
+    for n in range(1, 6):
+        data = pedido(cliente, (taza, 1), codigo=f'P-{n}')
+        data['fecha_pedido'] = f'2025-07-{n:02d}T10:00:00Z'
+        assert client.post('/pedidos', json=data).status_code == 201
+    assert client.post('/pedidos/bulk', json=[
+        {**pedido(cliente, (taza, 1), codigo='P-6'), 'fecha_pedido': '2025-07-06'}
+    ]).status_code == 201
+
+    p3 = db.pedidos.find_one({'codigo_pedido': 'P-3'})['_id']
+    assert client.put(f'/pedidos/{p3}', json={'fecha_pedido': '2025-06-30'}).status_code == 200
+    assert client.put(f'/pedidos/{p3}', json={'fecha_pedido': 'ayer'}).status_code == 400
+    assert all(not isinstance(doc['fecha_pedido'], str) for doc in db.pedidos.find())
+
+    # La paginación por cursor recorre todos los pedidos, en orden
+    codigos = []
+    url = '/pedidos?limit=2'
+    while url:
+        page = client.get(url).json
+        codigos += [doc['codigo_pedido'] for doc in page['data']]
+        url = f"/pedidos?limit=2&cursor={page['next_cursor']}" if page.get('next_cursor') else None
+    assert codigos == ['P-0', 'P-6', 'P-5', 'P-4', 'P-2', 'P-1', 'P-3']
+
+def test_invalid_fecha_pedido(client, catalogo):
+    cliente, taza, _ = catalogo
+    data = pedido(cliente, (taza, 1))
+    data['fecha_pedido'] = 'mañana'
+    assert client.post('/pedidos', json=data).status_code == 400
+    assert client.post('/pedidos?modo=servidor', json=data).status_code == 400
@@ -0,0 +1,84 @@
+import app as api
+
+def test_ventas_por_producto_y_categoria_suman_el_rango(client, db):
+    cliente = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    taza = db.productos.insert_one({'nombre': 'Taza', 'precio': 5, 'stock': 10, 'categoria': 'Cocina'}).inserted_id
+    lampara = db.productos.insert_one({'nombre': 'Lámpara', 'precio': 20, 'stock': 10, 'categoria': 'Hogar'}).inserted_id
+
+    for codigo, fecha, lineas in (
+        ('P-1', '2025-07-17T10:00:00', [(taza, 2, 10)]),
+        ('P-2', '2025-07-18T10:00:00', [(taza, 1, 5), (lampara, 1, 20)]),
+        ('P-3', '2025-07-20T10:00:00', [(taza, 4, 20)]),
+    ):
+        response = client.post('/pedidos', json={
+            'clienteId': str(cliente),
+            'codigo_pedido': codigo,
+            'fecha_pedido': fecha,
+            'productos': [
+                {'productoId': str(oid), 'nombre': 'x', 'cantidad': cantidad, 'total_comprado': total}
+                for oid, cantidad, total in lineas
+            ]
+        })
+        assert response.status_code == 201
+
+    data = client.get('/reportes/ventas?agrupar=producto&desde=2025-07-17&hasta=2025-07-18').json['data']
+    assert [(row['clave'], row['total'], row['unidades'], row['pedidos']) for row in data] == [
+        (str(lampara), 20, 1, 1),
+        (str(taza), 15, 3, 2),
+    ]
+
+    data = client.get('/reportes/ventas?agrupar=categoria&desde=2025-07-17').json['data']
+    assert [(row['clave'], row['total'], row['pedidos']) for row in data] == [('Cocina', 35, 3), ('Hogar', 20, 1)]
+
+    # Por día se mantiene una fila por fecha
+    data = client.get('/reportes/ventas?hasta=2025-07-18').json['data']
+    assert [(row['fecha'], row['total']) for row in data] == [('2025-07-17', 10), ('2025-07-18', 25)]
+
+def test_update_pedido_rejects_nested_paths(client, db):
+    cliente = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    taza = db.productos.insert_one({'nombre': 'Taza', 'precio': 5, 'stock': 10, 'categoria': 'Cocina'}).inserted_id
+    pedido_id = client.post('/pedidos', json={
+        'clienteId': str(cliente),
+        'codigo_pedido': 'P-1',
+        'fecha_pedido': '2025-07-17T10:00:00',
+        'productos': [{'productoId': str(taza), 'cantidad': 2, 'total_comprado': 10}]
+    }).json['_id']
+
+    for field in ('productos.0.cantidad', '$inc', '_id'):
+        assert client.put(f'/pedidos/{pedido_id}', json={field: 5}).status_code == 400
+    assert db.pedidos.find_one()['productos'][0]['cantidad'] == 2
+
+    # Un cambio de primer nivel mueve el resumen y el borrado lo deja en cero
+    productos = [{'productoId': str(taza), 'cantidad': 5, 'total_comprado': 25}]
+    response = client.put(f'/pedidos/{pedido_id}', json={'productos': productos})
+    assert response.json['productos'][0]['cantidad'] == 5
+    fila = db.ventas_rollup.find_one({'tipo': 'producto'})
+    assert (fila['unidades'], fila['total']) == (5, 25)
+
+    assert client.delete(f'/pedidos/{pedido_id}').status_code == 200
+    fila = db.ventas_rollup.find_one({'tipo': 'producto'})
+    assert (fila['unidades'], fila['total'], fila['pedidos']) == (0, 0, 0)
+
+def test_rollup_is_updated_before_the_version(client, db, monkeypatch):
+    """Un reporte con la versión nueva de pedidos nunca ve el resumen anterior"""
+    cliente = db.clientes.insert_one({'nombre': 'Ana', 'apellidos': 'Soto', 'identificador': 'C1'}).inserted_id
+    versiones = []
+    update_rollup = api.update_rollup
+
+    def spy(database, cambios):
+        doc = db.versiones.find_one({'_id': 'pedidos'})
+        versiones.append(doc['version'] if doc else 0)
+        update_rollup(database, cambios)
+
+    monkeypatch.setattr(api, 'update_rollup', spy)
+    data = {
+        'clienteId': str(cliente),
+        'fecha_pedido': '2025-07-17T10:00:00',
+        'productos': [{'productoId': str(cliente), 'cantidad': 1, 'total_comprado': 10}]
+    }
+    pedido_id = client.post('/pedidos', json={**data, 'codigo_pedido': 'P-1'}).json['_id']
+    client.post('/pedidos/bulk', json=[{**data, 'codigo_pedido': 'P-2'}])
+    client.put(f'/pedidos/{pedido_id}', json={'codigo_pedido': 'P-3'})
+    client.delete(f'/pedidos/{pedido_id}')
+
+    assert versiones == [0, 1, 2, 3]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Resúmenes de ventas de comerciotech (colección ventas_rollup)
+Un documento por día y producto, por día y categoría, y por día (totales)
+
+La API los mantiene con $inc al crear, actualizar o eliminar pedidos.
+Para recalcularlos desde cero, ejecutar desde el directorio backend:
+python ventas_rollup.py
+"""
+
+from pymongo import MongoClient, UpdateOne
+from bson import ObjectId
+from datetime import datetime
+
+from mongo import config_from_env
+
+ROLLUP_COLLECTION = 'ventas_rollup'
+SIN_CATEGORIA = 'Sin categoría'
+
+def rollup_day(fecha):
+    """Día (YYYY-MM-DD, UTC) al que se imputa un pedido"""
+    if isinstance(fecha, datetime):
+        return fecha.strftime('%Y-%m-%d')
+    if isinstance(fecha, str) and len(fecha) >= 10:
+        return fecha[:10]
+    return None
+
+def to_number(value):
+    """Convierte cantidades y montos a número; lo que no es numérico cuenta como 0"""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+    return 0
+
+def producto_oid(linea):
+    """ObjectId del producto de una línea, o None si no es válido"""
+    producto_id = linea.get('productoId') if isinstance(linea, dict) else None
+    if isinstance(producto_id, ObjectId):
+        return producto_id
+    if isinstance(producto_id, str) and ObjectId.is_valid(producto_id):
+        return ObjectId(producto_id)
+    return None
+
+def lineas(pedido):
+    """Líneas válidas (diccionarios) de un pedido"""
+    productos = pedido.get('productos')
+    return [linea for linea in productos if isinstance(linea, dict)] if isinstance(productos, list) else []
+
+def rollup_increments(cambios, categorias):
+    """Agrupa los incrementos de varios pedidos por documento del resumen.
+
+    cambios es una lista de (pedido, signo) con signo +1 al agregar y -1 al
+    quitar; categorias asocia el ObjectId de cada producto con su categoría.
+    """
+    increments = {}
+
+    def add(key, signo, total, unidades, nombre=None):
+        entry = increments.setdefault(key, {'total': 0, 'unidades': 0, 'pedidos': 0, 'nombre': None})
+        entry['total'] += signo * total
+        entry['unidades'] += signo * unidades
+        entry['pedidos'] += signo
+        if nombre:
+            entry['nombre'] = nombre
+
+    for pedido, signo in cambios:
+        fecha = rollup_day(pedido.get('fecha_pedido'))
+        if fecha is None:
+            continue
+
+        por_producto = {}
+        por_categoria = {}
+        unidades_pedido = 0
+        for linea in lineas(pedido):
+            oid = producto_oid(linea)
+            cantidad = to_number(linea.get('cantidad'))
+            total = to_number(linea.get('total_comprado'))
+            unidades_pedido += cantidad
+            if oid:
+                clave = str(oid)
+            else:
+                clave = str(linea['productoId']) if linea.get('productoId') is not None else None
+            acumulado = por_producto.setdefault(clave, [0, 0, linea.get('nombre')])
+            acumulado[0] += total
+            acumulado[1] += cantidad
+            categoria = categorias.get(oid, SIN_CATEGORIA)
+            acumulado = por_categoria.setdefault(categoria, [0, 0])
+            acumulado[0] += total
+            acumulado[1] += cantidad
+
+        # Cada pedido cuenta una vez por día, por producto y por categoría
+        add((fecha, 'dia', None), signo, to_number(pedido.get('total_compra')), unidades_pedido)
+        for clave, (total, cantidad, nombre) in por_producto.items():
+            add((fecha, 'producto', clave), signo, total, cantidad, nombre)
+        for categoria, (total, cantidad) in por_categoria.items():
+            add((fecha, 'categoria', categoria), signo, total, cantidad)
+    return increments
+
+def rollup_producto_ids(cambios):
+    """ObjectIds de los productos de los pedidos, para resolver sus categorías con un $in"""
+    producto_ids = {producto_oid(linea) for pedido, _ in cambios for linea in lineas(pedido)}
+    producto_ids.discard(None)
+    return list(producto_ids)
+
+def rollup_operations(cambios, categorias):
+    """UpdateOne con $inc (y upsert) para cada documento del resumen que cambia"""
+    operations = []
+    for (fecha, tipo, clave), entry in rollup_increments(cambios, categorias).items():
+        update = {
+            '$inc': {'total': entry['total'], 'unidades': entry['unidades'], 'pedidos': entry['pedidos']},
+            '$setOnInsert': {'fecha': fecha, 'tipo': tipo, 'clave': clave}
+        }
+        if entry['nombre']:
+            update['$set'] = {'nombre': entry['nombre']}
+        operations.append(UpdateOne({'_id': {'fecha': fecha, 'tipo': tipo, 'clave': clave}}, update, upsert=True))
+    return operations
+
+def update_rollup(db, cambios):
+    """Aplica los cambios de uno o más pedidos al resumen con un solo bulk_write de $inc.
+
+    Resuelve las categorías de todos los productos involucrados con una
+    sola consulta $in.
+    """
+    producto_ids = rollup_producto_ids(cambios)
+    categorias = {}
+    if producto_ids:
+        categorias = {
+            producto['_id']: producto.get('categoria', SIN_CATEGORIA)
+            for producto in db['productos'].find({'_id': {'$in': producto_ids}}, {'categoria': 1})
+        }
+
+    operations = rollup_operations(cambios, categorias)
+    if operations:
+        db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+
+def _numeric(expression):
+    """Expresión de agregación equivalente a to_number()"""
+    return {'$cond': [
+        {'$isNumber': expression},
+        expression,
+        {'$convert': {'input': expression, 'to': 'double', 'onError': 0, 'onNull': 0}}
+    ]}
+
+def rebuild_pipeline():
+    """Pipeline que recalcula ventas_rollup completo a partir de pedidos"""
+    return [
+        {'$addFields': {
+            'fecha': {'$cond': [
+                {'$eq': [{'$type': '$fecha_pedido'}, 'date']},
+                {'$dateToString': {'format': '%Y-%m-%d', 'date': '$fecha_pedido'}},
+                {'$substrCP': [{'$toString': '$fecha_pedido'}, 0, 10]}
+            ]},
+            'unidades_pedido': {'$sum': {'$map': {
+                'input': {'$cond': [{'$isArray': '$productos'}, '$productos', []]},
+                'in': _numeric('$$this.cantidad')
+            }}}
+        }},
+        {'$match': {'fecha': {'$nin': [None, '']}}},
+        {'$unwind': {'path': '$productos', 'includeArrayIndex': 'linea', 'preserveNullAndEmptyArrays': True}},
+        {'$addFields': {'producto_oid': {'$convert': {
+            'input': '$productos.productoId', 'to': 'objectId', 'onError': None, 'onNull': None
+        }}}},
+        {'$lookup': {
+            'from': 'productos',
+            'localField': 'producto_oid',
+            'foreignField': '_id',
+            'as': 'producto'
+        }},
+        # Cada línea aporta a su producto y su categoría; la primera además al total del día
+        {'$project': {
+            'aportes': {'$concatArrays': [
+                {'$cond': [
+                    {'$in': ['$linea', [None, 0]]},
+                    [{'tipo': 'dia', 'clave': None, 'total': _numeric('$total_compra'),
+                      'unidades': '$unidades_pedido', 'nombre': None}],
+                    []
+                ]},
+                {'$cond': [
+                    {'$eq': [{'$type': '$productos'}, 'object']},
+                    [
+                        {'tipo': 'producto',
+                         'clave': {'$toString': '$productos.productoId'},
+                         'total': _numeric('$productos.total_comprado'),
+                         'unidades': _numeric('$productos.cantidad'),
+                         'nombre': '$productos.nombre'},
+                        {'tipo': 'categoria',
+                         'clave': {'$ifNull': [{'$arrayElemAt': ['$producto.categoria', 0]}, SIN_CATEGORIA]},
+                         'total': _numeric('$productos.total_comprado'),
+                         'unidades': _numeric('$productos.cantidad'),
+                         'nombre': None}
+                    ],
+                    []
+                ]}
+            ]},
+            'fecha': 1
+        }},
+        {'$unwind': '$aportes'},
+        # Primero por pedido, para contar cada pedido una sola vez por clave
+        {'$group': {
+            '_id': {'fecha': '$fecha', 'tipo': '$aportes.tipo', 'clave': '$aportes.clave', 'pedido': '$_id'},
+            'total': {'$sum': '$aportes.total'},
+            'unidades': {'$sum': '$aportes.unidades'},
+            'nombre': {'$last': '$aportes.nombre'}
+        }},
+        {'$group': {
+            '_id': {'fecha': '$_id.fecha', 'tipo': '$_id.tipo', 'clave': '$_id.clave'},
+            'total': {'$sum': '$total'},
+            'unidades': {'$sum': '$unidades'},
+            'pedidos': {'$sum': 1},
+            'nombre': {'$last': '$nombre'}
+        }},
+        {'$addFields': {
+            'fecha': '$_id.fecha',
+            'tipo': '$_id.tipo',
+            'clave': '$_id.clave',
+            # Igual que update_rollup: sin nombre en días y categorías
+            'nombre': {'$ifNull': ['$nombre', '$$REMOVE']}
+        }},
+        {'$out': ROLLUP_COLLECTION}
+    ]
+
+def rebuild_rollup(db):
+    """Recalcula ventas_rollup desde cero con una sola agregación y marca el cambio"""
+    # $out reemplaza la colección de una vez y conserva sus índices
+    db['pedidos'].aggregate(rebuild_pipeline(), allowDiskUse=True)
+    db['versiones'].update_one({'_id': ROLLUP_COLLECTION}, {'$inc': {'version': 1}}, upsert=True)
+    return db[ROLLUP_COLLECTION].estimated_document_count()
+
+if __name__ == '__main__':
+    try:
+        # Misma base que la API: COMERCIOTECH_MONGO_URI y COMERCIOTECH_MONGO_DB
+        env = config_from_env()
+        client = MongoClient(env['MONGO_URI'])
+        db = client[env['MONGO_DB']]
+        print("✅ Conectado a MongoDB exitosamente")
+    except Exception as e:
+        print(f"❌ Error al conectar con MongoDB: {e}")
+        exit(1)
+
+    print("📊 Recalculando resumen de ventas...")
+    total = rebuild_rollup(db)
+    print(f"✅ {total} documentos en {ROLLUP_COLLECTION}")
+    client.close()